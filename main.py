@@ -13,7 +13,7 @@ from netwalk.utils.misc import (
     file_to_graph,
     get_dataset_from_file
 )
-from netwalk.utils.graph import Graph
+from netwalk.utils.graph import Graph, UndiGraph
 from netwalk.samples.link_prediction_samples.deep_walk import (
     deep_walk_application
 )
@@ -33,9 +33,18 @@ if __name__ == "__main__":
     neg: str = os.path.join(project_root, assets_loc, "val_negative.txt")
     pos: str = os.path.join(project_root, assets_loc, "val_positive.txt")
     test: str = os.path.join(project_root, assets_loc, "test.txt")
+    # binary copy of the training graph, the text file is parsed only when
+    # it changed
+    train_binary: str = os.path.join(project_root, assets_loc,
+                                     "training.graph")
 
     # create training, validation, testing dataset in desired format
-    train_set: Graph = file_to_graph(train_file)
+    if os.path.exists(train_binary) and \
+            os.path.getmtime(train_binary) >= os.path.getmtime(train_file):
+        train_set: Graph = UndiGraph.load(train_binary)
+    else:
+        train_set = file_to_graph(train_file)
+        train_set.save(train_binary)
     validate_set: List[Tuple[str, str, str]] = get_dataset_from_file(neg, '0')\
         + get_dataset_from_file(pos, '1')
     test_set = get_dataset_from_file(test)
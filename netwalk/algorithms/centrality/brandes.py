@@ -8,8 +8,14 @@
 # @Last modified time: Thu Jun 18 2020 2:33:11 PM
 #
 from netwalk.utils.graph import Graph
-from typing import List, Dict, Deque
-from collections import defaultdict, deque
+from netwalk.utils.csr import CSRGraph
+from typing import List, Dict, Union, Iterable, Optional, Tuple
+from itertools import repeat
+from random import Random
+import heapq
+import math
+import multiprocessing
+import numpy as np
 
 """
 Brandes Algorithm implementation
@@ -38,70 +44,398 @@ total number of paths between s and t (i.e \sigma(s,t)). Add the result
 to C_b(w). This is called backward go through.
 
 See: https://d1b10bmlvqabco.cloudfront.net/attach/k6oypy582xc46g/k6pzzh0uq171kp/k8vic6pjvyh6/A_faster_algorithm_for_betweenness_centrality.pdf
+
+For large graphs, the betweenness can be approximated by running the sweeps
+from a sample of k sources only and rescaling the dependencies (Brandes and
+Pich, Centrality Estimation in Large Networks). The contribution of a single
+source to a node is bounded by n - 1, so by Hoeffding's inequality and a union
+bound over all nodes, with probability 1 - delta every estimate is within
+epsilon * n * (n - 1) of the exact value when k >= ln(2n / delta) / 2epsilon^2
+
+For weighted graphs the forward sweep is a Dijkstra search on a binary heap
+(lazy deletion), the number of shortest paths is counted the same way. The
+backward step can also assign the dependencies to the edges of the shortest
+path DAG, which gives the edge betweenness used for community splitting
+(Girvan-Newman).
 """
 
 
+# sources are reduced in fixed size chunks, so the floating point summation
+# order (hence the result) does not depend on the number of workers
+SOURCES_PER_CHUNK = 64
+
+# the Brandes object owned by a pool worker process, see _init_worker
+_worker_brandes: Optional['Brandes'] = None
+
+
 class Brandes:
-    def __init__(self, graph: Graph):
-        self.__graph = graph
-        self.__pred: Dict[str, List[str]]
-        self.__stack: List[str]
-        self.__betweenness: Dict[str, float] = dict.\
-            fromkeys(self.__graph.get_nodes(), 0.0)
+    def __init__(self, graph: Union[Graph, CSRGraph], weighted: bool = True,
+                 edge_betweenness: bool = False):
+        """create a brandes algorithm object
+
+        Parameters
+        ----------
+        graph : Union[Graph, CSRGraph]
+            data source, either undigraph, digraph or the frozen CSRGraph
+        weighted : bool, default True
+            when the graph carries (positive) edge weights, shortest paths
+            are measured by the sum of weights with a Dijkstra forward sweep.
+            Set to False to count hops only
+        edge_betweenness : bool, default False
+            when set to True, the betweenness of every edge is accumulated as
+            well, see get_edge_betweenness
+        """
+        self.__graph = graph.to_csr()
+        self.__labels = self.__graph.get_labels()
+        num_of_nodes = self.__graph.get_nodes_count()
+        # plain lists are faster than numpy arrays for the scalar indexing
+        # done in the sweeps, the neighbour ids of every node are sliced
+        # out of the CSR arrays once
+        indptr = self.__graph.indptr.tolist()
+        indices = self.__graph.indices.tolist()
+        self.__adj: List[List[int]] = [indices[start:end] for start, end in
+                                       zip(indptr, indptr[1:])]
+        self.__lengths: Optional[List[List[float]]] = None
+        if weighted and self.__graph.is_weighted():
+            weights = self.__graph.weights.tolist()
+            self.__lengths = [weights[start:end] for start, end in
+                              zip(indptr, indptr[1:])]
+        # the position of the first out going edge of every node in the
+        # CSR arrays, edge betweenness is indexed by these positions
+        self.__arc_start: Optional[List[int]] = \
+            indptr if edge_betweenness else None
+        # per source buffers, allocated once and reset after every source
+        self.__dist: List[int] = [-1] * num_of_nodes
+        self.__num_of_shortest_paths: List[int] = [0] * num_of_nodes
+        self.__dependency: List[float] = [0.0] * num_of_nodes
+        self.__betweenness: List[float] = [0.0] * num_of_nodes
+        self.__edge_betweenness: Optional[List[float]] = \
+            [0.0] * len(indices) if edge_betweenness else None
+        self.__error_bound: Optional[float] = None
 
-    def run_brandes_algorithm(self):
+    def run_brandes_algorithm(self, workers: int = 1):
         """
         In this method, a forward sweep is going through the network by using
-        BFS search.
-        """
-        adj_list: Dict[str, List[str]] = self.__graph.get_out_adj_list()
-        for src in self.__graph.get_nodes():
-            pred: Dict[str, List[str]] = defaultdict(list)
-            dist: Dict[str, float] = {node: float('inf') for node in
-                                      self.__graph.get_nodes()}
-            num_of_shortest_paths: Dict[str, int] = {node: 0 for node in
-                                                     self.__graph.
-                                                     get_nodes()}
-            dist[src] = 0
-            stack = []
-            num_of_shortest_paths[src] = 1
-            dequeue: Deque[str] = deque()
-            dequeue.append(src)
-            while len(dequeue):
-                parent = dequeue.popleft()
-                stack.append(parent)
-                for neighbour in adj_list[parent]:
-                    if dist[neighbour] == float('inf'):
-                        dist[neighbour] = dist[parent] + 1
-                        dequeue.append(neighbour)
-                    if dist[neighbour] == dist[parent] + 1:
-                        pred[neighbour].append(parent)
-                        num_of_shortest_paths[neighbour] += \
-                            num_of_shortest_paths[parent]
-            self.__backward(src, pred, stack, num_of_shortest_paths)
-
-    def __backward(self, src, pred, stack, num_of_shortest_paths):
+        BFS search, or Dijkstra search for weighted graph. The graph is
+        converted to CSRGraph and the sweeps work on integer node ids with
+        buffers reused across sources.
+
+        The sweeps of different sources are independent. When workers is
+        greater than one, the sources are split across a process pool, each
+        worker receives the graph once and returns partial betweenness for
+        its chunks, which are reduced in the same order as the serial path.
+        """
+        sources = list(range(self.__graph.get_nodes_count()))
+        self.__run(sources, [1.0] * len(sources), workers)
+        self.__error_bound = 0.0
+
+    def run_approximate_brandes_algorithm(self, k: Optional[int] = None,
+                                          epsilon: Optional[float] = None,
+                                          delta: float = 0.1,
+                                          seed: Optional[int] = None,
+                                          stratified: bool = False,
+                                          workers: int = 1):
+        """approximate the betweenness by running the sweeps from a sample of
+        k sources and rescaling their dependencies, either k or epsilon must
+        be given
+
+        Parameters
+        ----------
+        k : int, default None
+            the number of sampled sources. When it is None, k is derived from
+            epsilon and delta
+        epsilon : float, default None
+            the target error, relative to n * (n - 1)
+        delta : float, default 0.1
+            the error bound holds with probability 1 - delta
+        seed : int, default None
+            the seed of the sampling, for reproducibility
+        stratified : bool, default False
+            when set to True, nodes are sorted by degree and split into k
+            strata of equal size, one source is sampled from each stratum.
+            Otherwise k sources are sampled uniformly without replacement
+        workers : int, default 1
+            the number of worker processes, see run_brandes_algorithm
+        """
+        if k is None and epsilon is None:
+            raise ValueError("either k or epsilon must be given")
+        if not 0 < delta < 1:
+            raise ValueError("delta must be between zero and one")
+        num_of_nodes = self.__graph.get_nodes_count()
+        if k is None:
+            if epsilon <= 0:
+                raise ValueError("epsilon must be greater than zero")
+            k = math.ceil(math.log(2 * num_of_nodes / delta) /
+                          (2 * epsilon ** 2))
+        if not isinstance(k, int):
+            raise TypeError("k must be integer")
+        if k <= 0:
+            raise ValueError("k must be greater than zero")
+        if k >= num_of_nodes:
+            self.run_brandes_algorithm(workers)
+            return
+
+        # node ids follow the sorted labels, so the sample is reproducible
+        nodes = list(range(num_of_nodes))
+        rng = Random(seed)
+        if stratified:
+            degrees = self.__graph.get_out_degrees().tolist()
+            nodes.sort(key=degrees.__getitem__)
+            sources: List[int] = []
+            weights: List[float] = []
+            for i in range(k):
+                stratum = nodes[i * num_of_nodes // k:
+                                (i + 1) * num_of_nodes // k]
+                sources.append(rng.choice(stratum))
+                weights.append(float(len(stratum)))
+        else:
+            sources = rng.sample(nodes, k)
+            weights = [num_of_nodes / k] * k
+        self.__run(sources, weights, workers)
+        self.__error_bound = math.sqrt(
+            math.log(2 * num_of_nodes / delta) / (2 * k)) * \
+            num_of_nodes * (num_of_nodes - 1)
+
+    def get_error_bound(self) -> Optional[float]:
+        """
+        return the absolute error bound of the last run, which holds with
+        probability 1 - delta for every node. It is zero for the exact
+        algorithm and None before any run
+        """
+        return self.__error_bound
+
+    def __run(self, sources: List[int], weights: List[float], workers: int):
+        """
+        run the sweeps of the given sources serially or on a process pool
+        """
+        if not isinstance(workers, int):
+            raise TypeError("workers must be integer")
+        if workers <= 0:
+            raise ValueError("workers must be greater than zero")
+        chunks = [(sources[i:i + SOURCES_PER_CHUNK],
+                   weights[i:i + SOURCES_PER_CHUNK])
+                  for i in range(0, len(sources), SOURCES_PER_CHUNK)]
+        if workers == 1 or len(chunks) <= 1:
+            self.__reduce(self._accumulate_sources(*chunk)
+                          for chunk in chunks)
+            return
+        with _get_context().Pool(workers, initializer=_init_worker,
+                                 initargs=(self.__graph,
+                                           self.__lengths is not None,
+                                           self.__arc_start is not None)) \
+                as pool:
+            self.__reduce(pool.imap(_run_worker, chunks))
+
+    def __reduce(self, partials: Iterable[Tuple[List[float],
+                                                Optional[List[float]]]]):
+        """
+        add partial node and edge betweenness of source chunks to the result
+        """
+        for partial, edge_partial in partials:
+            self.__betweenness = [a + b for a, b in
+                                  zip(self.__betweenness, partial)]
+            if edge_partial is not None:
+                self.__edge_betweenness = [
+                    a + b for a, b in
+                    zip(self.__edge_betweenness, edge_partial)]
+
+    def _accumulate_sources(self, sources: List[int],
+                            weights: List[float]) \
+            -> Tuple[List[float], Optional[List[float]]]:
+        """sum up the weighted dependencies of the given sources
+
+        Parameters
+        ----------
+        sources : List[int]
+            the source node ids
+        weights : List[float]
+            the scale of each source dependencies, 1.0 for the exact
+            algorithm
+
+        Returns
+        -------
+        Tuple[List[float], Optional[List[float]]]
+            the partial betweenness contributed by the sources, indexed by
+            node id, and the partial edge betweenness indexed by the edge
+            position in CSR arrays (None when not enabled)
+        """
+        betweenness = [0.0] * self.__graph.get_nodes_count()
+        edge_betweenness = None if self.__arc_start is None else \
+            [0.0] * self.__graph.get_edges_count()
+        forward = self.__forward if self.__lengths is None else \
+            self.__weighted_forward
+        for src, weight in zip(sources, weights):
+            stack = forward(src)
+            if edge_betweenness is None:
+                self.__backward(src, stack, weight, betweenness)
+            else:
+                self.__backward_with_edges(src, stack, weight, betweenness,
+                                           edge_betweenness)
+        return betweenness, edge_betweenness
+
+    def __forward(self, src: int) -> List[int]:
+        """
+        The forward step, a BFS search from src counting the number of
+        shortest paths to every node. The visited nodes are returned in the
+        order of non-decreasing distance, the queue itself is the stack used
+        by the backward step.
+        """
+        adj = self.__adj
+        dist = self.__dist
+        num_of_shortest_paths = self.__num_of_shortest_paths
+        dist[src] = 0
+        num_of_shortest_paths[src] = 1
+        stack = [src]
+        i = 0
+        while i < len(stack):
+            parent = stack[i]
+            i += 1
+            child_dist = dist[parent] + 1
+            parent_paths = num_of_shortest_paths[parent]
+            for neighbour in adj[parent]:
+                neighbour_dist = dist[neighbour]
+                if neighbour_dist < 0:
+                    dist[neighbour] = child_dist
+                    stack.append(neighbour)
+                    num_of_shortest_paths[neighbour] += parent_paths
+                elif neighbour_dist == child_dist:
+                    num_of_shortest_paths[neighbour] += parent_paths
+        return stack
+
+    def __weighted_forward(self, src: int) -> List[int]:
+        """
+        The forward step for weighted graph, a Dijkstra search from src on a
+        binary heap. Outdated heap entries are skipped when popped instead
+        of being removed. Nodes are pushed to the stack when they are
+        settled, i.e. in the order of non-decreasing distance.
+        """
+        adj, lengths = self.__adj, self.__lengths
+        dist = self.__dist
+        num_of_shortest_paths = self.__num_of_shortest_paths
+        dist[src] = 0.0
+        num_of_shortest_paths[src] = 1
+        stack: List[int] = []
+        heap = [(0.0, src)]
+        while heap:
+            parent_dist, parent = heapq.heappop(heap)
+            if parent_dist > dist[parent]:
+                continue
+            stack.append(parent)
+            parent_paths = num_of_shortest_paths[parent]
+            for neighbour, length in zip(adj[parent], lengths[parent]):
+                child_dist = parent_dist + length
+                neighbour_dist = dist[neighbour]
+                if neighbour_dist < 0 or child_dist < neighbour_dist:
+                    # a shorter path is found, the previous counts are void
+                    dist[neighbour] = child_dist
+                    num_of_shortest_paths[neighbour] = parent_paths
+                    heapq.heappush(heap, (child_dist, neighbour))
+                elif child_dist == neighbour_dist:
+                    num_of_shortest_paths[neighbour] += parent_paths
+        return stack
+
+    def __backward(self, src: int, stack: List[int], weight: float,
+                   betweenness: List[float]):
         """
         The backward step to calculate the share by different nodes. Please
         refer the paper mentioned above.
+
+        Instead of storing predecessor lists, the stack is popped in order
+        of non-increasing distance and every node collects the dependencies
+        of its successors, i.e. the neighbours one step further away. The
+        buffers are reset for the visited nodes only.
+        """
+        adj, lengths = self.__adj, self.__lengths
+        dist = self.__dist
+        num_of_shortest_paths = self.__num_of_shortest_paths
+        dependency = self.__dependency
+        betweenness[src] += weight * (len(stack) - 1)
+        for parent in reversed(stack):
+            share = 0.0
+            if lengths is None:
+                child_dist = dist[parent] + 1
+                for child in adj[parent]:
+                    if dist[child] == child_dist:
+                        # sum of (1 + \delta(s|w)) / \sigma(s,w), multiplied
+                        # by \sigma(s,v) below
+                        share += (1 + dependency[child]) / \
+                            num_of_shortest_paths[child]
+            else:
+                parent_dist = dist[parent]
+                for child, length in zip(adj[parent], lengths[parent]):
+                    if dist[child] == parent_dist + length:
+                        share += (1 + dependency[child]) / \
+                            num_of_shortest_paths[child]
+            dependency[parent] = num_of_shortest_paths[parent] * share
+            if parent != src:
+                betweenness[parent] += weight * dependency[parent]
+        self.__reset(stack)
+
+    def __backward_with_edges(self, src: int, stack: List[int],
+                              weight: float, betweenness: List[float],
+                              edge_betweenness: List[float]):
+        """
+        The backward step which also assigns the share of every edge
+        v -> w on the shortest path DAG, sigma(s,v) / sigma(s,w) *
+        (1 + delta(s|w)), to the edge betweenness.
         """
-        dependency: Dict[str, float] = {node: 0.0 for node in
-                                        self.__graph.get_nodes()}
-        self.__betweenness[src] += len(stack) - 1
-        while len(stack):
-            child = stack.pop()
-            for parent in pred[child]:
-                # the line is essentially implement formula
-                # \sigma(s,v) / \sigma(s,w) * (1 + \delta(s|w))
-                dependency[parent] += \
-                    (num_of_shortest_paths[parent] /
-                     num_of_shortest_paths[child]) * \
-                    (1 + dependency[child])
-            if child != src:
-                self.__betweenness[child] += dependency[child]
+        adj, lengths = self.__adj, self.__lengths
+        arc_start = self.__arc_start
+        dist = self.__dist
+        num_of_shortest_paths = self.__num_of_shortest_paths
+        dependency = self.__dependency
+        betweenness[src] += weight * (len(stack) - 1)
+        for parent in reversed(stack):
+            parent_dist = dist[parent]
+            parent_paths = num_of_shortest_paths[parent]
+            parent_lengths = repeat(1) if lengths is None else lengths[parent]
+            arc = arc_start[parent]
+            for child, length in zip(adj[parent], parent_lengths):
+                if dist[child] == parent_dist + length:
+                    share = parent_paths * (1 + dependency[child]) / \
+                        num_of_shortest_paths[child]
+                    dependency[parent] += share
+                    edge_betweenness[arc] += weight * share
+                arc += 1
+            if parent != src:
+                betweenness[parent] += weight * dependency[parent]
+        self.__reset(stack)
+
+    def __reset(self, stack: List[int]):
+        """
+        reset the per source buffers of the visited nodes
+        """
+        dist = self.__dist
+        num_of_shortest_paths = self.__num_of_shortest_paths
+        dependency = self.__dependency
+        for node in stack:
+            dist[node] = -1
+            num_of_shortest_paths[node] = 0
+            dependency[node] = 0.0
 
     def get_betweenness(self) -> Dict[str, float]:
-        return self.__betweenness
+        return dict(zip(self.__labels, self.__betweenness))
+
+    def get_edge_betweenness(self) -> Dict[Tuple[str, str], float]:
+        """
+        return the betweenness of every edge. For undigraph both directions
+        of an edge are summed up under the key (u, v) with u the node of the
+        smaller id. Parallel edges share one key
+        """
+        if self.__edge_betweenness is None:
+            raise ValueError("edge betweenness is not enabled")
+        graph = self.__graph
+        src = np.repeat(np.arange(graph.get_nodes_count()),
+                        graph.get_out_degrees()).tolist()
+        dst = graph.indices.tolist()
+        labels = self.__labels
+        res: Dict[Tuple[str, str], float] = {}
+        for u, v, value in zip(src, dst, self.__edge_betweenness):
+            if not graph.is_directed() and u > v:
+                u, v = v, u
+            key = (labels[u], labels[v])
+            res[key] = res.get(key, 0.0) + value
+        return res
 
     def get_top_n_betweenness(self, betweenness: Dict[str, float],
                               n: int = 10,
@@ -122,3 +456,29 @@ class Brandes:
         if with_measure:
             return top_n
         return [node[0] for node in top_n]
+
+
+def _get_context():
+    """
+    prefer fork, so workers inherit the graph pages instead of unpickling
+    a copy
+    """
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork')
+    return multiprocessing.get_context()
+
+
+def _init_worker(graph: CSRGraph, weighted: bool, edge_betweenness: bool):
+    """
+    pool initializer, runs once per worker process
+    """
+    global _worker_brandes
+    _worker_brandes = Brandes(graph, weighted, edge_betweenness)
+
+
+def _run_worker(task: Tuple[List[int], List[float]]) \
+        -> Tuple[List[float], Optional[List[float]]]:
+    """
+    pool task, returns the partial betweenness of a chunk of weighted sources
+    """
+    return _worker_brandes._accumulate_sources(*task)
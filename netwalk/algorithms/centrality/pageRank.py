@@ -7,8 +7,11 @@
 # @Last modified by: Terry Pan
 # @Last modified time: Thu Jun 18 2020 2:32:51 PM
 #
-from typing import Dict, List, Union, Tuple
+from typing import Dict, Iterable, List, Mapping, Optional, Union, Tuple
+from collections import deque
 from netwalk.utils.graph import Graph, DiGraph, UndiGraph
+from netwalk.utils.csr import CSRGraph
+import numpy as np
 import copy
 
 """
@@ -18,41 +21,75 @@ Pagerank follows the similar idea in thesis system. The more valuable paper
 get more citations from other papers. What is more, When a famous paper
 references another not famous paper, that not famous paper becomes important
 as well.
+
+Besides the dict based power iterations, a sparse engine is provided. It builds
+the column-stochastic transition matrix once from the CSR arrays and runs each
+iteration as a sparse matrix-vector product. The mass of dangling nodes (nodes
+without out going edges) is redistributed uniformly, therefore the weights
+always sum to one.
+
+update adds edges to the graph and moves the weights to the new fixed point
+of the sparse engine without starting again from the uniform weights. The
+residual of every node (how far its weight is from the equation of its
+node) is kept between the updates. A new edge only changes the residuals
+of the neighbours of its source, and the residuals above the tolerance are
+pushed to the out going neighbours one node at a time (Gauss-Southwell),
+so the work stays around the endpoints of the new edges. The residual
+spread uniformly by the dangling nodes and by the new nodes is not pushed,
+it is removed exactly by scaling all the weights.
+
+Examples
+--------
+>> page_rank = PageRank(graph, sparse=True)
+>> weights = page_rank.run_page_rank_algorithm()
+>> weights = page_rank.update([("a", "b"), ("b", "new node")])
 """
 
 
 class PageRank:
-    def __init__(self, graph: Graph,
+    def __init__(self, graph: Union[Graph, CSRGraph],
                  threshold: float = 1.0e-6,
                  max_iter: int = 100,
-                 alpha: float = 0.85):
+                 alpha: float = 0.85,
+                 sparse: bool = False):
         """create a pagerank algorithm. argument graph provided here will be
         used as source and argument threshold is used to determine when to stop
         the power interation
 
         Parameters
         ----------
-        graph : Graph
-            data source. A concrete object, either undigraph or digraph
+        graph : Union[Graph, CSRGraph]
+            data source. A concrete object, either undigraph, digraph or
+            the frozen CSRGraph
         threshold : float, default 1.0e-6
             the threshold to determine when to stop iteration
         max_iter : int, default 100
             max iteration of this algorithm
         alpha : float, default 0.85
             controlling term
+        sparse : bool, default False
+            when set to True, run_page_rank_algorithm uses the vectorized
+            sparse matrix engine (page_rank_sparse_alg)
         """
         self.__graph = graph
         self.__threshold = threshold
         self.__max_iter = max_iter
         self.__alpha = alpha
+        self.__sparse = sparse
+        # the state of update, the weights and the residuals by node id,
+        # the residuals are computed again when None
+        self.__labels: List[str] = []
+        self.__ids: Dict[str, int] = {}
+        self.__weights: Optional[np.ndarray] = None
+        self.__residuals: Optional[np.ndarray] = None
+        self.__dangling: Optional[np.ndarray] = None
 
-    def _get_page_rank_of_adj_nodes(self) -> Dict[str, int]:
+    def _get_page_rank_of_adj_nodes(self) -> Mapping[str, int]:
         """
-        get the page rank of adjacent nodes
+        get the page rank of adjacent nodes, which is the out degree cached
+        by the graph
         """
-        adj_list = self.__graph.get_out_adj_list()
-        return dict(zip(adj_list.keys(),
-                        map(len, adj_list.values())))
+        return self.__graph.get_out_degree_map()
 
     def _get_init_weight(self) -> Dict[str, float]:
         """
@@ -92,6 +129,7 @@ class PageRank:
             node: 1.0 for node in self.__graph.get_nodes()}
         # page_rank_of_adj_nodes = self._get_page_rank_of_adj_nodes()
         adj_list = self.__graph.get_out_adj_list()
+        degrees = self.__graph.get_out_degree_map()
 
         while self.__max_iter:
             # old_weight is the previous weights before iteration
@@ -104,8 +142,8 @@ class PageRank:
                 # mistakes
                 # this is essentially \alpha * A.T * old_weights + (1-\alpha)
                 new_weight: float = 0.0
-                for n in adj_list[adj_node]:
-                    new_weight += (1/len(adj_list[n]))
+                for n in adj_list.get(adj_node, ()):
+                    new_weight += (1/degrees[n])
 
                 init_weights[adj_node] = self.__alpha * \
                     new_weight * old_weights[adj_node] + (1-self.__alpha)
@@ -149,15 +187,242 @@ class PageRank:
             self.__max_iter -= 1
         return init_weights
 
+    def _get_transition(self, graph: CSRGraph) \
+            -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """build the column-stochastic transition matrix in coordinate form.
+        Entry k represents the edge src[k] -> dst[k], its weight is
+        inv_degree[src[k]]. Dangling nodes have inv_degree 0
+
+        Parameters
+        ----------
+        graph : CSRGraph
+            the compact graph
+
+        Returns
+        -------
+        Tuple[np.ndarray, np.ndarray, np.ndarray]
+            src, dst and inv_degree arrays
+        """
+        out_degrees = graph.get_out_degrees()
+        src = np.repeat(np.arange(graph.get_nodes_count()), out_degrees)
+        inv_degree = np.zeros(len(out_degrees))
+        np.divide(1.0, out_degrees, out=inv_degree, where=out_degrees > 0)
+        return src, graph.indices, inv_degree
+
+    def _sparse_step(self, weights: np.ndarray,
+                     transition: Tuple[np.ndarray, np.ndarray, np.ndarray]) \
+            -> np.ndarray:
+        """
+        one power iteration of the sparse engine, \alpha * P.T * weights,
+        plus the dangling mass and the teleport term spread over all nodes
+        """
+        src, dst, inv_degree = transition
+        num_of_nodes = len(weights)
+        new_weights = np.bincount(dst, weights=(weights * inv_degree)[src],
+                                  minlength=num_of_nodes)
+        new_weights *= self.__alpha
+        new_weights += (self.__alpha * weights[inv_degree == 0].sum() +
+                        1 - self.__alpha) / num_of_nodes
+        return new_weights
+
+    def page_rank_sparse_alg(self) -> Dict[str, float]:
+        """
+        power iteration with sparse matrix-vector products, works for both
+        digraph and undigraph
+
+        return the centrality weights for each nodes
+        """
+        graph = self.__graph.to_csr()
+        num_of_nodes = graph.get_nodes_count()
+        transition = self._get_transition(graph)
+        weights = np.full(num_of_nodes, 1 / num_of_nodes)
+
+        for _ in range(self.__max_iter):
+            new_weights = self._sparse_step(weights, transition)
+            err = np.abs(new_weights - weights).sum()
+            weights = new_weights
+            if err < self.__threshold * num_of_nodes:
+                break
+        # the warm start of update
+        self.__labels = list(graph.get_labels())
+        self.__weights = weights
+        self.__residuals = None
+        return dict(zip(graph.get_labels(), weights.tolist()))
+
+    def update(self, edges: Iterable[Tuple[str, str]]) -> Dict[str, float]:
+        """add the edges to the graph and update the weights of the sparse
+        engine, starting from the previous weights. The first update after
+        page_rank_sparse_alg (or without any previous run) compares the
+        weights with the whole graph once, the later ones only visit the
+        nodes around the new edges. The graph must not be changed other
+        than through update in between
+
+        Parameters
+        ----------
+        edges : Iterable[Tuple[str, str]]
+            the new edges, added with add_edge
+
+        Returns
+        -------
+        Dict[str, float]
+            the centrality weights for each nodes, the fixed point of
+            page_rank_sparse_alg on the new graph within the threshold
+        """
+        if not isinstance(self.__graph, (DiGraph, UndiGraph)):
+            raise ValueError("update needs a DiGraph or an UndiGraph")
+        edges = list(edges)
+        if self.__residuals is None:
+            self.__init_residuals()
+        graph = self.__graph
+        directed = graph.is_directed()
+        # only the out going neighbours of the sources change
+        sources = {edge[0] for edge in edges}
+        if not directed:
+            sources.update(edge[1] for edge in edges)
+        degrees = {node: graph.get_out_degree(node) for node in sources}
+        uniform = self.__add_nodes([node for edge in edges for node in edge])
+        for edge in edges:
+            graph.add_edge(edge)
+        alpha, weights, residuals = \
+            self.__alpha, self.__weights, self.__residuals
+        num_of_nodes = len(weights)
+        adj_list, ids = graph.get_out_adj_list(), self.__ids
+        for node in sources:
+            neighbours = adj_list.get(node, ())
+            degree, new_degree = degrees[node], len(neighbours)
+            if degree == new_degree:
+                continue
+            weight = weights[ids[node]]
+            if degree == 0:
+                # the weight was spread over all nodes
+                uniform -= alpha * weight / num_of_nodes
+                self.__dangling[ids[node]] = False
+            else:
+                for neighbour in neighbours[:degree]:
+                    residuals[ids[neighbour]] += \
+                        alpha * weight * (1 / new_degree - 1 / degree)
+            for neighbour in neighbours[degree:]:
+                residuals[ids[neighbour]] += alpha * weight / new_degree
+        self.__push(uniform)
+        return dict(zip(self.__labels, self.__weights.tolist()))
+
+    def __init_residuals(self):
+        """
+        a helper method to compute the residuals of the previous weights on
+        the current graph, the weights of a full run when there are none
+        """
+        graph = self.__graph.to_csr()
+        labels = list(graph.get_labels())
+        if self.__weights is None and labels:
+            self.page_rank_sparse_alg()
+        previous = {} if self.__weights is None else \
+            dict(zip(self.__labels, self.__weights.tolist()))
+        weights = np.array([previous.get(label, 0.0) for label in labels],
+                           dtype=np.float64)
+        transition = self._get_transition(graph)
+        self.__labels = labels
+        self.__ids = {label: i for i, label in enumerate(labels)}
+        residuals = np.zeros(0)
+        # power iterations from the previous weights bring the residuals
+        # near the tolerance, so few are left to push one at a time
+        for _ in range(self.__max_iter if labels else 0):
+            residuals = self._sparse_step(weights, transition) - weights
+            if np.abs(residuals).sum() <= self.__tolerance() * len(labels):
+                break
+            weights = weights + residuals
+        self.__weights = weights
+        self.__residuals = residuals
+        self.__dangling = transition[2] == 0
+
+    def __add_nodes(self, nodes: List[str]) -> float:
+        """
+        a helper method to give the new nodes an id, a zero weight and their
+        residual. The teleport term and the dangling mass of every node are
+        now divided among more nodes, return that uniform residual change
+        """
+        new_nodes = [node for node in dict.fromkeys(nodes)
+                     if node not in self.__ids]
+        if not new_nodes:
+            return 0.0
+        num_of_nodes = len(self.__labels)
+        new_count = num_of_nodes + len(new_nodes)
+        for node in new_nodes:
+            self.__ids[node] = len(self.__labels)
+            self.__labels.append(node)
+        spread = 1 - self.__alpha + \
+            self.__alpha * self.__weights[self.__dangling].sum()
+        uniform = spread * (1 / new_count - 1 / num_of_nodes) \
+            if num_of_nodes else 0.0
+        self.__weights = np.concatenate((self.__weights,
+                                         np.zeros(len(new_nodes))))
+        self.__residuals = np.concatenate(
+            (self.__residuals, np.full(len(new_nodes),
+                                       spread / new_count - uniform)))
+        self.__dangling = np.concatenate(
+            (self.__dangling, np.ones(len(new_nodes), dtype=bool)))
+        return uniform
+
+    def __tolerance(self) -> float:
+        """
+        a helper method to return the residual left on a node by update, the
+        weights are then within threshold per node of the fixed point
+        """
+        return self.__threshold * (1 - self.__alpha)
+
+    def __push(self, uniform: float):
+        """
+        a helper method to push the residuals above the tolerance to the out
+        going neighbours until none is left. The uniform residual is added
+        to every node, it is removed by scaling the weights: they solve the
+        equations with the teleport term 1 - alpha, so a multiple of them
+        cancels a uniform residual
+        """
+        alpha = self.__alpha
+        weights, residuals = self.__weights, self.__residuals
+        num_of_nodes = len(weights)
+        tolerance = self.__tolerance()
+        adj_list, ids, labels = \
+            self.__graph.get_out_adj_list(), self.__ids, self.__labels
+        while True:
+            queue = deque(
+                np.flatnonzero(np.abs(residuals) > tolerance).tolist())
+            queued = set(queue)
+            if not queue and uniform == 0:
+                return
+            while queue:
+                node = queue.popleft()
+                queued.discard(node)
+                residual = residuals[node]
+                weights[node] += residual
+                residuals[node] = 0.0
+                neighbours = adj_list.get(labels[node], ())
+                if not neighbours:
+                    uniform += alpha * residual / num_of_nodes
+                    continue
+                share = alpha * residual / len(neighbours)
+                for neighbour in neighbours:
+                    neighbour = ids[neighbour]
+                    residuals[neighbour] += share
+                    if neighbour not in queued and \
+                            abs(residuals[neighbour]) > tolerance:
+                        queue.append(neighbour)
+                        queued.add(neighbour)
+            if uniform != 0:
+                scale = 1 + uniform / ((1 - alpha) / num_of_nodes - uniform)
+                weights *= scale
+                residuals *= scale
+                uniform = 0.0
+
     def run_page_rank_algorithm(self) -> Dict[str, float]:
         """
         the core of page rank algorithms
 
         return the centrality weights for each nodes
         """
-        if isinstance(self.__graph, DiGraph):
-            return self.page_rank_for_digraph_alg()
-        elif isinstance(self.__graph, UndiGraph):
-            return self.page_rank_for_undigraph_alg()
-        else:
+        if not isinstance(self.__graph, (DiGraph, UndiGraph, CSRGraph)):
             raise ValueError("unsupported graph type")
+        if self.__sparse:
+            return self.page_rank_sparse_alg()
+        if self.__graph.is_directed():
+            return self.page_rank_for_digraph_alg()
+        return self.page_rank_for_undigraph_alg()
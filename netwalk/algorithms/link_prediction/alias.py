@@ -0,0 +1,166 @@
+#
+# Alias tables for O(1) weighted sampling
+#
+# @Author: Terry Pan
+# @Date: Sun Oct 18 2026
+# @Email: pttdev123@gmail.com
+# @Last modified by: Terry Pan
+# @Last modified time: Sun Oct 18 2026 5:11:26 PM
+#
+from typing import Tuple
+import numpy as np
+
+"""
+Alias tables of many discrete distributions packed like CSR arrays. The
+distribution g is given by weights[indptr[g]:indptr[g + 1]], its table is
+stored at the same positions: an entry k is drawn with probability
+1 / size, then kept with probability prob[k] or replaced by its alias (a
+local offset inside the distribution). Sampling is O(1) per draw.
+
+The tables of all distributions are built together without a Python loop,
+with the sweep construction of Vose's method: the light entries (scaled
+weight below 1) take their alias from the heavy entries in order, a heavy
+entry is used until its cumulative excess is given away and then becomes a
+bucket aliased to the next heavy entry. Both steps are found by merging
+the cumulative deficits of the light entries with the cumulative excesses
+of the heavy entries.
+
+Examples
+--------
+>> prob, alias = build_alias_tables(indptr, weights)
+>> offsets = sample_alias(indptr[nodes], sizes, prob, alias, rng)
+"""
+
+# the probabilities are stored compactly, float32 is precise enough to
+# sample from
+PROB_DTYPE = np.float32
+ALIAS_DTYPE = np.int32
+
+
+def build_alias_tables(indptr: np.ndarray, weights: np.ndarray) \
+        -> Tuple[np.ndarray, np.ndarray]:
+    """build the alias tables of the distributions of indptr
+
+    Parameters
+    ----------
+    indptr : np.ndarray
+        the start of each distribution in weights, length number of
+        distributions + 1
+    weights : np.ndarray
+        the non negative weights of the entries, a distribution with zero
+        total weight is sampled uniformly
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray]
+        the prob and the alias (local offset) of every entry
+    """
+    indptr = np.asarray(indptr, dtype=np.int64)
+    weights = np.asarray(weights, dtype=np.float64)
+    sizes = np.diff(indptr)
+    group = np.repeat(np.arange(len(sizes)), sizes)
+    local = np.arange(len(weights)) - indptr[:-1][group]
+    totals = np.bincount(group, weights, minlength=len(sizes))
+    totals = totals[group]
+    scaled = np.divide(weights * sizes[group], totals,
+                       out=np.ones(len(weights)), where=totals > 0)
+    prob = np.ones(len(weights))
+    alias = local.copy()
+    light = scaled < 1
+    # the cumulative deficits of the light entries and the cumulative
+    # excesses of the heavy entries inside each distribution
+    deficits = _group_cumsum(np.where(light, 1 - scaled, 0), indptr, group)
+    excesses = _group_cumsum(np.where(light, 0, scaled - 1), indptr, group)
+    lights = np.flatnonzero(light)
+    heavies = np.flatnonzero(~light)
+    # a light entry takes the first heavy entry whose cumulative excess
+    # reaches the deficits before it. The sums of the previous light entry
+    # are compared, so both searches round the same way
+    before = np.zeros(len(lights))
+    same = group[lights[1:]] == group[lights[:-1]]
+    before[1:][same] = deficits[lights[:-1]][same]
+    owner = _next(group, lights, before, heavies, excesses[heavies], True)
+    # rounding can leave the last deficits uncovered, they take the last
+    # heavy entry
+    last = np.full(len(sizes), -1)
+    ends = np.diff(group[heavies], append=-1) != 0
+    last[group[heavies[ends]]] = heavies[ends]
+    owner = np.where(owner >= 0, owner, last[group[lights]])
+    found = owner >= 0
+    prob[lights[found]] = scaled[lights[found]]
+    alias[lights[found]] = local[owner[found]]
+    # a heavy entry becomes a bucket at the first light entry whose
+    # deficits exceed its excess, its alias is the next heavy entry
+    spent = _next(group, heavies, excesses[heavies], lights,
+                  deficits[lights], False)
+    following = np.full(len(heavies), -1)
+    same = group[heavies[1:]] == group[heavies[:-1]]
+    following[:-1][same] = heavies[1:][same]
+    bucket = (spent >= 0) & (following >= 0)
+    prob[heavies[bucket]] = np.clip(
+        excesses[heavies[bucket]] + 1 - deficits[spent[bucket]], 0, 1)
+    alias[heavies[bucket]] = local[following[bucket]]
+    return prob.astype(PROB_DTYPE), alias.astype(ALIAS_DTYPE)
+
+
+def sample_alias(starts: np.ndarray, sizes: np.ndarray, prob: np.ndarray,
+                 alias: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """draw one local offset from each distribution
+
+    Parameters
+    ----------
+    starts : np.ndarray
+        the start of each distribution in the tables
+    sizes : np.ndarray
+        the number of entries of each distribution, greater than zero
+    prob : np.ndarray
+        the probabilities of build_alias_tables
+    alias : np.ndarray
+        the aliases of build_alias_tables
+    rng : np.random.Generator
+        the random generator
+
+    Returns
+    -------
+    np.ndarray
+        the drawn offsets, inside [0, sizes)
+    """
+    offsets = (rng.random(len(sizes)) * sizes).astype(np.int64)
+    entries = starts + offsets
+    keep = rng.random(len(sizes)) < prob[entries]
+    return np.where(keep, offsets, alias[entries])
+
+
+def _group_cumsum(values: np.ndarray, indptr: np.ndarray,
+                  group: np.ndarray) -> np.ndarray:
+    """
+    a helper function to compute the inclusive cumulative sums restarting
+    at every distribution
+    """
+    sums = np.cumsum(values)
+    before = np.concatenate(([0.0], sums))[indptr[:-1]]
+    return sums - before[group]
+
+
+def _next(group: np.ndarray, entries: np.ndarray, values: np.ndarray,
+          others: np.ndarray, other_values: np.ndarray,
+          inclusive: bool) -> np.ndarray:
+    """
+    a helper function to find for each entry the first of the others in
+    the same distribution whose value reaches (inclusive) or exceeds the
+    value of the entry, -1 when there is none. The values are non negative
+    and bounded by the size of the distribution, the values of the others
+    are non decreasing inside a distribution
+    """
+    if not len(entries) or not len(others):
+        return np.full(len(entries), -1)
+    # the distributions are separated by more than any value, so one
+    # search over the others covers all of them
+    gap = np.bincount(group).max() + 2.0
+    positions = np.searchsorted(
+        group[others] * gap + other_values, group[entries] * gap + values,
+        'left' if inclusive else 'right')
+    found = np.append(others, -1)[positions]
+    valid = found >= 0
+    valid[valid] = group[found[valid]] == group[entries[valid]]
+    return np.where(valid, found, -1)
@@ -0,0 +1,579 @@
+#
+# Approximate nearest neighbour index over node embeddings
+#
+# @Author: Terry Pan
+# @Date: Sun Oct 18 2026
+# @Email: pttdev123@gmail.com
+# @Last modified by: Terry Pan
+# @Last modified time: Sun Oct 18 2026 9:05:37 PM
+#
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+from netwalk.utils.graph import Graph
+from netwalk.utils.csr import CSRGraph, gather_neighbours
+from .similarity_methods import EmbeddingMeasure
+import multiprocessing
+import os
+import struct
+import numpy as np
+
+"""
+IVFIndex finds the most similar embeddings without scanning all of them,
+with an inverted file (IVF-flat) index. The embeddings are clustered by
+k-means into lists, a query is compared with the centroids first and only
+the embeddings of the probes closest lists are scored exactly. More probes
+find more of the true neighbours, at the cost of scoring more embeddings.
+
+The row i of the embeddings is the node id i of the graph's CSRGraph, as
+trained by SkipGram. For COSINE the embeddings are normalized when the
+index is built. Queries are answered in batches: the probed lists of a
+batch are visited once each and scored against all the queries probing
+them with one matrix product.
+
+recommend finds the top new links of every node: the node itself and its
+out going neighbours (see get_out_adj_list) are never returned.
+
+The index can be saved to a binary file and opened again with np.memmap,
+like CSRGraph. The file is a fixed header followed by the sections, each
+aligned to 8 bytes:
+
+    header       magic, version, metric, embeddings, dimensions, lists
+    centroids    float32 (lists x dimensions)
+    lists        int64 indptr (lists + 1), int32 node ids
+    embeddings   float32 (embeddings x dimensions), in the order of the
+                 lists
+
+Examples
+--------
+>> index = IVFIndex.build(model.get_embeddings(), seed=1)
+>> index.save("embeddings.index")
+>> index = IVFIndex.load("embeddings.index")
+>> index.most_similar(graph, "42", 10)
+>> for links in index.recommend(graph, 10, workers=4):
+>>     for src, dst, score in links:
+>>         print(src, dst, score)
+"""
+
+# the number of lists scored for each query by default
+PROBES = 8
+# the number of k-means iterations when building the lists
+KMEANS_ITERATIONS = 10
+# the number of embeddings sampled per list to train k-means
+KMEANS_SAMPLES_PER_LIST = 256
+# the number of queries answered together
+QUERY_CHUNK_SIZE = 1 << 10
+# the measures an index is built for
+METRICS = (EmbeddingMeasure.COSINE, EmbeddingMeasure.DOT)
+
+VECTOR_DTYPE = np.dtype('<f4')
+INDPTR_DTYPE = np.dtype('<i8')
+IDS_DTYPE = np.dtype('<i4')
+
+MAGIC = b'NWINDEX\x00'
+FORMAT_VERSION = 1
+# magic, version, metric, embeddings, dimensions, lists
+HEADER = struct.Struct('<8sIIqqq')
+
+_worker_state: Optional[Tuple['IVFIndex', CSRGraph]] = None
+
+
+class IVFIndex:
+    def __init__(self, centroids: np.ndarray, indptr: np.ndarray,
+                 ids: np.ndarray, vectors: np.ndarray,
+                 metric: EmbeddingMeasure = EmbeddingMeasure.COSINE):
+        """create an index from its arrays, see build
+
+        Parameters
+        ----------
+        centroids : np.ndarray
+            the centroid of every list
+        indptr : np.ndarray
+            the embeddings of list l are vectors[indptr[l]:indptr[l + 1]]
+        ids : np.ndarray
+            the node id of every embedding in vectors
+        vectors : np.ndarray
+            the embeddings ordered by list, normalized for COSINE
+        metric : EmbeddingMeasure, default EmbeddingMeasure.COSINE
+            COSINE or DOT
+        """
+        if metric not in METRICS:
+            raise ValueError("unsupported metric {}".format(metric))
+        if len(indptr) != len(centroids) + 1 or len(ids) != len(vectors):
+            raise ValueError("inconsistent index arrays")
+        self.centroids = centroids
+        self.indptr = indptr
+        self.ids = ids
+        self.vectors = vectors
+        self.metric = metric
+        self.__positions: Optional[np.ndarray] = None
+        self._file: Optional[str] = None
+
+    @classmethod
+    def build(cls, embeddings: np.ndarray,
+              num_of_lists: Optional[int] = None,
+              metric: EmbeddingMeasure = EmbeddingMeasure.COSINE,
+              iterations: int = KMEANS_ITERATIONS,
+              seed: Optional[int] = None) -> 'IVFIndex':
+        """cluster the embeddings into the lists of a new index
+
+        Parameters
+        ----------
+        embeddings : np.ndarray
+            the embedding matrix, a row per node id
+        num_of_lists : Optional[int], default None
+            the number of lists, the square root of the number of
+            embeddings when None
+        metric : EmbeddingMeasure, default EmbeddingMeasure.COSINE
+            COSINE or DOT
+        iterations : int, default KMEANS_ITERATIONS
+            the number of k-means iterations
+        seed : Optional[int], default None
+            the seed of the k-means sampling
+
+        Returns
+        -------
+        IVFIndex
+            the index
+        """
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if vectors.ndim != 2 or len(vectors) == 0:
+            raise ValueError("embeddings must be a non empty matrix")
+        if metric not in METRICS:
+            raise ValueError("unsupported metric {}".format(metric))
+        if num_of_lists is None:
+            num_of_lists = max(1, int(np.sqrt(len(vectors))))
+        for name, value in (("num_of_lists", num_of_lists),
+                            ("iterations", iterations)):
+            if not isinstance(value, int):
+                raise TypeError("{} must be integer".format(name))
+            if value <= 0:
+                raise ValueError("{} must be greater than zero".format(name))
+        if metric == EmbeddingMeasure.COSINE:
+            vectors = _normalize(vectors)
+        num_of_lists = min(num_of_lists, len(vectors))
+        rng = np.random.default_rng(seed)
+        sample = vectors
+        if len(vectors) > num_of_lists * KMEANS_SAMPLES_PER_LIST:
+            sample = vectors[np.sort(rng.choice(
+                len(vectors), num_of_lists * KMEANS_SAMPLES_PER_LIST,
+                replace=False))]
+        centroids = _kmeans(sample, num_of_lists, iterations,
+                            metric == EmbeddingMeasure.COSINE, rng)
+        assignments = _nearest(vectors, centroids)
+        order = np.argsort(assignments, kind='stable')
+        indptr = np.zeros(num_of_lists + 1, dtype=INDPTR_DTYPE)
+        np.cumsum(np.bincount(assignments, minlength=num_of_lists),
+                  out=indptr[1:])
+        return cls(centroids, indptr, order.astype(IDS_DTYPE),
+                   vectors[order], metric)
+
+    def get_vectors_count(self) -> int:
+        """
+        return the number of indexed embeddings
+        """
+        return len(self.vectors)
+
+    def get_lists_count(self) -> int:
+        """
+        return the number of lists
+        """
+        return len(self.centroids)
+
+    def search(self, queries: np.ndarray, k: int, probes: int = PROBES) \
+            -> Tuple[np.ndarray, np.ndarray]:
+        """find the k most similar embeddings of every query
+
+        Parameters
+        ----------
+        queries : np.ndarray
+            the query embeddings, a row per query
+        k : int
+            the number of neighbours of every query
+        probes : int, default PROBES
+            the number of lists scored for every query
+
+        Returns
+        -------
+        Tuple[np.ndarray, np.ndarray]
+            the node ids and the scores, (queries x k) matrices ordered from
+            the best score. Missing neighbours have id -1 and score -inf
+        """
+        self.__validate(k, probes)
+        queries = np.asarray(queries, dtype=np.float32)
+        if queries.ndim != 2 or \
+                queries.shape[1] != self.centroids.shape[1]:
+            raise ValueError("queries must be a matrix of embeddings")
+        if self.metric == EmbeddingMeasure.COSINE:
+            queries = _normalize(queries)
+        ids = np.empty((len(queries), k), dtype=np.int64)
+        scores = np.empty((len(queries), k), dtype=np.float32)
+        for start in range(0, len(queries), QUERY_CHUNK_SIZE):
+            chunk = slice(start, start + QUERY_CHUNK_SIZE)
+            ids[chunk], scores[chunk] = self._search(queries[chunk], k,
+                                                     probes)
+        return ids, scores
+
+    def most_similar(self, G: Union[Graph, CSRGraph], node: str, k: int,
+                     probes: int = PROBES) -> List[Tuple[str, float]]:
+        """find the k nodes with the most similar embeddings to a node
+
+        Parameters
+        ----------
+        G : Union[Graph, CSRGraph]
+            the graph of the embeddings, its CSRGraph maps the labels to the
+            node ids
+        node : str
+            the node, not returned itself
+        k : int
+            the number of similar nodes
+        probes : int, default PROBES
+            the number of lists scored
+
+        Returns
+        -------
+        List[Tuple[str, float]]
+            the similar nodes and their scores, best first
+        """
+        self.__validate(k, probes)
+        csr = self.__graph(G)
+        source = np.array([csr.get_node_id(node)])
+        ids, scores = self._search(self.__vectors_of(source), k, probes,
+                                   np.array([0, 1]), source)
+        labels = csr.get_labels()
+        return [(labels[i], score) for i, score in
+                zip(ids[0].tolist(), scores[0].tolist()) if i >= 0]
+
+    def recommend(self, G: Union[Graph, CSRGraph], k: int,
+                  nodes: Optional[Iterable[str]] = None,
+                  probes: int = PROBES, chunk_size: int = QUERY_CHUNK_SIZE,
+                  workers: int = 1) \
+            -> Iterator[List[Tuple[str, str, float]]]:
+        """generate the k most similar new links of every node, the node
+        itself and its out going neighbours are excluded
+
+        Parameters
+        ----------
+        G : Union[Graph, CSRGraph]
+            the graph of the embeddings, its CSRGraph maps the labels to the
+            node ids and gives the existing neighbours
+        k : int
+            the number of links kept for every node
+        nodes : Optional[Iterable[str]], default None
+            the source nodes, all nodes of the graph when None. Nodes not in
+            the graph have no links
+        probes : int, default PROBES
+            the number of lists scored for every node
+        chunk_size : int, default QUERY_CHUNK_SIZE
+            the number of source nodes per generated chunk
+        workers : int, default 1
+            the number of processes answering the chunks
+
+        Returns
+        -------
+        Iterator[List[Tuple[str, str, float]]]
+            chunks of links (src_node, dst_node, score), grouped by the
+            source node in the given order, best first
+        """
+        self.__validate(k, probes)
+        for name, value in (("chunk_size", chunk_size),
+                            ("workers", workers)):
+            if not isinstance(value, int):
+                raise TypeError("{} must be integer".format(name))
+            if value <= 0:
+                raise ValueError("{} must be greater than zero".format(name))
+        csr = self.__graph(G)
+        if nodes is None:
+            sources = np.arange(csr.get_nodes_count(), dtype=np.int64)
+        else:
+            sources = np.array([csr.get_node_id(node, -1) for node in nodes],
+                               dtype=np.int64)
+            sources = sources[sources >= 0]
+        tasks = [(sources[start:start + chunk_size], k, probes)
+                 for start in range(0, len(sources), chunk_size)]
+        return self.__generate_links(csr, tasks, workers)
+
+    def __generate_links(self, csr: CSRGraph,
+                         tasks: List[Tuple[np.ndarray, int, int]],
+                         workers: int) \
+            -> Iterator[List[Tuple[str, str, float]]]:
+        """
+        run the recommend tasks in order, in a process pool when workers is
+        greater than one, and convert the results to labels
+        """
+        labels = csr.get_labels()
+        if workers == 1 or len(tasks) <= 1:
+            for task in tasks:
+                yield _to_links(labels, task[0],
+                                *self._recommend(csr, *task))
+            return
+        with multiprocessing.get_context().Pool(
+                min(workers, len(tasks)), _init_worker, (self, csr)) as pool:
+            for task, result in zip(tasks, pool.imap(_recommend_task,
+                                                     tasks)):
+                yield _to_links(labels, task[0], *result)
+
+    def _recommend(self, csr: CSRGraph, sources: np.ndarray, k: int,
+                   probes: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        the top k new links of the source ids as (ids, scores) matrices
+        """
+        counts = csr.indptr[sources + 1] - csr.indptr[sources]
+        # every source excludes itself and then its neighbours
+        indptr = np.zeros(len(sources) + 1, dtype=np.int64)
+        np.cumsum(counts + 1, out=indptr[1:])
+        excluded = np.empty(indptr[-1], dtype=np.int64)
+        excluded[indptr[:-1]] = sources
+        neighbours = np.ones(len(excluded), dtype=bool)
+        neighbours[indptr[:-1]] = False
+        excluded[neighbours] = gather_neighbours(csr.indptr, csr.indices,
+                                                 sources)[0]
+        return self._search(self.__vectors_of(sources), k, probes, indptr,
+                            excluded)
+
+    def _search(self, queries: np.ndarray, k: int, probes: int,
+                excluded_indptr: Optional[np.ndarray] = None,
+                excluded: Optional[np.ndarray] = None) \
+            -> Tuple[np.ndarray, np.ndarray]:
+        """
+        the k best (ids, scores) of a chunk of prepared queries. The node
+        ids excluded[excluded_indptr[q]:excluded_indptr[q + 1]] are not
+        returned for the query q
+        """
+        num_of_queries = len(queries)
+        best_ids = np.full((num_of_queries, k), -1, dtype=np.int64)
+        best_scores = np.full((num_of_queries, k), -np.inf,
+                              dtype=np.float32)
+        if num_of_queries == 0 or self.get_vectors_count() == 0:
+            return best_ids, best_scores
+        extra = np.zeros(num_of_queries, dtype=np.int64)
+        keys = np.empty(0, dtype=np.int64)
+        if excluded is not None:
+            extra = np.diff(excluded_indptr)
+            keys = np.sort(np.repeat(np.arange(num_of_queries), extra) *
+                           self.get_vectors_count() + excluded)
+        probes = min(probes, self.get_lists_count())
+        list_scores = queries @ self.centroids.T
+        probed = np.argpartition(-list_scores, probes - 1, axis=1)[
+            :, :probes] if probes < self.get_lists_count() else \
+            np.broadcast_to(np.arange(probes), list_scores.shape)
+        # the queries probing each list, grouped by list
+        lists = probed.ravel()
+        order = np.argsort(lists, kind='stable')
+        lists = lists[order]
+        rows = np.repeat(np.arange(num_of_queries), probes)[order]
+        bounds = np.flatnonzero(np.diff(lists, prepend=-1, append=-1))
+        for begin, end in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+            lo, hi = self.indptr[lists[begin]], self.indptr[lists[begin] + 1]
+            if lo == hi:
+                continue
+            members = rows[begin:end]
+            scores = queries[members] @ self.vectors[lo:hi].T
+            # enough candidates remain after removing the excluded ones
+            take = min(hi - lo, k + int(extra[members].max()))
+            top = np.argpartition(-scores, take - 1, axis=1)[:, :take] \
+                if take < hi - lo else \
+                np.broadcast_to(np.arange(hi - lo), scores.shape)
+            scores = np.take_along_axis(scores, top, axis=1)
+            ids = self.ids[lo:hi][top].astype(np.int64)
+            if len(keys):
+                found = np.isin(members[:, None] *
+                                self.get_vectors_count() + ids, keys)
+                scores[found] = -np.inf
+            scores = np.concatenate((best_scores[members], scores), axis=1)
+            ids = np.concatenate((best_ids[members], ids), axis=1)
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            best_scores[members] = np.take_along_axis(scores, top, axis=1)
+            best_ids[members] = np.take_along_axis(ids, top, axis=1)
+        order = np.argsort(-best_scores, axis=1, kind='stable')
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        best_ids = np.take_along_axis(best_ids, order, axis=1)
+        best_ids[np.isneginf(best_scores)] = -1
+        return best_ids, best_scores
+
+    def __vectors_of(self, node_ids: np.ndarray) -> np.ndarray:
+        """
+        a helper method to return the indexed embeddings of node ids
+        """
+        if self.__positions is None:
+            self.__positions = np.empty(len(self.ids), dtype=np.int64)
+            self.__positions[self.ids] = np.arange(len(self.ids))
+        return self.vectors[self.__positions[node_ids]]
+
+    def __graph(self, G: Union[Graph, CSRGraph]) -> CSRGraph:
+        """
+        a helper method to return the CSRGraph matching the embeddings
+        """
+        csr = G.to_csr()
+        if csr.get_nodes_count() != self.get_vectors_count():
+            raise ValueError("the graph does not match the embeddings")
+        return csr
+
+    def __validate(self, k: int, probes: int):
+        """
+        a helper method to check the query parameters
+        """
+        for name, value in (("k", k), ("probes", probes)):
+            if not isinstance(value, int):
+                raise TypeError("{} must be integer".format(name))
+            if value <= 0:
+                raise ValueError("{} must be greater than zero".format(name))
+
+    def save(self, file: str):
+        """write the index to a binary file, see the module docstring for
+        the layout
+
+        Parameters
+        ----------
+        file : str
+            file location
+        """
+        with open(file, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION, self.metric.value,
+                                self.get_vectors_count(),
+                                self.centroids.shape[1],
+                                self.get_lists_count()))
+            for array, dtype in ((self.centroids, VECTOR_DTYPE),
+                                 (self.indptr, INDPTR_DTYPE),
+                                 (self.ids, IDS_DTYPE),
+                                 (self.vectors, VECTOR_DTYPE)):
+                section = np.asarray(array).astype(dtype,
+                                                   copy=False).tobytes()
+                f.write(section)
+                f.write(b'\0' * (-len(section) % 8))
+
+    @classmethod
+    def load(cls, file: str, mmap: bool = True) -> 'IVFIndex':
+        """open an index written by save
+
+        Parameters
+        ----------
+        file : str
+            file location
+        mmap : bool, default True
+            map the file with np.memmap, the arrays are read-only views of
+            the mapped pages and are shared by all processes opening the
+            same file. When False the file is read into memory
+
+        Returns
+        -------
+        IVFIndex
+            the index
+        """
+        data = np.memmap(file, dtype=np.uint8, mode='r').view(np.ndarray) \
+            if mmap else np.fromfile(file, dtype=np.uint8)
+        if len(data) < HEADER.size:
+            raise ValueError("{} is not a netwalk index file".format(file))
+        magic, version, metric, num_of_vectors, dimensions, num_of_lists = \
+            HEADER.unpack(data[:HEADER.size].tobytes())
+        if magic != MAGIC:
+            raise ValueError("{} is not a netwalk index file".format(file))
+        if version != FORMAT_VERSION:
+            raise ValueError("unsupported index file version {}"
+                             .format(version))
+        position = HEADER.size
+
+        def section(dtype, count: int) -> np.ndarray:
+            nonlocal position
+            size = dtype.itemsize * count
+            if position + size > len(data):
+                raise ValueError("{} is truncated".format(file))
+            array = data[position:position + size].view(dtype)
+            position += size + (-size % 8)
+            return array
+
+        centroids = section(VECTOR_DTYPE, num_of_lists * dimensions)
+        indptr = section(INDPTR_DTYPE, num_of_lists + 1)
+        ids = section(IDS_DTYPE, num_of_vectors)
+        vectors = section(VECTOR_DTYPE, num_of_vectors * dimensions)
+        index = cls(centroids.reshape(num_of_lists, dimensions), indptr, ids,
+                    vectors.reshape(num_of_vectors, dimensions),
+                    EmbeddingMeasure(metric))
+        if mmap:
+            index._file = os.path.abspath(file)
+        return index
+
+    def __reduce_ex__(self, protocol):
+        """
+        a mapped index is pickled as its file location, so the worker
+        processes map the same pages instead of receiving copies
+        """
+        if self._file is not None:
+            return IVFIndex.load, (self._file,)
+        return super().__reduce_ex__(protocol)
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    """
+    a helper function to scale the rows to unit length, zero rows are kept
+    """
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors),
+                     where=norms > 0)
+
+
+def _nearest(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """
+    a helper function to return the closest centroid of every vector by
+    euclidean distance, in chunks to bound the score matrix
+    """
+    offsets = (centroids * centroids).sum(axis=1) / 2
+    nearest = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), QUERY_CHUNK_SIZE):
+        chunk = slice(start, start + QUERY_CHUNK_SIZE)
+        nearest[chunk] = np.argmax(vectors[chunk] @ centroids.T - offsets,
+                                   axis=1)
+    return nearest
+
+
+def _kmeans(sample: np.ndarray, num_of_lists: int, iterations: int,
+            spherical: bool, rng: np.random.Generator) -> np.ndarray:
+    """
+    a helper function to cluster the sample with Lloyd's algorithm, the
+    centroids are normalized when spherical. An empty cluster restarts
+    from a random vector of the sample
+    """
+    centroids = sample[rng.choice(len(sample), num_of_lists,
+                                  replace=False)].copy()
+    for _ in range(iterations):
+        assignments = _nearest(sample, centroids)
+        counts = np.bincount(assignments, minlength=num_of_lists)
+        order = np.argsort(assignments, kind='stable')
+        filled = np.flatnonzero(counts)
+        starts = np.cumsum(counts) - counts
+        centroids[filled] = np.add.reduceat(
+            sample[order], starts[filled], axis=0) / \
+            counts[filled, None].astype(np.float32)
+        empty = np.flatnonzero(counts == 0)
+        centroids[empty] = sample[rng.choice(len(sample), len(empty))]
+        if spherical:
+            centroids = _normalize(centroids)
+    return centroids
+
+
+def _to_links(labels, sources: np.ndarray, ids: np.ndarray,
+              scores: np.ndarray) -> List[Tuple[str, str, float]]:
+    """
+    a helper function to convert the result matrices to (src_node,
+    dst_node, score), skipping the missing neighbours
+    """
+    return [(labels[src], labels[dst], score)
+            for src, row_ids, row_scores in zip(sources.tolist(),
+                                                ids.tolist(),
+                                                scores.tolist())
+            for dst, score in zip(row_ids, row_scores) if dst >= 0]
+
+
+def _init_worker(index: IVFIndex, graph: CSRGraph):
+    """
+    pool initializer, keeps the index and the graph of the worker
+    """
+    global _worker_state
+    _worker_state = (index, graph)
+
+
+def _recommend_task(task: Tuple[np.ndarray, int, int]) \
+        -> Tuple[np.ndarray, np.ndarray]:
+    """
+    pool task, the top k new links of a chunk of source ids
+    """
+    index, graph = _worker_state
+    return index._recommend(graph, *task)
@@ -8,9 +8,11 @@
 # @Last modified time: Wed Jun 17 2020 4:23:31 PM
 #
 from .walk_strategy import Walk
+from .random_walk import RandomWalker, SHARD_SIZE
 from netwalk.utils.graph import Graph
-from typing import Dict, Callable, List
-from random import choice, random
+from netwalk.utils.csr import CSRGraph, INDICES_DTYPE
+from typing import Iterator, List, Optional, Union
+import numpy as np
 
 """
 Network feature representation sampling algorithm
@@ -19,16 +21,38 @@ This algorithm implement deepwalk algorithm. Deepwalk algorithm utilizes
 random walk to sampling features from a given network. The way that creates
 features that affected by random walk strategies (DFS, BFS), the deepth of the
 random walk.
+
+The walks are sampled by RandomWalker, which advances the walks from all the
+nodes together over the CSR arrays of the graph. Iterating the object yields
+the walks as lists of node labels, every iteration over it starts again from
+the seed, so a seeded corpus is the same in each pass of gensim.
+
+With workers greater than one the shards of walks are sampled in a process
+pool, the walks are the same for any number of workers. write_corpus writes
+them to a file for the corpus_file argument of gensim instead, so the walks
+are not fed through one Python generator, or get_walks gives the matrix of
+node ids to SkipGram, which trains on it without labels.
+
+Examples
+--------
+>> deepwalk = Deepwalk(graph, Walk.BFS, iteration=100, seed=10, workers=4)
+>> deepwalk.write_corpus("walks.txt")
+>> gensim.models.Word2Vec(corpus_file="walks.txt", workers=4)
+>> SkipGram(graph.get_nodes_count(), workers=4).train(deepwalk.get_walks())
 """
 
 
 class Deepwalk:
-    def __init__(self, G: Graph, strategy: Walk, walk_length: int = 5, iteration: int = 1, p: float = 0.5):
+    def __init__(self, G: Union[Graph, CSRGraph], strategy: Walk,
+                 walk_length: int = 5, iteration: int = 1, p: float = 0.5,
+                 seed: Optional[int] = None, workers: int = 1,
+                 shard_size: int = SHARD_SIZE, return_param: float = 1.0,
+                 inout_param: float = 1.0):
         """initialize a deepwalk object
 
         Parameters
         ----------
-        G : Graph
+        G : Union[Graph, CSRGraph]
             run a random walk by the given graph
         strategy : Walk
             the walk strategy (DFS, BFS, BFS&DFS)
@@ -38,82 +62,69 @@ class Deepwalk:
             this parameter controls the total sampling size
         p : float, default 0.5
             the probability that the random walk strategy chooses BFS and DFS
+        seed : int, default None
+            the seed of the random walks, None gives different walks in
+            every iteration over the object
+        workers : int, default 1
+            the number of processes sampling the walks
+        shard_size : int, default SHARD_SIZE
+            the number of walks sampled by a process at a time
+        return_param : float, default 1.0
+            the return parameter p of the NODE2VEC strategy
+        inout_param : float, default 1.0
+            the in-out parameter q of the NODE2VEC strategy
         """
         self.graph = G
-        self.neighbours = self.graph.get_out_adj_list()
-        self.strategies: Dict[Walk, Callable] = {}
-        self.strategies[Walk.BFS] = self.__bfs_search
-        self.strategies[Walk.DFS] = self.__dfs_search
-        self.strategies[Walk.BFS_DFS] = self.__bfs_dfs_search
         self.walk_length = walk_length
         self.probability = p
         self.iter = iteration
         self.strategy = strategy
-
-    def __bfs_search(self, node: str) -> List[str]:
-        """bfs search strategy
-
-        Parameters
-        ----------
-        node : str
-            the starting node
-
-        Returns
-        -------
-        List[str]
-            the visited node of the total steps (walk_length) 
+        self.seed = seed
+        self.workers = workers
+        self.shard_size = shard_size
+        self.return_param = return_param
+        self.inout_param = inout_param
+        # validates the parameters before the first iteration
+        self.__walker().walk_shards(iteration, workers, shard_size)
+
+    def get_walks(self) -> np.ndarray:
         """
-        return [choice([node] + self.neighbours[node])
-                for _ in range(self.walk_length)]
-
-    def __dfs_search(self, node: str) -> List[str]:
-        """dfs search
-
-        Parameters
-        ----------
-        node : str
-            the starting node
-
-        Returns
-        -------
-        List[str]
-            the visited node of the total steps (walk_length).
+        return all the walks as a (iteration * number of nodes, walk_length)
+        matrix of node ids, see RandomWalker.walk_shards
         """
-        res: List[str] = [node]
-        for _ in range(self.walk_length-1):
-            node = choice(self.neighbours[node])
-            res.append(node)
-        return res
+        shards = self.__walker().walk_shards(self.iter, self.workers,
+                                             self.shard_size)
+        return np.concatenate(
+            [np.empty((0, self.walk_length), dtype=INDICES_DTYPE)] +
+            list(shards))
 
-    def __bfs_dfs_search(self, node: str) -> List[str]:
-        """the combination of bfs and dfs search
+    def write_corpus(self, file: str) -> int:
+        """write the walks to a text file, one walk per line and the labels
+        separated by spaces, which gensim reads with corpus_file
 
         Parameters
         ----------
-        node : str
-            the starting node
+        file : str
+            the corpus location
 
         Returns
         -------
-        List[str]
-            the visited node of the total steps (walk_length).
+        int
+            the number of walks written
         """
-        res: List[str] = [node]
-
-        for _ in range(self.walk_length-1):
-            # Based on the given probability, random() generates number
-            # between (0,1), the argument probability controls how likely
-            # a bfs or dfs been selected.
-            if random() > self.probability:  # select dfs
-                node = choice(self.neighbours[node])
-                res.append(node)
-            else:  # select bfs
-                res.append(choice([node] + self.neighbours[node]))
-        return res
+        return self.__walker().write_corpus(file, self.iter, self.workers,
+                                            self.shard_size)
 
-    def __iter__(self):
-        nodes = self.graph.get_nodes()
-        for _ in range(self.iter):
-            for node in nodes:
-                sentence = self.strategies[self.strategy](node)
-                yield sentence
+    def __walker(self) -> RandomWalker:
+        """
+        a helper method to create the walk engine, seeded from the start
+        """
+        return RandomWalker(self.graph, self.strategy, self.walk_length,
+                            self.probability, self.seed, self.return_param,
+                            self.inout_param)
+
+    def __iter__(self) -> Iterator[List[str]]:
+        walker = self.__walker()
+        for walks in walker.walk_shards(self.iter, self.workers,
+                                        self.shard_size):
+            yield from walker.to_labels(walks)
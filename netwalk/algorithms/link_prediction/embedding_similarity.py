@@ -0,0 +1,189 @@
+#
+# Batch link scoring from node embeddings
+#
+# @Author: Terry Pan
+# @Date: Sun Oct 18 2026
+# @Email: pttdev123@gmail.com
+# @Last modified by: Terry Pan
+# @Last modified time: Sun Oct 18 2026 7:42:19 PM
+#
+from typing import Optional, Sequence, Tuple, Union
+from netwalk.utils.graph import Graph
+from netwalk.utils.csr import CSRGraph
+from .similarity_methods import EmbeddingMeasure
+import numpy as np
+
+"""
+EmbeddingSimilarity scores links from an embedding matrix whose row i is
+the embedding of node id i of the graph's CSRGraph, as trained by SkipGram.
+The rows of both ends of all the pairs are gathered and the scores computed
+by one vectorized call per chunk of pairs, instead of one similarity call
+per pair.
+
+COSINE and DOT compare the two embeddings. HADAMARD scores the Hadamard
+product of the embeddings (the edge features of node2vec) with a linear
+model, the weights given to the constructor, for example the coefficients
+of a fitted logistic regression. hadamard_features returns the features to
+fit such a model.
+
+The matrix is not copied and no norm is cached, the scores follow the
+embeddings while they are trained.
+
+Examples
+--------
+>> similarity = EmbeddingSimilarity(graph, model.get_embeddings())
+>> scores = similarity.compute_proximity_scores(valid_set,
+>>                                              EmbeddingMeasure.COSINE)
+>> top = top_n_indices(scores, 100)
+"""
+
+# the number of pairs whose embeddings are gathered at once
+CHUNK_SIZE = 1 << 16
+
+
+class EmbeddingSimilarity:
+    def __init__(self, G: Union[Graph, CSRGraph], embeddings: np.ndarray,
+                 weights: Optional[np.ndarray] = None):
+        """initialize the similarity object
+
+        Parameters
+        ----------
+        G : Union[Graph, CSRGraph]
+            the graph of the embeddings, its CSRGraph (see to_csr) maps the
+            labels to the rows
+        embeddings : np.ndarray
+            the embedding matrix, a row per node id
+        weights : np.ndarray, default None
+            the linear weights of the Hadamard features, needed by
+            EmbeddingMeasure.HADAMARD
+        """
+        self.graph = G.to_csr()
+        embeddings = np.asarray(embeddings)
+        if embeddings.ndim != 2 or \
+                len(embeddings) != self.graph.get_nodes_count():
+            raise ValueError("embeddings must have a row per node")
+        if weights is not None:
+            weights = np.asarray(weights, dtype=embeddings.dtype)
+            if weights.shape != embeddings.shape[1:]:
+                raise ValueError("weights must have a value per dimension")
+        self.embeddings = embeddings
+        self.weights = weights
+
+    def compute_proximity_scores(
+            self, pairs: Sequence[Tuple[str, ...]],
+            measure: Union[EmbeddingMeasure, Sequence[EmbeddingMeasure]]) \
+            -> np.ndarray:
+        """score all the given pairs at once
+
+        Parameters
+        ----------
+        pairs : Sequence[Tuple[str, ...]]
+            the given edges (src_node, dst_node, ...), extra fields like the
+            label are ignored
+        measure : Union[EmbeddingMeasure, Sequence[EmbeddingMeasure]]
+            a measurement, or several measurements from the same rows
+
+        Returns
+        -------
+        np.ndarray
+            the score of every pair, in the order of pairs. For a sequence of
+            measures, a matrix with a column per measure. A pair with a node
+            not in the graph scores 0.0
+        """
+        src, dst = self.get_pair_ids(pairs)
+        return self.compute_proximity_scores_by_ids(src, dst, measure)
+
+    def get_pair_ids(self, pairs: Sequence[Tuple[str, ...]]) \
+            -> Tuple[np.ndarray, np.ndarray]:
+        """
+        return the node ids of the ends of the pairs, -1 for a node not in
+        the graph. A fixed validation set can be looked up once
+        """
+        csr = self.graph
+        src = np.fromiter((csr.get_node_id(pair[0], -1) for pair in pairs),
+                          dtype=np.int64, count=len(pairs))
+        dst = np.fromiter((csr.get_node_id(pair[1], -1) for pair in pairs),
+                          dtype=np.int64, count=len(pairs))
+        return src, dst
+
+    def compute_proximity_scores_by_ids(
+            self, src: np.ndarray, dst: np.ndarray,
+            measure: Union[EmbeddingMeasure, Sequence[EmbeddingMeasure]]) \
+            -> np.ndarray:
+        """score pairs given as node ids, -1 stands for a node not in the
+        graph
+
+        Parameters
+        ----------
+        src : np.ndarray
+            the source node ids
+        dst : np.ndarray
+            the destination node ids, aligned with src
+        measure : Union[EmbeddingMeasure, Sequence[EmbeddingMeasure]]
+            a measurement, or several measurements from the same rows
+
+        Returns
+        -------
+        np.ndarray
+            the score of every pair, a column per measure for a sequence
+        """
+        measures = [measure] if isinstance(measure, EmbeddingMeasure) \
+            else list(measure)
+        for item in measures:
+            if not isinstance(item, EmbeddingMeasure):
+                raise ValueError("unknown measure {}".format(item))
+            if item == EmbeddingMeasure.HADAMARD and self.weights is None:
+                raise ValueError("HADAMARD needs the weights")
+        src, dst = self.__validate(src, dst)
+        scores = np.zeros((len(src), len(measures)), dtype=np.float64)
+        for start in range(0, len(src), CHUNK_SIZE):
+            chunk = slice(start, start + CHUNK_SIZE)
+            a, b = self.embeddings[src[chunk]], self.embeddings[dst[chunk]]
+            dots = np.einsum('ij,ij->i', a, b)
+            for column, item in enumerate(measures):
+                if item == EmbeddingMeasure.DOT:
+                    scores[chunk, column] = dots
+                elif item == EmbeddingMeasure.COSINE:
+                    norms = np.linalg.norm(a, axis=1) * \
+                        np.linalg.norm(b, axis=1)
+                    np.divide(dots, norms, out=scores[chunk, column],
+                              where=norms > 0)
+                else:
+                    scores[chunk, column] = (a * b) @ self.weights
+        # the rows picked by -1 are not scored
+        scores[(src < 0) | (dst < 0)] = 0.0
+        return scores[:, 0] if isinstance(measure, EmbeddingMeasure) \
+            else scores
+
+    def hadamard_features(self, src: np.ndarray, dst: np.ndarray) \
+            -> np.ndarray:
+        """return the Hadamard products of the embeddings of the pairs, a
+        row per pair. A node not in the graph (-1) has a zero embedding
+
+        Parameters
+        ----------
+        src : np.ndarray
+            the source node ids
+        dst : np.ndarray
+            the destination node ids, aligned with src
+
+        Returns
+        -------
+        np.ndarray
+            the edge features, in the dtype of the embeddings
+        """
+        src, dst = self.__validate(src, dst)
+        features = self.embeddings[src] * self.embeddings[dst]
+        features[(src < 0) | (dst < 0)] = 0
+        return features
+
+    def __validate(self, src: np.ndarray, dst: np.ndarray) \
+            -> Tuple[np.ndarray, np.ndarray]:
+        """
+        a helper method to check the node ids of the pairs
+        """
+        src = np.asarray(src, dtype=np.int64)
+        dst = np.asarray(dst, dtype=np.int64)
+        if src.shape != dst.shape:
+            raise ValueError("src and dst must have the same length")
+        return src, dst
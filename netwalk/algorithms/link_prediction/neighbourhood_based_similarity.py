@@ -7,29 +7,102 @@
 # @Last modified by: Terry Pan
 # @Last modified time: Wed Jun 17 2020 4:34:11 PM
 #
-from typing import List, Set, Callable, Dict, Tuple
+from typing import (
+    List, Set, Callable, Dict, Tuple, Union, Mapping, Optional, Sequence,
+    Iterable, Iterator)
 from netwalk.utils.graph import Graph
+from netwalk.utils.csr import CSRGraph, gather_neighbours
 from .similarity_methods import Measure
 from functools import reduce
 import math
+import multiprocessing
 import operator
+import numpy as np
 
 """
 NeighbourhoodBasedSimilarity implementation
 
 NeighbourhoodBasedSimilarity algorithms are essentially different set operation
 The core idea behind these algorithms is similar nodes have same neightbours
+
+compute_proximity_scores scores many pairs at once. The neighbour sets are
+packed once into a sorted CSR adjacency, and the common neighbours of all
+pairs are found by looking up the (node, neighbour) keys of the smaller side
+in the sorted keys of the other side. Given several measures, it computes
+all of them from this single intersection pass
+
+top_k_candidates finds the most similar new links of every node without
+scoring all pairs. Only pairs two hops apart share a neighbour, so the
+candidates are enumerated through the neighbours of every node. Neighbours
+with more than HUB_DEGREE nodes around them are expanded only when the
+degree based upper bound of the candidates they add can still beat the
+current top k of the node. Katz counts paths rather than common
+neighbours, its candidates are the nodes reached by a path of length 2 or 3
+
+Examples
+--------
+>> similarity = NeighbourhoodBasedSimilarity(graph)
+>> for links in similarity.top_k_candidates(10, Measure.ADAR, workers=4):
+>>     for src, dst, score in links:
+>>         print(src, dst, score)
 """
 
+# the number of neighbours looked up at once by the batch scoring
+CHUNK_SIZE = 1 << 22
+# the default damping factor of the truncated Katz measure
+KATZ_BETA = 0.05
+# the measures computed from the common neighbours and the set sizes
+COUNTED_MEASURES = frozenset(Measure) - {Measure.PREFERENTIAL, Measure.KATZ}
+# the measures summing a weight of every common neighbour
+WEIGHTED_MEASURES = (Measure.ADAR, Measure.RESOURCE_ALLOCATION)
+# the number of source nodes per chunk of top_k_candidates
+CANDIDATE_CHUNK_SIZE = 256
+# neighbours shared by more nodes than this are only expanded when needed
+HUB_DEGREE = 64
+
+# the similarity object of a pool worker
+_worker_similarity: Optional['NeighbourhoodBasedSimilarity'] = None
+
 
 class NeighbourhoodBasedSimilarity:
-    def __init__(self, G: Graph):
+    def __init__(self, G: Union[Graph, CSRGraph], beta: float = KATZ_BETA):
+        """initialize the similarity object
+
+        Parameters
+        ----------
+        G : Union[Graph, CSRGraph]
+            the graph whose out going neighbours are compared
+        beta : float, default KATZ_BETA
+            the damping factor of the Katz measure, paths of length l are
+            weighted by beta ** l
+        """
         self.graph = G
+        self.beta = beta
         self.measures: Dict[Measure, Callable] = {}
         self.measures[Measure.JACCARD] = self.jaccard_similarity
         self.measures[Measure.ADAR] = self.adar_similarity
         self.measures[Measure.PREFERENTIAL] = self.preferential
-        self.negibours: Dict[str, List[str]] = self.graph.get_out_adj_list()
+        self.measures[Measure.COMMON_NEIGHBOURS] = self.common_neighbours
+        self.measures[Measure.RESOURCE_ALLOCATION] = \
+            self.resource_allocation
+        self.measures[Measure.SALTON] = self.salton_similarity
+        self.measures[Measure.SORENSEN] = self.sorensen_similarity
+        self.measures[Measure.HUB_PROMOTED] = self.hub_promoted
+        self.measures[Measure.HUB_DEPRESSED] = self.hub_depressed
+        # Katz counts paths, it takes the nodes rather than their neighbours
+        self.measures[Measure.KATZ] = self.katz_similarity
+        self.negibours: Mapping[str, List[str]] = \
+            self.graph.get_out_adj_list()
+        # built by the first batch call
+        self.__csr: Optional[CSRGraph] = None
+        self.__indptr: Optional[np.ndarray] = None
+        self.__indices: Optional[np.ndarray] = None
+        self.__in_indptr: Optional[np.ndarray] = None
+        self.__in_indices: Optional[np.ndarray] = None
+        self.__keys: Optional[np.ndarray] = None
+        self.__set_sizes: Optional[np.ndarray] = None
+        self.__weights: Dict[Measure, np.ndarray] = {}
+        self.__two_hop_sizes: Optional[np.ndarray] = None
 
     def jaccard_similarity(self, setA: Set, setB: Set) -> float:
         """Jaccard similarity
@@ -94,12 +167,150 @@ class NeighbourhoodBasedSimilarity:
                                         map(self._count_neighbours,
                                             commons)), 0.0)
 
+    def common_neighbours(self, setA: Set, setB: Set) -> float:
+        """the number of common neighbours, the measure the others refine
+
+        Parameters
+        ----------
+        setA : Set
+            neighbours for one node
+        setB : Set
+            neighbours for another node
+
+        Returns
+        -------
+        float
+            the similarity score
+        """
+        return len(setA.intersection(setB))
+
+    def resource_allocation(self, setA: Set, setB: Set) -> float:
+        """resource allocation is similar to adar/adamic similarity, every
+        common neighbour passes a unit of resource evenly to its neighbours,
+        so the penalty of a big figure is 1/degree instead of 1/log(degree)
+
+        Parameters
+        ----------
+        setA : Set
+            neighbours for one node
+        setB : Set
+            neighbours for another node
+
+        Returns
+        -------
+        float
+            the similarity score
+        """
+        commons: Set = setA.intersection(setB)
+        return reduce(operator.add, map(lambda x: 1/x,
+                                        map(self._count_neighbours,
+                                            commons)), 0.0)
+
+    def salton_similarity(self, setA: Set, setB: Set) -> float:
+        """Salton (cosine) similarity, the common neighbours divided by the
+        geometric mean of the numbers of neighbours
+
+        Parameters
+        ----------
+        setA : Set
+            neighbours for one node
+        setB : Set
+            neighbours for another node
+
+        Returns
+        -------
+        float
+            the similarity score
+        """
+        return len(setA.intersection(setB)) / \
+            math.sqrt(len(setA) * len(setB))
+
+    def sorensen_similarity(self, setA: Set, setB: Set) -> float:
+        """Sørensen similarity, the common neighbours divided by the
+        arithmetic mean of the numbers of neighbours
+
+        Parameters
+        ----------
+        setA : Set
+            neighbours for one node
+        setB : Set
+            neighbours for another node
+
+        Returns
+        -------
+        float
+            the similarity score
+        """
+        return 2 * len(setA.intersection(setB)) / (len(setA) + len(setB))
+
+    def hub_promoted(self, setA: Set, setB: Set) -> float:
+        """hub promoted index, the common neighbours divided by the smaller
+        number of neighbours. Links to hubs get high scores
+
+        Parameters
+        ----------
+        setA : Set
+            neighbours for one node
+        setB : Set
+            neighbours for another node
+
+        Returns
+        -------
+        float
+            the similarity score
+        """
+        return len(setA.intersection(setB)) / min(len(setA), len(setB))
+
+    def hub_depressed(self, setA: Set, setB: Set) -> float:
+        """hub depressed index, the common neighbours divided by the larger
+        number of neighbours. Links to hubs get low scores
+
+        Parameters
+        ----------
+        setA : Set
+            neighbours for one node
+        setB : Set
+            neighbours for another node
+
+        Returns
+        -------
+        float
+            the similarity score
+        """
+        return len(setA.intersection(setB)) / max(len(setA), len(setB))
+
+    def katz_similarity(self, nodeA: str, nodeB: str) -> float:
+        """Katz similarity truncated to paths of length up to 3. It sums the
+        paths from nodeA to nodeB over the neighbours, a path of length l
+        weighted by beta ** l
+
+        Parameters
+        ----------
+        nodeA : str
+            the source node
+        nodeB : str
+            the destination node
+
+        Returns
+        -------
+        float
+            the similarity score
+        """
+        neighbour_set = self.graph.get_out_neighbour_set
+        first = neighbour_set(nodeA)
+        second = [neighbour_set(node) for node in first]
+        paths = (int(nodeB in first),
+                 sum(nodeB in nodes for nodes in second),
+                 sum(nodeB in neighbour_set(node)
+                     for nodes in second for node in nodes))
+        return sum(self.beta ** (length + 1) * count
+                   for length, count in enumerate(paths))
+
     def _count_neighbours(self, node: str) -> int:
         """
         a helper method to count number of neighours
         """
-        neighbours: List[str] = self.graph.get_out_adj_list()[node]
-        return len(neighbours)
+        return self.graph.get_out_degree(node)
 
     def compute_proximity_score(self, pair: Tuple[str, str, str],
                                 measure: Measure) -> \
@@ -112,7 +323,7 @@ class NeighbourhoodBasedSimilarity:
         pair : Tuple[str, str, str]
             the given edge (src_node, dst_node, label)
         measure : Measure
-            different measurements (Adar, Jaccard, Preferential)
+            different measurements (Adar, Jaccard, Preferential, ...)
 
         Returns
         -------
@@ -120,6 +331,582 @@ class NeighbourhoodBasedSimilarity:
             the edge with score attached
         """
         nodeA, nodeB, label = pair
+        if measure == Measure.KATZ:
+            return (nodeA, nodeB, label, self.katz_similarity(nodeA, nodeB))
         score = self.measures[measure](
-            set(self.negibours[nodeA]), set(self.negibours[nodeB]))
+            self.graph.get_out_neighbour_set(nodeA),
+            self.graph.get_out_neighbour_set(nodeB))
         return (nodeA, nodeB, label, score)
+
+    def compute_proximity_scores(self, pairs: Sequence[Tuple[str, ...]],
+                                 measure: Union[Measure, Sequence[Measure]]) \
+            -> np.ndarray:
+        """The batch version of compute_proximity_score, it scores all the
+        given pairs at once. The neighbour sets are taken from the graph at
+        the first batch call, later mutations of the graph are not reflected
+
+        Parameters
+        ----------
+        pairs : Sequence[Tuple[str, ...]]
+            the given edges (src_node, dst_node, ...), extra fields like the
+            label are ignored
+        measure : Union[Measure, Sequence[Measure]]
+            a measurement, or several measurements computed from one pass
+
+        Returns
+        -------
+        np.ndarray
+            the score of every pair, in the order of pairs. For a sequence of
+            measures, a matrix with a column per measure
+
+        Notes
+        -----
+        nodes not in the graph have no neighbours. Where the per pair method
+        raises, the batch scores are 0.0: the ratios with a zero
+        denominator, and the Adar or resource allocation term of a common
+        neighbour with too few neighbours
+        """
+        csr = self.__prepare()
+        src = np.fromiter((csr.get_node_id(pair[0], -1) for pair in pairs),
+                          dtype=np.int64, count=len(pairs))
+        dst = np.fromiter((csr.get_node_id(pair[1], -1) for pair in pairs),
+                          dtype=np.int64, count=len(pairs))
+        return self.compute_proximity_scores_by_ids(src, dst, measure)
+
+    def compute_proximity_scores_by_ids(
+            self, src: np.ndarray, dst: np.ndarray,
+            measure: Union[Measure, Sequence[Measure]]) -> np.ndarray:
+        """score pairs given as node ids of the graph's CSRGraph (see
+        to_csr), -1 stands for a node without neighbours. This avoids the
+        label lookups when scoring millions of candidate pairs
+
+        Parameters
+        ----------
+        src : np.ndarray
+            the source node ids
+        dst : np.ndarray
+            the destination node ids, aligned with src
+        measure : Union[Measure, Sequence[Measure]]
+            a measurement, or several measurements computed from one pass
+
+        Returns
+        -------
+        np.ndarray
+            the score of every pair, a column per measure for a sequence
+        """
+        measures = [measure] if isinstance(measure, Measure) \
+            else list(measure)
+        for item in measures:
+            if item not in self.measures:
+                raise ValueError("unknown measure {}".format(item))
+        self.__prepare()
+        src = np.asarray(src, dtype=np.int64)
+        dst = np.asarray(dst, dtype=np.int64)
+        if src.shape != dst.shape:
+            raise ValueError("src and dst must have the same length")
+        sizes = np.zeros(len(self.__set_sizes) + 1, dtype=np.int64)
+        sizes[:-1] = self.__set_sizes
+        # -1 picks the trailing zero
+        size_a, size_b = sizes[src], sizes[dst]
+        commons, sums = None, {}
+        if COUNTED_MEASURES.intersection(measures):
+            commons, sums = self.__intersect(
+                src, dst, size_a, size_b,
+                [item for item in WEIGHTED_MEASURES if item in measures])
+        scores = np.empty((len(src), len(measures)), dtype=np.float64)
+        for column, item in enumerate(measures):
+            scores[:, column] = self.__katz(src, dst) \
+                if item == Measure.KATZ \
+                else _score(item, commons, sums, size_a, size_b)
+        return scores[:, 0] if isinstance(measure, Measure) else scores
+
+    def __prepare(self) -> CSRGraph:
+        """
+        build the sorted neighbour sets, the set sizes and the Adar weights
+        of every node once
+        """
+        if self.__csr is not None:
+            return self.__csr
+        csr = self.graph.to_csr()
+        n = csr.get_nodes_count()
+        degrees = csr.get_out_degrees()
+        owners = np.repeat(np.arange(n, dtype=np.int64), degrees)
+        # the sorted unique keys are the neighbour sets, row by row. The
+        # keys are already grouped by owner, sorting them is cheap
+        keys = owners * n + csr.indices
+        keys.sort()
+        unique = np.ones(len(keys), dtype=bool)
+        unique[1:] = keys[1:] != keys[:-1]
+        keys = keys[unique]
+        self.__indices = keys % n
+        self.__indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(keys // n, minlength=n),
+                  out=self.__indptr[1:])
+        self.__keys = keys
+        self.__set_sizes = np.diff(self.__indptr)
+        if csr.is_directed():
+            # the nodes having a node in their neighbour set
+            reverse = self.__indices * n + keys // n
+            reverse.sort()
+            self.__in_indices = reverse % n
+            self.__in_indptr = np.zeros(n + 1, dtype=np.int64)
+            np.cumsum(np.bincount(self.__indices, minlength=n),
+                      out=self.__in_indptr[1:])
+        else:
+            self.__in_indptr, self.__in_indices = self.__indptr, \
+                self.__indices
+        # the weights count the adjacency list with duplicates, the same as
+        # _count_neighbours
+        adar = np.zeros(n, dtype=np.float64)
+        np.divide(1.0, np.log(np.maximum(degrees, 1)), out=adar,
+                  where=degrees > 1)
+        resource = np.zeros(n, dtype=np.float64)
+        np.divide(1.0, degrees, out=resource, where=degrees > 0)
+        self.__weights = {Measure.ADAR: adar,
+                          Measure.RESOURCE_ALLOCATION: resource}
+        # the number of paths of length 2 starting from every node
+        self.__two_hop_sizes = np.bincount(
+            keys // n, self.__set_sizes[self.__indices], minlength=n)\
+            .astype(np.int64) if n > 0 else np.zeros(0, dtype=np.int64)
+        self.__csr = csr
+        return csr
+
+    def __intersect(self, src: np.ndarray, dst: np.ndarray,
+                    size_a: np.ndarray, size_b: np.ndarray,
+                    weighted: Sequence[Measure]) \
+            -> Tuple[np.ndarray, Dict[Measure, np.ndarray]]:
+        """
+        count the common neighbours of every pair, and sum their weights
+        of the weighted measures. The neighbours of the node with the
+        smaller set are looked up in the keys of the other node, CHUNK_SIZE
+        neighbours at a time
+        """
+        commons = np.zeros(len(src), dtype=np.int64)
+        sums = {measure: np.zeros(len(src), dtype=np.float64)
+                for measure in weighted}
+        smaller = size_a <= size_b
+        counts = np.where(smaller, size_a, size_b)
+        pairs = np.flatnonzero((counts > 0) & (src >= 0) & (dst >= 0))
+        for chunk in _split_by_cost(pairs, counts[pairs]):
+            lookup = np.where(smaller[chunk], src[chunk], dst[chunk])
+            other = np.where(smaller[chunk], dst[chunk], src[chunk])
+            neighbours, owners = gather_neighbours(
+                self.__indptr, self.__indices, lookup, positions=True)
+            hit = self.__has_edges(other[owners], neighbours)
+            commons[chunk] = np.bincount(owners[hit], minlength=len(chunk))
+            for measure in weighted:
+                sums[measure][chunk] = np.bincount(
+                    owners[hit], self.__weights[measure][neighbours[hit]],
+                    minlength=len(chunk))
+        return commons, sums
+
+    def __katz(self, src: np.ndarray, dst: np.ndarray) -> np.ndarray:
+        """
+        the truncated Katz scores. A walk of up to 2 steps from the source
+        is a path when its last node has the destination as a neighbour,
+        which is looked up in the sorted (pair, node) keys of those nodes,
+        CHUNK_SIZE walks at a time
+        """
+        scores = np.zeros(len(src), dtype=np.float64)
+        pairs = np.flatnonzero((src >= 0) & (dst >= 0))
+        costs = self.__set_sizes[src[pairs]] + \
+            self.__two_hop_sizes[src[pairs]]
+        n = len(self.__set_sizes)
+        for chunk in _split_by_cost(pairs, costs):
+            ends, owners = gather_neighbours(
+                self.__in_indptr, self.__in_indices, dst[chunk],
+                positions=True)
+            ends += owners * n
+            first, owners = gather_neighbours(
+                self.__indptr, self.__indices, src[chunk], positions=True)
+            second, positions = gather_neighbours(
+                self.__indptr, self.__indices, first, positions=True)
+            paths = np.zeros(len(chunk), dtype=np.float64)
+            for length, (nodes, walks) in enumerate((
+                    (src[chunk], np.arange(len(chunk))),
+                    (first, owners),
+                    (second, owners[positions]))):
+                hit = _contains(ends, walks * n + nodes)
+                paths += np.bincount(walks[hit], minlength=len(chunk)) * \
+                    self.beta ** (length + 1)
+            scores[chunk] = paths
+        return scores
+
+    def __has_edges(self, src: np.ndarray, dst: np.ndarray) -> np.ndarray:
+        """
+        return whether dst is in the neighbour set of src, for every pair
+        """
+        return _contains(self.__keys, src * len(self.__set_sizes) + dst)
+
+    def top_k_candidates(self, k: int, measure: Measure,
+                         nodes: Optional[Iterable[str]] = None,
+                         chunk_size: int = CANDIDATE_CHUNK_SIZE,
+                         workers: int = 1) \
+            -> Iterator[List[Tuple[str, str, float]]]:
+        """generate the k most similar new links of every node. Candidates
+        are the nodes which are not yet neighbours and share a neighbour
+        with the node, the other pairs score 0.0 on the measures counting
+        common neighbours. For Katz, candidates are the nodes reached by a
+        path of length 2 or 3, which are all the pairs with a non zero
+        score. The scores are the same as compute_proximity_scores
+
+        Parameters
+        ----------
+        k : int
+            the number of links kept for every node
+        measure : Measure
+            different measurements (Adar, Jaccard, Preferential, ...).
+            Preferential scores every pair by the set sizes, its links are
+            still taken among the nodes sharing a neighbour only
+        nodes : Optional[Iterable[str]], default None
+            the source nodes, all nodes of the graph when None. Nodes not in
+            the graph have no candidates
+        chunk_size : int, default CANDIDATE_CHUNK_SIZE
+            the number of source nodes per generated chunk
+        workers : int, default 1
+            the number of processes scoring the chunks
+
+        Returns
+        -------
+        Iterator[List[Tuple[str, str, float]]]
+            chunks of links (src_node, dst_node, score), grouped by the
+            source node in the given order, best first. Ties are broken by
+            the order of dst_node in the graph's CSRGraph
+        """
+        for name, value in (("k", k), ("chunk_size", chunk_size),
+                            ("workers", workers)):
+            if not isinstance(value, int):
+                raise TypeError("{} must be integer".format(name))
+            if value <= 0:
+                raise ValueError("{} must be greater than zero".format(name))
+        if measure not in self.measures:
+            raise ValueError("unknown measure {}".format(measure))
+        csr = self.__prepare()
+        if nodes is None:
+            sources = np.arange(csr.get_nodes_count(), dtype=np.int64)
+        else:
+            sources = np.array([csr.get_node_id(node, -1) for node in nodes],
+                               dtype=np.int64)
+            sources = sources[sources >= 0]
+        tasks = [(sources[start:start + chunk_size], k, measure)
+                 for start in range(0, len(sources), chunk_size)]
+        return self.__generate_links(csr, tasks, workers)
+
+    def __generate_links(self, csr: CSRGraph,
+                         tasks: List[Tuple[np.ndarray, int, Measure]],
+                         workers: int) \
+            -> Iterator[List[Tuple[str, str, float]]]:
+        """
+        run the top k tasks in order, in a process pool when workers is
+        greater than one, and convert the results to labels
+        """
+        labels = csr.get_labels()
+        if workers == 1 or len(tasks) <= 1:
+            for task in tasks:
+                yield _to_links(labels, *self._top_k(*task))
+            return
+        with multiprocessing.get_context().Pool(
+                min(workers, len(tasks)), _init_worker,
+                (csr, self.beta)) as pool:
+            for result in pool.imap(_top_k_task, tasks):
+                yield _to_links(labels, *result)
+
+    def _top_k(self, sources: np.ndarray, k: int, measure: Measure) \
+            -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        the top k links of the source ids as (src, dst, score) arrays. The
+        candidates are counted through the light neighbours first, their
+        partial scores are lower bounds and adding the hubs of the source
+        gives upper bounds. The hubs are expanded only for the sources whose
+        bound on the candidates reached only through hubs reaches their k-th
+        lower bound, those sources are counted again through all their
+        neighbours. For the other sources, only the candidates whose upper
+        bound reaches it are scored exactly
+        """
+        self.__prepare()
+        neighbours, positions = gather_neighbours(
+            self.__indptr, self.__indices, sources, positions=True)
+        # the sorted (position, neighbour) keys of the sources
+        adjacent = positions * len(self.__set_sizes) + neighbours
+        weighted = [measure] if measure in WEIGHTED_MEASURES else []
+        if measure == Measure.KATZ:
+            owners, candidates, scores = self.__katz_candidates(
+                sources, neighbours, positions, adjacent)
+            owners, candidates, scores = _select(owners, candidates, scores,
+                                                 k)
+            return sources[owners], candidates, scores
+        if measure not in COUNTED_MEASURES:
+            # the score is not bounded by the common neighbours
+            owners, candidates, _, _ = self.__candidates(
+                sources, neighbours, positions, adjacent, weighted)
+            scores = self.compute_proximity_scores_by_ids(
+                sources[owners], candidates, measure)
+            owners, candidates, scores = _select(owners, candidates, scores,
+                                                 k)
+            return sources[owners], candidates, scores
+        hubs = np.diff(self.__in_indptr)[neighbours] > HUB_DEGREE
+        hub_counts = np.bincount(positions[hubs], minlength=len(sources))
+        hub_sums = {item: np.bincount(
+            positions[hubs], self.__weights[item][neighbours[hubs]],
+            minlength=len(sources)) for item in weighted}
+        owners, candidates, commons, sums = self.__candidates(
+            sources, neighbours[~hubs], positions[~hubs], adjacent, weighted)
+        size_a = self.__set_sizes[sources[owners]]
+        size_b = self.__set_sizes[candidates]
+        scores = _score(measure, commons, sums, size_a, size_b)
+        thresholds = _kth_scores(owners, scores, k, len(sources))
+        upper = _score(measure,
+                       np.minimum(commons + hub_counts[owners],
+                                  np.minimum(size_a, size_b)),
+                       {item: sums[item] + hub_sums[item][owners]
+                        for item in weighted}, size_a, size_b)
+        bounds = _hub_bounds(measure, hub_counts, hub_sums,
+                             self.__set_sizes[sources])
+        expand = (hub_counts > 0) & _reaches(bounds, thresholds)
+        keep = ~expand[owners] & _reaches(upper, thresholds[owners])
+        rescore = keep & (hub_counts[owners] > 0)
+        scores[rescore] = self.compute_proximity_scores_by_ids(
+            sources[owners[rescore]], candidates[rescore], measure)
+        expanded = expand[positions]
+        extra_owners, extra_candidates, commons, sums = self.__candidates(
+            sources, neighbours[expanded], positions[expanded], adjacent,
+            weighted)
+        extra_scores = _score(measure, commons, sums,
+                              self.__set_sizes[sources[extra_owners]],
+                              self.__set_sizes[extra_candidates])
+        owners = np.concatenate((owners[keep], extra_owners))
+        candidates = np.concatenate((candidates[keep], extra_candidates))
+        scores = np.concatenate((scores[keep], extra_scores))
+        # every source has k exact scores not below its k-th lower bound
+        top = _reaches(scores, thresholds[owners])
+        owners, candidates, scores = _select(owners[top], candidates[top],
+                                             scores[top], k)
+        return sources[owners], candidates, scores
+
+    def __candidates(self, sources: np.ndarray, neighbours: np.ndarray,
+                     positions: np.ndarray, adjacent: np.ndarray,
+                     weighted: Sequence[Measure]) \
+            -> Tuple[np.ndarray, np.ndarray, np.ndarray,
+                     Dict[Measure, np.ndarray]]:
+        """
+        find the nodes sharing the neighbours with the sources at the
+        positions, skipping the source itself and its neighbours, which are
+        given by their sorted adjacent keys. Every occurrence of a pair is a
+        common neighbour. Returns the positions, the candidates, the number
+        of the neighbours shared by each pair and their weight sums of the
+        weighted measures
+        """
+        n = len(self.__set_sizes)
+        others, owners = gather_neighbours(
+            self.__in_indptr, self.__in_indices, neighbours, positions=True)
+        keys = positions[owners] * n + others
+        order = np.argsort(keys, kind='stable')
+        keys = keys[order]
+        starts = np.flatnonzero(np.diff(keys, prepend=-1))
+        commons = np.diff(starts, append=len(keys))
+        shared = neighbours[owners[order]]
+        sums = {measure: np.add.reduceat(self.__weights[measure][shared],
+                                         starts)
+                if len(keys) > 0 else np.zeros(0) for measure in weighted}
+        keys = keys[starts]
+        positions, others = keys // n, keys % n
+        new = (others != sources[positions]) & ~_contains(adjacent, keys)
+        return positions[new], others[new], commons[new], \
+            {measure: values[new] for measure, values in sums.items()}
+
+    def __katz_candidates(self, sources: np.ndarray, neighbours: np.ndarray,
+                          positions: np.ndarray, adjacent: np.ndarray) \
+            -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        find the nodes reached from the sources at the positions by the
+        walks of 2 and 3 steps, skipping the source itself and its
+        neighbours, which are given by their sorted adjacent keys. The
+        neighbour sets hold no duplicates, so every walk is a path. The
+        paths of length 2 are counted per (position, node) key, and a key
+        passes its count on to the neighbours of its node, so the walks of
+        3 steps are never listed one by one. Both steps expand about
+        CHUNK_SIZE neighbours at a time. Returns the positions, the
+        candidates and their Katz scores
+        """
+        n = len(self.__set_sizes)
+        middle = np.zeros(0, dtype=np.int64)
+        middle_paths = np.zeros(0, dtype=np.float64)
+        for chunk in _split_by_cost(np.arange(len(neighbours)),
+                                    self.__set_sizes[neighbours]):
+            second, owners = gather_neighbours(
+                self.__indptr, self.__indices, neighbours[chunk],
+                positions=True)
+            middle, middle_paths = _add_counts(
+                middle, middle_paths, positions[chunk][owners] * n + second,
+                np.ones(len(second)))
+        ends = np.zeros(0, dtype=np.int64)
+        end_paths = np.zeros(0, dtype=np.float64)
+        for chunk in _split_by_cost(np.arange(len(middle)),
+                                    self.__set_sizes[middle % n]):
+            third, owners = gather_neighbours(
+                self.__indptr, self.__indices, middle[chunk] % n,
+                positions=True)
+            ends, end_paths = _add_counts(
+                ends, end_paths, middle[chunk][owners] // n * n + third,
+                middle_paths[chunk][owners])
+        keys, inverse = np.unique(np.concatenate((middle, ends)),
+                                  return_inverse=True)
+        paths = np.zeros((2, len(keys)), dtype=np.float64)
+        paths[0, inverse[:len(middle)]] = middle_paths
+        paths[1, inverse[len(middle):]] = end_paths
+        # the scores summed in the order of compute_proximity_scores
+        scores = paths[0] * self.beta ** 2 + paths[1] * self.beta ** 3
+        positions, others = keys // n, keys % n
+        new = (others != sources[positions]) & ~_contains(adjacent, keys)
+        return positions[new], others[new], scores[new]
+
+def _split_by_cost(pairs: np.ndarray, costs: np.ndarray) \
+        -> List[np.ndarray]:
+    """
+    a helper function to split the pairs into chunks costing about
+    CHUNK_SIZE each
+    """
+    if len(pairs) == 0:
+        return []
+    ends = np.cumsum(costs)
+    bounds = np.searchsorted(
+        ends, np.arange(CHUNK_SIZE, ends[-1], CHUNK_SIZE), 'right')
+    return [chunk for chunk in np.split(pairs, bounds) if len(chunk) > 0]
+
+
+def _add_counts(keys: np.ndarray, counts: np.ndarray, new_keys: np.ndarray,
+                new_counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    a helper function to add the counts of new_keys, which may repeat, to
+    the counts of the sorted unique keys
+    """
+    keys, inverse = np.unique(np.concatenate((keys, new_keys)),
+                              return_inverse=True)
+    return keys, np.bincount(inverse, np.concatenate((counts, new_counts)),
+                             minlength=len(keys))
+
+
+def _contains(sorted_keys: np.ndarray, keys: np.ndarray) -> np.ndarray:
+    """
+    a helper function to return whether each key is in sorted_keys
+    """
+    if len(sorted_keys) == 0:
+        return np.zeros(len(keys), dtype=bool)
+    found = np.searchsorted(sorted_keys, keys)
+    found[found == len(sorted_keys)] = 0
+    return sorted_keys[found] == keys
+
+
+def _score(measure: Measure, commons: Optional[np.ndarray],
+           sums: Dict[Measure, np.ndarray], size_a: np.ndarray,
+           size_b: np.ndarray) -> np.ndarray:
+    """
+    a helper function to compute the scores of a measure from the common
+    neighbour counts, the weight sums and the neighbour set sizes of the
+    pairs. Katz is not computed from them
+    """
+    if measure == Measure.PREFERENTIAL:
+        return (size_a * size_b).astype(np.float64)
+    if measure in sums:
+        return sums[measure]
+    if measure == Measure.COMMON_NEIGHBOURS:
+        return commons.astype(np.float64)
+    if measure == Measure.JACCARD:
+        denominators = size_a + size_b - commons
+    elif measure == Measure.SALTON:
+        denominators = np.sqrt(size_a * size_b)
+    elif measure == Measure.SORENSEN:
+        denominators = (size_a + size_b) / 2
+    elif measure == Measure.HUB_PROMOTED:
+        denominators = np.minimum(size_a, size_b)
+    elif measure == Measure.HUB_DEPRESSED:
+        denominators = np.maximum(size_a, size_b)
+    else:
+        raise ValueError("{} is not computed from the common neighbours"
+                         .format(measure))
+    scores = np.zeros(len(commons), dtype=np.float64)
+    np.divide(commons, denominators, out=scores, where=denominators > 0)
+    return scores
+
+
+def _hub_bounds(measure: Measure, hub_counts: np.ndarray,
+                hub_sums: Dict[Measure, np.ndarray],
+                sizes: np.ndarray) -> np.ndarray:
+    """
+    a helper function to bound the score of the candidates sharing only hubs
+    with the sources, c <= hub_counts. Also the candidate has at least c
+    neighbours
+    """
+    if measure in hub_sums:
+        return hub_sums[measure]
+    if measure == Measure.COMMON_NEIGHBOURS:
+        return hub_counts.astype(np.float64)
+    if measure == Measure.HUB_PROMOTED:
+        return (hub_counts > 0).astype(np.float64)
+    sizes = np.maximum(sizes, 1)
+    if measure == Measure.SALTON:
+        return np.sqrt(hub_counts / sizes)
+    if measure == Measure.SORENSEN:
+        return 2 * hub_counts / (sizes + hub_counts)
+    # Jaccard and hub depressed are at most c / |A|
+    return hub_counts / sizes
+
+
+def _reaches(scores: np.ndarray, thresholds: np.ndarray) -> np.ndarray:
+    """
+    a helper function to return whether the scores are not below the
+    thresholds, allowing for the rounding of sums added in another order
+    """
+    return (scores >= thresholds) | np.isclose(scores, thresholds)
+
+
+def _kth_scores(owners: np.ndarray, scores: np.ndarray, k: int,
+                size: int) -> np.ndarray:
+    """
+    a helper function to return the k-th largest score of every owner in
+    range(size), -1 for owners with fewer than k scores
+    """
+    order = np.lexsort((-scores, owners))
+    owners, scores = owners[order], scores[order]
+    kth = np.arange(len(owners)) - np.searchsorted(owners, owners) == k - 1
+    thresholds = np.full(size, -1.0)
+    thresholds[owners[kth]] = scores[kth]
+    return thresholds
+
+
+def _select(owners: np.ndarray, candidates: np.ndarray, scores: np.ndarray,
+            k: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    a helper function to keep the k best candidates of every owner, sorted
+    by owner, then by score descending and candidate
+    """
+    order = np.lexsort((candidates, -scores, owners))
+    owners, candidates, scores = owners[order], candidates[order], \
+        scores[order]
+    keep = np.arange(len(owners)) - np.searchsorted(owners, owners) < k
+    return owners[keep], candidates[keep], scores[keep]
+
+
+def _to_links(labels: Sequence[str], src: np.ndarray, dst: np.ndarray,
+              scores: np.ndarray) -> List[Tuple[str, str, float]]:
+    """
+    a helper function to convert id arrays to (src_node, dst_node, score)
+    """
+    return [(labels[a], labels[b], score) for a, b, score in
+            zip(src.tolist(), dst.tolist(), scores.tolist())]
+
+
+def _init_worker(graph: CSRGraph, beta: float):
+    """
+    pool initializer, builds the similarity object of the worker once
+    """
+    global _worker_similarity
+    _worker_similarity = NeighbourhoodBasedSimilarity(graph, beta)
+
+
+def _top_k_task(task: Tuple[np.ndarray, int, Measure]) \
+        -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    pool task, the top k links of a chunk of source ids
+    """
+    return _worker_similarity._top_k(*task)
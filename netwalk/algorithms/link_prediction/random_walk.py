@@ -0,0 +1,538 @@
+#
+# Vectorized random walk engine
+#
+# @Author: Terry Pan
+# @Date: Sun Oct 18 2026
+# @Email: pttdev123@gmail.com
+# @Last modified by: Terry Pan
+# @Last modified time: Sun Oct 18 2026 4:02:37 PM
+#
+from typing import BinaryIO, Iterator, List, Optional, Sequence, Tuple, \
+    Union
+import multiprocessing
+from .walk_strategy import Walk
+from .alias import build_alias_tables, sample_alias, PROB_DTYPE, \
+    ALIAS_DTYPE
+from netwalk.utils.cache import LRUCache
+from netwalk.utils.graph import Graph
+from netwalk.utils.csr import CSRGraph, INDICES_DTYPE
+import numpy as np
+
+"""
+RandomWalker samples random walks over the CSR arrays of a graph. Instead of
+walking node by node, all walkers advance one step at a time: a random
+offset into indptr/indices is drawn for every walker at once and the
+visited node ids are written into a preallocated int matrix, one row per
+walk.
+
+The strategies are the ones of Deepwalk:
+    BFS     every step picks a node from the closed neighbourhood of the
+            start node (the node itself or one of its neighbours)
+    DFS     every step moves to a random neighbour of the current node
+    BFS_DFS with probability 1 - p a DFS step, otherwise a node from the
+            closed neighbourhood of the current node, which does not move
+
+    NODE2VEC the second order walk of node2vec: after moving from t to v,
+            the next node x is drawn with weight w(v, x) / return_param
+            when x is t, w(v, x) when x is a neighbour of t and
+            w(v, x) / inout_param otherwise
+
+On a weighted graph the DFS steps and the first step of NODE2VEC pick a
+neighbour with probability proportional to the edge weight. A DFS step from
+a node without neighbours ends the walk, the rest of its row is filled with
+PAD. The same seed always gives the same walks.
+
+The weighted and the biased steps sample from alias tables in O(1). The
+tables of the nodes and of the edges are packed in arrays aligned with the
+CSR indices, the table of an edge (t, v) has one entry per neighbour of v,
+so all of them together take sum of squared degrees entries. The edges to
+a node with more than lazy_degree neighbours get their table on first use
+instead, kept in an LRU cache, which bounds the memory on graphs with hubs.
+The tables are built by the first walk that needs them.
+
+walk_shards splits the walks into shards of shard_size walks, each with its
+own random stream derived from the seed and the shard index, and samples
+them in a process pool. The shards do not depend on the number of workers,
+so the walks are the same for any workers. write_corpus writes them as a
+text corpus (one walk per line, labels separated by spaces) for the
+corpus_file argument of gensim, the workers also format the text.
+
+Examples
+--------
+>> walker = RandomWalker(graph, Walk.DFS, walk_length=10, seed=42)
+>> walks = walker.walks(iteration=10)
+>> walker.to_labels(walks[0])
+>> walker.write_corpus("walks.txt", iteration=10, workers=4)
+"""
+
+# the id filling the rest of a walk that reached a node without neighbours
+PAD = -1
+# the number of walks of each shard sampled by the pool
+SHARD_SIZE = 1 << 16
+# the edges to nodes of a higher degree get their alias table lazily
+LAZY_DEGREE = 64
+# the number of lazily built edge tables kept
+EDGE_TABLE_CACHE_SIZE = 1 << 10
+# the number of edge table entries built at a time
+TABLE_CHUNK_SIZE = 1 << 22
+
+_worker_walker: Optional['RandomWalker'] = None
+
+
+class RandomWalker:
+    def __init__(self, G: Union[Graph, CSRGraph], strategy: Walk = Walk.DFS,
+                 walk_length: int = 5, p: float = 0.5,
+                 seed: Union[None, int, np.random.SeedSequence] = None,
+                 return_param: float = 1.0, inout_param: float = 1.0,
+                 lazy_degree: Optional[int] = LAZY_DEGREE):
+        """create a walk engine over the CSR arrays of the graph
+
+        Parameters
+        ----------
+        G : Union[Graph, CSRGraph]
+            the graph to walk on, a Graph is converted with to_csr
+        strategy : Walk, default Walk.DFS
+            the walk strategy (DFS, BFS, BFS&DFS)
+        walk_length : int, default 5
+            the number of nodes of each walk
+        p : float, default 0.5
+            the probability that the BFS_DFS strategy takes a BFS step
+        seed : Union[None, int, np.random.SeedSequence], default None
+            the seed of the random generator, None for a fresh one
+        return_param : float, default 1.0
+            the return parameter p of node2vec, a higher value makes going
+            back to the previous node less likely
+        inout_param : float, default 1.0
+            the in-out parameter q of node2vec, a higher value keeps the
+            walk closer to the previous node (BFS like), a lower value
+            moves it further away (DFS like)
+        lazy_degree : int, default LAZY_DEGREE
+            the edges to nodes with more neighbours get their alias table
+            on first use, None builds all of them up front
+        """
+        if not isinstance(strategy, Walk):
+            raise TypeError("strategy must be Walk")
+        if not isinstance(walk_length, int):
+            raise TypeError("walk_length must be integer")
+        if walk_length <= 0:
+            raise ValueError("walk_length must be greater than zero")
+        if not 0 <= p <= 1:
+            raise ValueError("p must be between zero and one")
+        if return_param <= 0:
+            raise ValueError("return_param must be greater than zero")
+        if inout_param <= 0:
+            raise ValueError("inout_param must be greater than zero")
+        if lazy_degree is not None and not isinstance(lazy_degree, int):
+            raise TypeError("lazy_degree must be integer")
+        self.graph = G.to_csr()
+        self.strategy = strategy
+        self.walk_length = walk_length
+        self.probability = p
+        self.return_param = return_param
+        self.inout_param = inout_param
+        self.lazy_degree = lazy_degree
+        self.__indptr = self.graph.indptr
+        self.__indices = self.graph.indices
+        self.__degrees = self.graph.get_out_degrees()
+        # built by the first walk that needs them
+        self.__node_tables: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        self.__edge_tables: \
+            Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+        self.__edge_cache: LRUCache[Tuple[np.ndarray, np.ndarray]] = \
+            LRUCache(EDGE_TABLE_CACHE_SIZE)
+        self.__keys: Optional[np.ndarray] = None
+        self.__sources: Optional[np.ndarray] = None
+        if not isinstance(seed, np.random.SeedSequence):
+            seed = np.random.SeedSequence(seed)
+        # the shard streams are derived from the entropy of the seed
+        self.__entropy = seed.entropy
+        self.__rng = np.random.default_rng(seed)
+        self.__labels: Optional[np.ndarray] = None
+
+    def reseed(self, seed: Union[None, int, np.random.SeedSequence]):
+        """
+        restart the random generator of walk from the seed
+        """
+        self.__rng = np.random.default_rng(seed)
+
+    def walk(self, starts: Sequence[int],
+             out: Optional[np.ndarray] = None) -> np.ndarray:
+        """sample one walk from each start node id
+
+        Parameters
+        ----------
+        starts : Sequence[int]
+            the node ids the walks start from
+        out : np.ndarray, default None
+            a (len(starts), walk_length) int matrix the walks are written
+            into, allocated when not given
+
+        Returns
+        -------
+        np.ndarray
+            the walks, row i starts from starts[i]
+        """
+        starts = np.asarray(starts, dtype=np.int64)
+        shape = (len(starts), self.walk_length)
+        if out is None:
+            out = np.empty(shape, dtype=INDICES_DTYPE)
+        elif out.shape != shape:
+            raise ValueError("out must have shape {}".format(shape))
+        if self.strategy == Walk.BFS:
+            for step in range(self.walk_length):
+                out[:, step] = self.__closed_neighbour(starts)
+            return out
+        out[:, 0] = starts
+        if self.strategy == Walk.NODE2VEC:
+            edges = np.full(len(starts), -1, dtype=np.int64)
+            for step in range(1, self.walk_length):
+                edges = self.__next_edge(starts) if step == 1 \
+                    else self.__second_order_edge(edges)
+                out[:, step] = self.__edge_target(edges)
+            return out
+        current = starts
+        for step in range(1, self.walk_length):
+            if self.strategy == Walk.DFS:
+                current = self.__neighbour(current)
+                out[:, step] = current
+                continue
+            dfs = self.__rng.random(len(current)) > self.probability
+            bfs = ~dfs & (current != PAD)
+            current = current.copy()
+            current[dfs] = self.__neighbour(current[dfs])
+            out[:, step] = current
+            out[bfs, step] = self.__closed_neighbour(current[bfs])
+        return out
+
+    def walks(self, iteration: int = 1) -> np.ndarray:
+        """sample iteration walks from every node
+
+        Parameters
+        ----------
+        iteration : int, default 1
+            the number of walks started from each node
+
+        Returns
+        -------
+        np.ndarray
+            a (iteration * number of nodes, walk_length) int matrix, the
+            walks of each iteration visit the node ids in order
+        """
+        if not isinstance(iteration, int):
+            raise TypeError("iteration must be integer")
+        if iteration <= 0:
+            raise ValueError("iteration must be greater than zero")
+        num_of_nodes = self.graph.get_nodes_count()
+        starts = np.arange(num_of_nodes)
+        out = np.empty((iteration * num_of_nodes, self.walk_length),
+                       dtype=INDICES_DTYPE)
+        for i in range(iteration):
+            self.walk(starts, out[i * num_of_nodes:(i + 1) * num_of_nodes])
+        return out
+
+    def walk_shards(self, iteration: int = 1, workers: int = 1,
+                    shard_size: int = SHARD_SIZE) -> Iterator[np.ndarray]:
+        """sample iteration walks from every node in shards, in a process
+        pool when workers is greater than one
+
+        Parameters
+        ----------
+        iteration : int, default 1
+            the number of walks started from each node
+        workers : int, default 1
+            the number of processes
+        shard_size : int, default SHARD_SIZE
+            the number of walks of each shard
+
+        Returns
+        -------
+        Iterator[np.ndarray]
+            the walk matrices of the shards in order, together the rows
+            visit the node ids in order iteration times. The result only
+            depends on the seed and shard_size
+        """
+        return self.__generate(self.__shards(iteration, workers, shard_size,
+                                             False), workers)
+
+    def write_corpus(self, file: Union[str, BinaryIO], iteration: int = 1,
+                     workers: int = 1, shard_size: int = SHARD_SIZE) -> int:
+        """write the walks of walk_shards as a text corpus, one walk per
+        line and the labels separated by spaces, the format read by the
+        corpus_file argument of gensim
+
+        Parameters
+        ----------
+        file : Union[str, BinaryIO]
+            the corpus location, or a binary stream to write into
+        iteration : int, default 1
+            the number of walks started from each node
+        workers : int, default 1
+            the number of processes, which also format the text
+        shard_size : int, default SHARD_SIZE
+            the number of walks of each shard
+
+        Returns
+        -------
+        int
+            the number of walks written
+        """
+        tasks = self.__shards(iteration, workers, shard_size, True)
+        if isinstance(file, str):
+            with open(file, 'wb') as f:
+                return self.write_corpus(f, iteration, workers, shard_size)
+        for text in self.__generate(tasks, workers):
+            file.write(text)
+        return tasks[-1][1] if tasks else 0
+
+    def _walk_shard(self, start: int, stop: int,
+                    seed: np.random.SeedSequence, text: bool) \
+            -> Union[np.ndarray, bytes]:
+        """
+        the walks start..stop of walk_shards, counted over the node ids
+        iteration times, as a matrix or as corpus text
+        """
+        self.reseed(seed)
+        starts = np.arange(start, stop) % self.graph.get_nodes_count()
+        walks = self.walk(starts)
+        if not text:
+            return walks
+        return "".join(" ".join(walk) + "\n"
+                       for walk in self.to_labels(walks)).encode('utf-8')
+
+    def __shards(self, iteration: int, workers: int, shard_size: int,
+                 text: bool) \
+            -> List[Tuple[int, int, np.random.SeedSequence, bool]]:
+        """
+        a helper method to validate the parameters and split the walks into
+        shard tasks, each with the stream of its index
+        """
+        for name, value in (("iteration", iteration), ("workers", workers),
+                            ("shard_size", shard_size)):
+            if not isinstance(value, int):
+                raise TypeError("{} must be integer".format(name))
+            if value <= 0:
+                raise ValueError("{} must be greater than zero".format(name))
+        total = iteration * self.graph.get_nodes_count()
+        return [(start, min(start + shard_size, total),
+                 np.random.SeedSequence(self.__entropy,
+                                        spawn_key=(start // shard_size,)),
+                 text)
+                for start in range(0, total, shard_size)]
+
+    def __generate(self, tasks: List[Tuple[int, int,
+                                           np.random.SeedSequence, bool]],
+                   workers: int) -> Iterator[Union[np.ndarray, bytes]]:
+        """
+        run the shard tasks in order, in a process pool when workers is
+        greater than one
+        """
+        if workers == 1 or len(tasks) <= 1:
+            for task in tasks:
+                yield self._walk_shard(*task)
+            return
+        with multiprocessing.get_context().Pool(
+                min(workers, len(tasks)), _init_worker,
+                (self.graph, self.strategy, self.walk_length,
+                 self.probability, self.return_param, self.inout_param,
+                 self.lazy_degree)) as pool:
+            yield from pool.imap(_walk_task, tasks)
+
+    def to_labels(self, walks: np.ndarray) -> list:
+        """
+        convert a walk or a matrix of walks to node labels, dropping PAD
+        """
+        if self.__labels is None:
+            self.__labels = np.array(list(self.graph.get_labels()),
+                                     dtype=object)
+        if walks.ndim == 1:
+            return self.__labels[walks[walks != PAD]].tolist()
+        rows = self.__labels[walks].tolist()
+        lengths = (walks != PAD).sum(axis=1)
+        if (lengths == walks.shape[1]).all():
+            return rows
+        return [row[:length] for row, length in zip(rows, lengths.tolist())]
+
+    def __neighbour(self, nodes: np.ndarray) -> np.ndarray:
+        """
+        a helper method to pick a random neighbour of each node, PAD for PAD
+        and for nodes without neighbours
+        """
+        return self.__edge_target(self.__next_edge(nodes))
+
+    def __edge_target(self, edges: np.ndarray) -> np.ndarray:
+        """
+        a helper method to return the node each edge position points to,
+        PAD for -1
+        """
+        picked = np.full(len(edges), PAD, dtype=np.int64)
+        picked[edges >= 0] = self.__indices[edges[edges >= 0]]
+        return picked
+
+    def __next_edge(self, nodes: np.ndarray) -> np.ndarray:
+        """
+        a helper method to pick a random out going edge position of each
+        node, by weight on a weighted graph. -1 for PAD and for nodes
+        without neighbours
+        """
+        degrees = np.where(nodes != PAD, self.__degrees[nodes], 0)
+        found = degrees > 0
+        starts = self.__indptr[nodes[found]]
+        if self.graph.weights is None:
+            offsets = (self.__rng.random(len(starts)) *
+                       degrees[found]).astype(np.int64)
+        else:
+            if self.__node_tables is None:
+                self.__node_tables = build_alias_tables(self.__indptr,
+                                                        self.graph.weights)
+            offsets = sample_alias(starts, degrees[found],
+                                   *self.__node_tables, self.__rng)
+        edges = np.full(len(nodes), -1, dtype=np.int64)
+        edges[found] = starts + offsets
+        return edges
+
+    def __second_order_edge(self, edges: np.ndarray) -> np.ndarray:
+        """
+        a helper method to pick the next edge position of each walk that
+        came through the edge, by the node2vec bias. -1 ends a walk
+        """
+        if self.__edge_tables is None:
+            self.__edge_tables = self.__build_edge_tables()
+        table_indptr, prob, alias = self.__edge_tables
+        nodes = self.__edge_target(edges)
+        degrees = np.where(nodes != PAD, self.__degrees[nodes], 0)
+        sizes = table_indptr[edges + 1] - table_indptr[np.maximum(edges, 0)]
+        picked = np.full(len(edges), -1, dtype=np.int64)
+        built = sizes > 0
+        picked[built] = self.__indptr[nodes[built]] + sample_alias(
+            table_indptr[edges[built]], sizes[built], prob, alias,
+            self.__rng)
+        lazy = np.flatnonzero((degrees > 0) & ~built)
+        if len(lazy):
+            distinct, inverse = np.unique(edges[lazy], return_inverse=True)
+            table_indptr, prob, alias = self.__lazy_tables(distinct)
+            picked[lazy] = self.__indptr[nodes[lazy]] + sample_alias(
+                table_indptr[inverse], degrees[lazy], prob, alias,
+                self.__rng)
+        return picked
+
+    def __lazy_tables(self, edges: np.ndarray) \
+            -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        a helper method to return the tables of the lazy edges packed
+        together, the missing ones are built at once and cached
+        """
+        cache = self.__edge_cache
+        # the cached tables are taken before any insertion evicts them
+        tables = {edge: cache.get(edge, None) for edge in edges.tolist()
+                  if edge in cache}
+        missing = np.array([edge for edge in edges.tolist()
+                            if edge not in tables], dtype=np.int64)
+        table_indptr, prob, alias = self.__build_tables(missing)
+        for k, edge in enumerate(missing.tolist()):
+            table = slice(table_indptr[k], table_indptr[k + 1])
+            tables[edge] = (prob[table].copy(), alias[table].copy())
+            cache.get(edge, lambda: tables[edge])
+        packed = [tables[edge] for edge in edges.tolist()]
+        sizes = [len(table[0]) for table in packed]
+        return (np.concatenate(([0], np.cumsum(sizes)[:-1])),
+                np.concatenate([table[0] for table in packed]),
+                np.concatenate([table[1] for table in packed]))
+
+    def __build_edge_tables(self) \
+            -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        a helper method to build the alias tables of the edges to nodes of
+        at most lazy_degree neighbours, in chunks of entries. The tables of
+        the other edges are empty
+        """
+        sizes = self.__degrees[self.__indices]
+        if self.lazy_degree is not None:
+            sizes[sizes > self.lazy_degree] = 0
+        table_indptr = np.concatenate(([0], np.cumsum(sizes)))
+        prob = np.empty(table_indptr[-1], dtype=PROB_DTYPE)
+        alias = np.empty(table_indptr[-1], dtype=ALIAS_DTYPE)
+        cuts = np.unique(np.append(np.searchsorted(
+            table_indptr, np.arange(0, table_indptr[-1], TABLE_CHUNK_SIZE),
+            'right') - 1, len(sizes)))
+        edges = np.flatnonzero(sizes)
+        bounds = np.searchsorted(edges, cuts).tolist()
+        for k, (start, stop) in enumerate(zip(cuts[:-1].tolist(),
+                                              cuts[1:].tolist())):
+            chunk = slice(table_indptr[start], table_indptr[stop])
+            prob[chunk], alias[chunk] = self.__build_tables(
+                edges[bounds[k]:bounds[k + 1]])[1:]
+        return table_indptr, prob, alias
+
+    def __build_tables(self, edges: np.ndarray) \
+            -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        a helper method to build the alias tables of the edges, one entry
+        per neighbour of the edge target, packed in the order of edges
+        """
+        sizes = self.__degrees[self.__indices[edges]]
+        table_indptr = np.concatenate(([0], np.cumsum(sizes)))
+        owners = np.repeat(edges, sizes)
+        local = np.arange(table_indptr[-1]) - \
+            np.repeat(table_indptr[:-1], sizes)
+        return (table_indptr,) + build_alias_tables(
+            table_indptr, self.__biased_weights(owners, local))
+
+    def __biased_weights(self, edges: np.ndarray,
+                         local: np.ndarray) -> np.ndarray:
+        """
+        a helper method to return the node2vec weight of moving to the
+        local-th neighbour of the target of each edge
+        """
+        num_of_nodes = self.graph.get_nodes_count()
+        if self.__keys is None:
+            self.__sources = np.repeat(
+                np.arange(num_of_nodes, dtype=np.int64), self.__degrees)
+            self.__keys = np.sort(self.__sources * num_of_nodes +
+                                  self.__indices)
+        sources = self.__sources[edges]
+        positions = self.__indptr[self.__indices[edges]] + local
+        targets = self.__indices[positions].astype(np.int64)
+        keys = sources * num_of_nodes + targets
+        # searching sorted keys keeps the lookups cache friendly
+        order = np.argsort(keys)
+        found = np.searchsorted(self.__keys, keys[order])
+        adjacent = np.empty(len(keys), dtype=bool)
+        adjacent[order] = np.append(self.__keys, -1)[found] == keys[order]
+        bias = np.where(targets == sources, 1 / self.return_param,
+                        np.where(adjacent, 1.0, 1 / self.inout_param))
+        if self.graph.weights is None:
+            return bias
+        return bias * self.graph.weights[positions]
+
+    def __closed_neighbour(self, nodes: np.ndarray) -> np.ndarray:
+        """
+        a helper method to pick each node itself or one of its neighbours
+        with equal chance
+        """
+        degrees = self.__degrees[nodes]
+        offsets = (self.__rng.random(len(nodes)) *
+                   (degrees + 1)).astype(np.int64)
+        neighbour = offsets < degrees
+        picked = nodes.copy()
+        picked[neighbour] = self.__indices[
+            self.__indptr[nodes[neighbour]] + offsets[neighbour]]
+        return picked
+
+
+def _init_worker(graph: CSRGraph, strategy: Walk, walk_length: int,
+                 p: float, return_param: float, inout_param: float,
+                 lazy_degree: Optional[int]):
+    """
+    pool initializer, builds the walk engine of the worker once
+    """
+    global _worker_walker
+    _worker_walker = RandomWalker(graph, strategy, walk_length, p, None,
+                                  return_param, inout_param, lazy_degree)
+
+
+def _walk_task(task: Tuple[int, int, np.random.SeedSequence, bool]) \
+        -> Union[np.ndarray, bytes]:
+    """
+    pool task, the walks of a shard
+    """
+    return _worker_walker._walk_shard(*task)
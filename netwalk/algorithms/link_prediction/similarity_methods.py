@@ -14,3 +14,16 @@ class Measure(enum.Enum):
     JACCARD = 1
     ADAR = 2
     PREFERENTIAL = 3
+    COMMON_NEIGHBOURS = 4
+    RESOURCE_ALLOCATION = 5
+    SALTON = 6
+    SORENSEN = 7
+    HUB_PROMOTED = 8
+    HUB_DEPRESSED = 9
+    KATZ = 10
+
+
+class EmbeddingMeasure(enum.Enum):
+    COSINE = 1
+    DOT = 2
+    HADAMARD = 3
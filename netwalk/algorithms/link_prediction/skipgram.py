@@ -0,0 +1,339 @@
+#
+# Skip-gram with negative sampling over walk matrices
+#
+# @Author: Terry Pan
+# @Date: Sun Oct 18 2026
+# @Email: pttdev123@gmail.com
+# @Last modified by: Terry Pan
+# @Last modified time: Sun Oct 18 2026 6:20:48 PM
+#
+from typing import Callable, List, Optional, Sequence, Tuple
+import multiprocessing
+from .alias import build_alias_tables, sample_alias
+from .random_walk import PAD
+import numpy as np
+
+"""
+SkipGram learns node embeddings from random walks with the skip-gram model
+of word2vec and negative sampling. It reads the walk matrix of RandomWalker
+(node ids, PAD ends a walk) directly, there are no string sentences.
+
+The (center, context) pairs of a block of walks are generated together, the
+window of each center is drawn from [1, window] like word2vec. The pairs are
+shuffled and trained in batches: the rows of a batch are gathered, the
+gradients computed with matrix operations and each row moved by the mean
+of its gradients in the batch.
+Negative nodes are drawn from the unigram distribution of the walks raised
+to the power 0.75, with an alias table.
+
+With workers greater than one the embedding matrices are placed in shared
+memory and the blocks of walks are trained by a process pool without locks
+(Hogwild), the result is then not reproducible. With one worker the same
+seed gives the same embeddings.
+
+Examples
+--------
+>> walker = RandomWalker(graph, Walk.DFS, walk_length=10, seed=1)
+>> model = SkipGram(walker.graph.get_nodes_count(), dimensions=64, seed=1)
+>> model.train(walker.walks(10), epochs=5)
+>> embeddings = model.get_embeddings()
+"""
+
+# the number of pairs of each gradient update
+BATCH_SIZE = 1 << 9
+# the number of walks of each block trained by a process
+BLOCK_SIZE = 1 << 12
+# the power applied to the node frequencies of the negative distribution
+NOISE_POWER = 0.75
+# the scores are clipped like word2vec, the gradient is flat beyond it
+MAX_SCORE = 6.0
+
+_worker_state: Optional[Tuple] = None
+
+
+class SkipGram:
+    def __init__(self, num_of_nodes: int, dimensions: int = 100,
+                 window: int = 5, negative: int = 5,
+                 learning_rate: float = 0.025,
+                 min_learning_rate: float = 0.0001,
+                 batch_size: int = BATCH_SIZE, seed: Optional[int] = None,
+                 workers: int = 1):
+        """create the untrained model
+
+        Parameters
+        ----------
+        num_of_nodes : int
+            the number of node ids, the rows of the embedding matrix
+        dimensions : int, default 100
+            the size of each embedding
+        window : int, default 5
+            the maximum distance between a center and a context node
+        negative : int, default 5
+            the number of negative nodes of each pair
+        learning_rate : float, default 0.025
+            the initial learning rate, decreased linearly while training
+        min_learning_rate : float, default 0.0001
+            the learning rate at the end of training
+        batch_size : int, default BATCH_SIZE
+            the number of pairs of each gradient update
+        seed : int, default None
+            the seed of the initial embeddings and of the sampling
+        workers : int, default 1
+            the number of processes updating the shared embeddings
+        """
+        for name, value in (("num_of_nodes", num_of_nodes),
+                            ("dimensions", dimensions), ("window", window),
+                            ("negative", negative),
+                            ("batch_size", batch_size),
+                            ("workers", workers)):
+            if not isinstance(value, int):
+                raise TypeError("{} must be integer".format(name))
+            if value <= 0 and name != "num_of_nodes":
+                raise ValueError("{} must be greater than zero".format(name))
+        if num_of_nodes < 0:
+            raise ValueError("num_of_nodes must not be negative")
+        if learning_rate <= 0 or min_learning_rate < 0:
+            raise ValueError("learning rates must be positive")
+        self.dimensions = dimensions
+        self.window = window
+        self.negative = negative
+        self.learning_rate = learning_rate
+        self.min_learning_rate = min_learning_rate
+        self.batch_size = batch_size
+        self.workers = workers
+        self.__seed = np.random.SeedSequence(seed)
+        self.__trained = 0
+        self.__losses: List[float] = []
+        rng = np.random.default_rng(self.__seed)
+        self.__buffers: List = []
+        self.__syn0 = self.__allocate(num_of_nodes)
+        self.__syn0[:] = (rng.random((num_of_nodes, dimensions),
+                                     dtype=np.float32) - 0.5) / dimensions
+        self.__syn1 = self.__allocate(num_of_nodes)
+        self.__syn1[:] = 0
+
+    def train(self, walks: np.ndarray, epochs: int = 1,
+              callbacks: Sequence[Callable[[int, 'SkipGram'], None]] = ()) \
+            -> List[float]:
+        """train the embeddings on the walks
+
+        Parameters
+        ----------
+        walks : np.ndarray
+            the walk matrix of node ids, one walk per row, PAD is skipped.
+            A memory mapped matrix is read block by block
+        epochs : int, default 1
+            the number of passes over the walks
+        callbacks : Sequence[Callable[[int, SkipGram], None]], default ()
+            called with the epoch and the model after each epoch
+
+        Returns
+        -------
+        List[float]
+            the mean loss of the pairs of each epoch
+        """
+        if not isinstance(epochs, int):
+            raise TypeError("epochs must be integer")
+        if epochs <= 0:
+            raise ValueError("epochs must be greater than zero")
+        walks = np.asarray(walks)
+        if walks.ndim != 2:
+            raise ValueError("walks must be a matrix")
+        counts = np.zeros(len(self.__syn0))
+        for start in range(0, len(walks), BLOCK_SIZE):
+            block = walks[start:start + BLOCK_SIZE]
+            counts += np.bincount(block[block != PAD].ravel(),
+                                  minlength=len(counts))
+        noise = build_alias_tables(np.array([0, len(counts)]),
+                                   counts ** NOISE_POWER)
+        blocks = list(range(0, len(walks), BLOCK_SIZE))
+        total = epochs * len(blocks)
+        losses = []
+        for epoch in range(epochs):
+            tasks = []
+            for k, start in enumerate(blocks):
+                done = epoch * len(blocks) + k
+                tasks.append((
+                    walks[start:start + BLOCK_SIZE],
+                    np.random.SeedSequence(
+                        self.__seed.entropy,
+                        spawn_key=(self.__trained + done,)),
+                    self.__learning_rate(done / total),
+                    self.__learning_rate((done + 1) / total)))
+            results = self.__run(tasks, noise)
+            pairs = sum(result[1] for result in results)
+            losses.append(sum(result[0] for result in results) / pairs
+                          if pairs else 0.0)
+            self.__losses.append(losses[-1])
+            for callback in callbacks:
+                callback(epoch, self)
+        self.__trained += total
+        return losses
+
+    def get_embeddings(self) -> np.ndarray:
+        """
+        return the float32 embedding matrix, row i is the embedding of node
+        id i
+        """
+        return self.__syn0
+
+    def get_latest_training_loss(self) -> float:
+        """
+        return the mean loss of the last trained epoch
+        """
+        return self.__losses[-1] if self.__losses else 0.0
+
+    def similarity(self, nodeA: int, nodeB: int) -> float:
+        """
+        return the cosine similarity of the embeddings of two node ids
+        """
+        a, b = self.__syn0[nodeA], self.__syn0[nodeB]
+        norm = float(np.linalg.norm(a) * np.linalg.norm(b))
+        return float(a @ b) / norm if norm else 0.0
+
+    def __learning_rate(self, progress: float) -> float:
+        """
+        a helper method to decrease the learning rate linearly
+        """
+        return max(self.min_learning_rate,
+                   self.learning_rate * (1 - progress))
+
+    def __allocate(self, num_of_nodes: int) -> np.ndarray:
+        """
+        a helper method to allocate an embedding matrix, in shared memory
+        when the pool updates it
+        """
+        shape = (num_of_nodes, self.dimensions)
+        if self.workers == 1:
+            return np.empty(shape, dtype=np.float32)
+        buffer = multiprocessing.get_context().RawArray(
+            'f', num_of_nodes * self.dimensions)
+        self.__buffers.append(buffer)
+        return np.frombuffer(buffer, dtype=np.float32).reshape(shape)
+
+    def __run(self, tasks: List[Tuple], noise: Tuple[np.ndarray, np.ndarray]) \
+            -> List[Tuple[float, int]]:
+        """
+        a helper method to train the blocks of an epoch, in a process pool
+        when workers is greater than one
+        """
+        state = (self.__syn0, self.__syn1, noise, self.window, self.negative,
+                 self.batch_size)
+        if self.workers == 1 or len(tasks) <= 1:
+            return [_train_block(state, *task) for task in tasks]
+        with multiprocessing.get_context().Pool(
+                min(self.workers, len(tasks)), _init_worker,
+                (tuple(self.__buffers), self.__syn0.shape) + state[2:]) \
+                as pool:
+            return pool.map(_train_task, tasks)
+
+
+def _train_block(state: Tuple, walks: np.ndarray,
+                 seed: np.random.SeedSequence, learning_rate: float,
+                 end_learning_rate: float) -> Tuple[float, int]:
+    """
+    train the pairs of a block of walks, the learning rate moves from
+    learning_rate to end_learning_rate. Return the loss and the number of
+    pairs
+    """
+    syn0, syn1, noise, window, negative, batch_size = state
+    rng = np.random.default_rng(seed)
+    centers, contexts = _pairs(np.asarray(walks, dtype=np.int64), window,
+                               rng)
+    order = rng.permutation(len(centers))
+    loss = 0.0
+    for start in range(0, len(order), batch_size):
+        batch = order[start:start + batch_size]
+        rate = learning_rate + (end_learning_rate - learning_rate) * \
+            start / len(order)
+        negatives = sample_alias(
+            np.zeros(len(batch) * negative, dtype=np.int64),
+            np.full(len(batch) * negative, len(syn0)), *noise,
+            rng).reshape(len(batch), negative)
+        loss += _update(syn0, syn1, centers[batch], contexts[batch],
+                        negatives, rate)
+    return loss, len(order)
+
+
+def _pairs(walks: np.ndarray, window: int, rng: np.random.Generator) \
+        -> Tuple[np.ndarray, np.ndarray]:
+    """
+    a helper function to generate the (center, context) pairs of the walks,
+    the window of each center is drawn from [1, window]
+    """
+    reduced = rng.integers(1, window + 1, size=walks.shape)
+    centers, contexts = [], []
+    for distance in range(1, min(window, walks.shape[1] - 1) + 1):
+        before, after = walks[:, :-distance], walks[:, distance:]
+        valid = (before != PAD) & (after != PAD)
+        forward = valid & (reduced[:, :-distance] >= distance)
+        backward = valid & (reduced[:, distance:] >= distance)
+        centers += [before[forward], after[backward]]
+        contexts += [after[forward], before[backward]]
+    if not centers:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(centers), np.concatenate(contexts)
+
+
+def _update(syn0: np.ndarray, syn1: np.ndarray, centers: np.ndarray,
+            contexts: np.ndarray, negatives: np.ndarray,
+            learning_rate: float) -> float:
+    """
+    a helper function to apply one gradient step of negative sampling to a
+    batch of pairs, return the loss of the batch
+    """
+    targets = np.concatenate((contexts[:, None], negatives), axis=1)
+    labels = np.zeros(targets.shape, dtype=np.float32)
+    labels[:, 0] = 1
+    hidden = syn0[centers]
+    outputs = syn1[targets]
+    scores = np.clip(np.einsum('bd,bkd->bk', hidden, outputs),
+                     -MAX_SCORE, MAX_SCORE)
+    sigmoid = 1 / (1 + np.exp(-scores))
+    gradients = ((labels - sigmoid) * learning_rate).astype(np.float32)
+    _scatter_mean(syn1, targets.ravel(),
+                  (gradients[:, :, None] * hidden[:, None, :])
+                  .reshape(-1, syn0.shape[1]))
+    _scatter_mean(syn0, centers, np.einsum('bk,bkd->bd', gradients, outputs))
+    return -float(np.log(np.where(labels > 0, sigmoid, 1 - sigmoid)).sum())
+
+
+def _scatter_mean(matrix: np.ndarray, rows: np.ndarray,
+                  updates: np.ndarray):
+    """
+    a helper function to add to each row the mean of its updates. Summing
+    them would move a frequent node by the gradients of all of its pairs
+    at once and diverge
+    """
+    order = np.argsort(rows, kind='stable')
+    rows, updates = rows[order], updates[order]
+    starts = np.flatnonzero(np.diff(rows, prepend=-1))
+    counts = np.diff(np.append(starts, len(rows)))
+    counts = np.repeat(counts, counts)
+    # most rows are updated once, they are added directly and only the
+    # repeated rows go through the slower np.add.at
+    single = counts == 1
+    matrix[rows[single]] += updates[single]
+    if not single.all():
+        repeated = ~single
+        np.add.at(matrix, rows[repeated], updates[repeated] /
+                  counts[repeated, None].astype(np.float32))
+
+
+def _init_worker(buffers: Tuple, shape: Tuple[int, int],
+                 noise: Tuple[np.ndarray, np.ndarray], window: int,
+                 negative: int, batch_size: int):
+    """
+    pool initializer, maps the shared embedding matrices of the worker once
+    """
+    global _worker_state
+    syn0, syn1 = (np.frombuffer(buffer, dtype=np.float32).reshape(shape)
+                  for buffer in buffers)
+    _worker_state = (syn0, syn1, noise, window, negative, batch_size)
+
+
+def _train_task(task: Tuple) -> Tuple[float, int]:
+    """
+    pool task, trains a block of walks on the shared embeddings
+    """
+    return _train_block(_worker_state, *task)
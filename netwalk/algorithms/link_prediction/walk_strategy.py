@@ -10,7 +10,8 @@
 import enum
 
 """
-Walk strategies for random walk
+Walk strategies for random walk, NODE2VEC is the second order walk biased
+by the return and in-out parameters of node2vec
 """
 
 
@@ -18,3 +19,4 @@ class Walk(enum.Enum):
     BFS = 1
     DFS = 2
     BFS_DFS = 3
+    NODE2VEC = 4
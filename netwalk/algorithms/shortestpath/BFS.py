@@ -1,7 +1,201 @@
 from netwalk.utils.graph import Graph
-from netwalk.utils.graph import UndiGraph
+from netwalk.utils.csr import CSRGraph, INDICES_DTYPE, gather_neighbours
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+import numpy as np
+
+"""
+Direction-optimizing BFS implementation
+
+The search advances one level at a time over the CSR arrays and every level is
+a vectorized numpy step, in one of the two directions:
+
+1. top-down: gather the out going neighbours of the frontier and keep the
+unvisited ones. The cost is the number of edges leaving the frontier (m_f).
+2. bottom-up: for every unvisited node, look for an incoming neighbour in the
+frontier. The cost is the number of edges entering unvisited nodes (m_u).
+
+On low-diameter graphs the middle levels hold most of the graph, where a
+bottom-up step checks far fewer edges. The switch follows Beamer et al.
+(Direction-Optimizing Breadth-First Search): go bottom-up when
+m_f > m_u / alpha and return to top-down when the frontier holds less than
+n / beta nodes.
+
+Examples
+--------
+>> bfs = BFS(graph)
+>> levels, parents = bfs.search('a', max_depth=3)
+"""
+
+TOP_DOWN = 'top_down'
+BOTTOM_UP = 'bottom_up'
+# the number of incoming neighbours checked one position at a time in a
+# bottom-up step before checking the rest at once
+BOTTOM_UP_ROUNDS = 4
 
 
 class BFS:
-    def __init__(self, graph: Graph):
-        self.__graph = graph
+    def __init__(self, graph: Union[Graph, CSRGraph],
+                 alpha: float = 14.0, beta: float = 24.0):
+        """create a BFS engine, the graph is converted once and shared by all
+        searches
+
+        Parameters
+        ----------
+        graph : Union[Graph, CSRGraph]
+            data source, either undigraph, digraph or the frozen CSRGraph
+        alpha : float, default 14.0
+            switch to bottom-up when the frontier edges exceed the
+            unvisited edges divided by alpha
+        beta : float, default 24.0
+            switch back to top-down when the frontier holds less than the
+            number of nodes divided by beta
+        """
+        self.__graph = graph.to_csr()
+        self.__alpha = alpha
+        self.__beta = beta
+        self.__out_degrees = self.__graph.get_out_degrees()
+        self.__in_degrees = self.__graph.get_in_degrees()
+        self.__steps: List[str] = []
+
+    def search(self, src: Union[str, Iterable[str]],
+               max_depth: Optional[int] = None) \
+            -> Tuple[np.ndarray, np.ndarray]:
+        """run the BFS search
+
+        Parameters
+        ----------
+        src : Union[str, Iterable[str]]
+            the source node, or several source nodes for a multi-source
+            search (the hops to the closest source)
+        max_depth : int, default None
+            stop after this many hops, unlimited when None
+
+        Returns
+        -------
+        Tuple[np.ndarray, np.ndarray]
+            the level (hops from the sources, -1 when not reached) and the
+            parent in the BFS tree (-1 for sources and nodes not reached) of
+            every node id
+        """
+        graph = self.__graph
+        sources = [src] if isinstance(src, str) else list(src)
+        if not sources:
+            raise ValueError("at least one source node is required")
+        if max_depth is not None and max_depth < 0:
+            raise ValueError("max_depth must not be negative")
+        source_ids = []
+        for node in sources:
+            node_id = graph.get_node_id(node, None)
+            if node_id is None:
+                raise ValueError("source node {} not in graph".format(node))
+            source_ids.append(node_id)
+
+        num_of_nodes = graph.get_nodes_count()
+        levels = np.full(num_of_nodes, -1, dtype=INDICES_DTYPE)
+        parents = np.full(num_of_nodes, -1, dtype=INDICES_DTYPE)
+        frontier = np.unique(np.array(source_ids, dtype=INDICES_DTYPE))
+        levels[frontier] = 0
+        # the number of edges entering unvisited nodes
+        unvisited_edges = int(self.__in_degrees.sum() -
+                              self.__in_degrees[frontier].sum())
+        bottom_up = False
+        depth = 0
+        self.__steps = []
+        while len(frontier) and (max_depth is None or depth < max_depth):
+            depth += 1
+            frontier_edges = int(self.__out_degrees[frontier].sum())
+            if not bottom_up:
+                bottom_up = frontier_edges > unvisited_edges / self.__alpha
+            else:
+                bottom_up = len(frontier) >= num_of_nodes / self.__beta
+            if bottom_up:
+                frontier = self.__bottom_up_step(frontier, levels, parents,
+                                                 depth)
+            else:
+                frontier = self.__top_down_step(frontier, levels, parents,
+                                                depth)
+            self.__steps.append(BOTTOM_UP if bottom_up else TOP_DOWN)
+            unvisited_edges -= int(self.__in_degrees[frontier].sum())
+        return levels, parents
+
+    def get_levels(self, src: Union[str, Iterable[str]],
+                   max_depth: Optional[int] = None) -> Dict[str, int]:
+        """
+        return the hops from the source(s) of every reached node, keyed by
+        node label
+        """
+        levels, _ = self.search(src, max_depth)
+        labels = self.__graph.get_labels()
+        reached = np.flatnonzero(levels >= 0)
+        return {labels[i]: level for i, level in
+                zip(reached.tolist(), levels[reached].tolist())}
+
+    def get_steps(self) -> List[str]:
+        """
+        return the direction (TOP_DOWN or BOTTOM_UP) of every level of the
+        last search
+        """
+        return self.__steps
+
+    def __top_down_step(self, frontier: np.ndarray, levels: np.ndarray,
+                        parents: np.ndarray, depth: int) -> np.ndarray:
+        """
+        visit the unvisited out going neighbours of the frontier, the parent
+        of a node is the first frontier node reaching it
+        """
+        graph = self.__graph
+        neighbours, owners = gather_neighbours(graph.indptr, graph.indices,
+                                               frontier)
+        unvisited = levels[neighbours] < 0
+        neighbours, owners = neighbours[unvisited], owners[unvisited]
+        new_frontier, first = np.unique(neighbours, return_index=True)
+        levels[new_frontier] = depth
+        parents[new_frontier] = owners[first]
+        return new_frontier.astype(INDICES_DTYPE)
+
+    def __bottom_up_step(self, frontier: np.ndarray, levels: np.ndarray,
+                         parents: np.ndarray, depth: int) -> np.ndarray:
+        """
+        every unvisited node looks for an incoming neighbour in the frontier,
+        the parent of a node is its first incoming neighbour in the frontier.
+
+        The first BOTTOM_UP_ROUNDS incoming neighbours are checked one
+        position at a time and nodes stop as soon as they find a parent,
+        which is where bottom-up saves work. The remaining nodes check the
+        rest of their neighbours at once.
+        """
+        graph = self.__graph
+        in_indptr, in_indices = graph.in_indptr, graph.in_indices
+        in_frontier = np.zeros(graph.get_nodes_count(), dtype=bool)
+        in_frontier[frontier] = True
+        remaining = np.flatnonzero(levels < 0).astype(INDICES_DTYPE)
+        found: List[np.ndarray] = []
+        found_parents: List[np.ndarray] = []
+        for position in range(BOTTOM_UP_ROUNDS):
+            # nodes without more incoming neighbours are not reachable now
+            remaining = remaining[self.__in_degrees[remaining] > position]
+            if not len(remaining):
+                break
+            neighbours = in_indices[in_indptr[remaining] + position]
+            hit = in_frontier[neighbours]
+            found.append(remaining[hit])
+            found_parents.append(neighbours[hit])
+            remaining = remaining[~hit]
+        else:
+            remaining = remaining[self.__in_degrees[remaining] >
+                                  BOTTOM_UP_ROUNDS]
+            neighbours, owners = gather_neighbours(
+                in_indptr, in_indices, remaining, BOTTOM_UP_ROUNDS)
+            hit = in_frontier[neighbours]
+            neighbours, owners = neighbours[hit], owners[hit]
+            # owners are sorted, keep the first hit of every owner
+            first = np.ones(len(owners), dtype=bool)
+            first[1:] = owners[1:] != owners[:-1]
+            found.append(owners[first])
+            found_parents.append(neighbours[first])
+        if not found:
+            return remaining
+        new_frontier = np.concatenate(found)
+        levels[new_frontier] = depth
+        parents[new_frontier] = np.concatenate(found_parents)
+        return new_frontier
@@ -0,0 +1,196 @@
+#
+# Bidirectional point-to-point shortest path queries
+#
+# @Author: Terry Pan
+# @Date: Sun Oct 18 2026
+# @Email: pttdev123@gmail.com
+# @Last modified by: Terry Pan
+# @Last modified time: Sun Oct 18 2026 3:05:12 PM
+#
+from netwalk.utils.graph import Graph
+from netwalk.utils.csr import CSRGraph
+from netwalk.algorithms.shortestpath.dijkstra import Dijkstra
+from typing import Callable, Dict, List, Optional, Tuple, Union
+from itertools import repeat
+import heapq
+
+"""
+Bidirectional search implementation
+
+A point-to-point query does not need the whole shortest path tree of the
+source. The bidirectional search grows one ball from the source along the out
+going edges and one ball from the target along the incoming edges, and stops
+once they meet. On low-diameter social graphs the two balls of radius d/2
+cover far fewer nodes than a single ball of radius d.
+
+Unweighted graphs use a level synchronous bidirectional BFS which always
+expands the smaller frontier, weighted graphs use a bidirectional Dijkstra
+which stops when the two heap minimums add up to the best meeting distance.
+All bookkeeping is kept in dicts, so a query costs the visited part of the
+graph only.
+
+Examples
+--------
+>> search = BidirectionalSearch(graph)
+>> distance, path = search.shortest_path('a', 'd')
+"""
+
+
+class BidirectionalSearch:
+    def __init__(self, graph: Union[Graph, CSRGraph]):
+        """create a bidirectional search, the graph is converted once and
+        shared by all queries
+
+        Parameters
+        ----------
+        graph : Union[Graph, CSRGraph]
+            data source, either undigraph, digraph or the frozen CSRGraph
+        """
+        self.__graph = graph.to_csr()
+
+    def shortest_path(self, src: str, dst: str,
+                      heuristic: Optional[Callable[[str], float]] = None) \
+            -> Tuple[float, List[str]]:
+        """find the shortest path from src to dst
+
+        Parameters
+        ----------
+        src : str
+            the source node
+        dst : str
+            the target node
+        heuristic : Callable[[str], float], default None
+            when given, an A* search guided by this estimate of the distance
+            from a node to dst is used instead of the bidirectional search
+
+        Returns
+        -------
+        Tuple[float, List[str]]
+            the distance and the nodes on the path, (inf, []) when dst is
+            unreachable
+        """
+        graph = self.__graph
+        src_id = graph.get_node_id(src, None)
+        dst_id = graph.get_node_id(dst, None)
+        if src_id is None or dst_id is None:
+            raise ValueError("both nodes must be in graph")
+        if heuristic is not None:
+            dijkstra = Dijkstra(graph, src)
+            return dijkstra.get_distance(dst, heuristic), \
+                dijkstra.get_path(dst, heuristic)
+        if src_id == dst_id:
+            return 0.0, [src]
+        if graph.is_weighted():
+            distance, meet, preds = self.__dijkstra(src_id, dst_id)
+        else:
+            distance, meet, preds = self.__bfs(src_id, dst_id)
+        if meet < 0:
+            return float('inf'), []
+        return distance, self.__build_path(meet, preds)
+
+    def __bfs(self, src: int, dst: int) \
+            -> Tuple[float, int, Tuple[Dict[int, int], Dict[int, int]]]:
+        """
+        bidirectional BFS, expands a whole level of the smaller frontier at
+        a time and returns the distance, the meeting node and the
+        predecessors of both sides
+        """
+        graph = self.__graph
+        sides = ((graph.indptr, graph.indices), (graph.in_indptr,
+                                                 graph.in_indices))
+        dists: Tuple[Dict[int, int], Dict[int, int]] = ({src: 0}, {dst: 0})
+        preds: Tuple[Dict[int, int], Dict[int, int]] = ({src: -1},
+                                                        {dst: -1})
+        frontiers = ([src], [dst])
+        while frontiers[0] and frontiers[1]:
+            side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+            indptr, indices = sides[side]
+            dist, pred = dists[side], preds[side]
+            other_dist = dists[1 - side]
+            next_frontier: List[int] = []
+            best, meet = float('inf'), -1
+            for node in frontiers[side]:
+                node_dist = dist[node] + 1
+                for neighbour in \
+                        indices[indptr[node]:indptr[node + 1]].tolist():
+                    if neighbour in dist:
+                        continue
+                    dist[neighbour] = node_dist
+                    pred[neighbour] = node
+                    next_frontier.append(neighbour)
+                    # all nodes of this level have the same distance, the
+                    # best meeting node is the closest one to the other side
+                    if neighbour in other_dist and \
+                            node_dist + other_dist[neighbour] < best:
+                        best = node_dist + other_dist[neighbour]
+                        meet = neighbour
+            if meet >= 0:
+                return float(best), meet, preds
+            frontiers = (next_frontier, frontiers[1]) if side == 0 else \
+                (frontiers[0], next_frontier)
+        return float('inf'), -1, preds
+
+    def __dijkstra(self, src: int, dst: int) \
+            -> Tuple[float, int, Tuple[Dict[int, int], Dict[int, int]]]:
+        """
+        bidirectional Dijkstra, alternates on the side with the smaller heap
+        minimum and returns the distance, the meeting node and the
+        predecessors of both sides
+        """
+        graph = self.__graph
+        sides = ((graph.indptr, graph.indices, graph.weights),
+                 (graph.in_indptr, graph.in_indices, graph.in_weights))
+        dists: Tuple[Dict[int, float], Dict[int, float]] = ({src: 0.0},
+                                                            {dst: 0.0})
+        preds: Tuple[Dict[int, int], Dict[int, int]] = ({src: -1},
+                                                        {dst: -1})
+        heaps: Tuple[List[Tuple[float, int]], List[Tuple[float, int]]] = \
+            ([(0.0, src)], [(0.0, dst)])
+        best, meet = float('inf'), -1
+        while heaps[0] and heaps[1]:
+            # no path through an unsettled node can be shorter than best
+            if heaps[0][0][0] + heaps[1][0][0] >= best:
+                break
+            side = 0 if heaps[0][0][0] <= heaps[1][0][0] else 1
+            node_dist, node = heapq.heappop(heaps[side])
+            dist, pred = dists[side], preds[side]
+            if node_dist > dist[node]:
+                # outdated entry, the node was settled with a shorter path
+                continue
+            other_dist = dists[1 - side]
+            indptr, indices, weights = sides[side]
+            start, end = indptr[node], indptr[node + 1]
+            lengths = repeat(1.0) if weights is None else \
+                weights[start:end].tolist()
+            for neighbour, length in zip(indices[start:end].tolist(),
+                                         lengths):
+                neighbour_dist = node_dist + length
+                if neighbour_dist < dist.get(neighbour, float('inf')):
+                    dist[neighbour] = neighbour_dist
+                    pred[neighbour] = node
+                    heapq.heappush(heaps[side], (neighbour_dist, neighbour))
+                if neighbour in other_dist and \
+                        dist[neighbour] + other_dist[neighbour] < best:
+                    best = dist[neighbour] + other_dist[neighbour]
+                    meet = neighbour
+        return best, meet, preds
+
+    def __build_path(self, meet: int,
+                     preds: Tuple[Dict[int, int], Dict[int, int]]) \
+            -> List[str]:
+        """
+        join the source half and the target half of the path at the meeting
+        node
+        """
+        path: List[int] = []
+        node = meet
+        while node != -1:
+            path.append(node)
+            node = preds[0][node]
+        path.reverse()
+        node = preds[1][meet]
+        while node != -1:
+            path.append(node)
+            node = preds[1][node]
+        labels = self.__graph.get_labels()
+        return [labels[node] for node in path]
@@ -1,24 +1,172 @@
 from netwalk.utils.graph import Graph
-from typing import List, Tuple
+from netwalk.utils.csr import CSRGraph
+from typing import Callable, Iterable, List, Optional, Tuple, Union
+from itertools import repeat
 import heapq
+import numpy as np
+
+"""
+Dijkstra shortest path implementation
+
+The search starts from one or more source nodes and keeps a binary heap of
+tentative distances. Nodes are pushed only when a shorter distance is found,
+outdated heap entries are skipped when popped (lazy deletion), so the heap
+never holds more than E entries and the search runs in O((V + E) log V).
+Edge weights are used when the graph carries them, otherwise every edge costs
+one.
+
+For point-to-point queries, an A* heuristic can be given. It estimates the
+remaining distance of a node to the target and orders the heap by
+dist + heuristic. The path is still the shortest one when the heuristic never
+overestimates and is consistent (h(u) <= w(u, v) + h(v)).
+
+Examples
+--------
+>> dijkstra = Dijkstra(graph, 'a')
+>> dist, pred = dijkstra.shortest_path()
+>> dijkstra.get_path('d')
+"""
 
 
 class Dijkstra:
-    def __init__(self, graph: Graph, src: str):
-        self.__graph = graph
-        self.__create_min_heap(src)
-
-    def __create_min_heap(self, src: str):
-        self.__min_heap: List[Tuple[float, str]] = []
-        for node in self.__graph.get_nodes():
-            if node == src:
-                heapq.heappush(self.__min_heap, (0, src))
-            else:
-                heapq.heappush(self.__min_heap, (float('inf'), node))
-
-    def shortest_path(self):
-        while len(self.__min_heap):
-            source_node = heapq.heappop(self.__min_heap)[1]
-
-            for neighbour in self.__graph[source_node]:
-                pass
+    def __init__(self, graph: Union[Graph, CSRGraph],
+                 src: Union[str, Iterable[str]]):
+        """create a dijkstra search
+
+        Parameters
+        ----------
+        graph : Union[Graph, CSRGraph]
+            data source, either undigraph, digraph or the frozen CSRGraph
+        src : Union[str, Iterable[str]]
+            the source node, or several source nodes for a multi-source
+            search (the distance to the closest source)
+        """
+        self.__graph = graph.to_csr()
+        sources = [src] if isinstance(src, str) else list(src)
+        if not sources:
+            raise ValueError("at least one source node is required")
+        self.__sources: List[int] = []
+        for node in sources:
+            node_id = self.__graph.get_node_id(node, None)
+            if node_id is None:
+                raise ValueError("source node {} not in graph".format(node))
+            self.__sources.append(node_id)
+        self.__dist: Optional[np.ndarray] = None
+        self.__pred: Optional[np.ndarray] = None
+        # the target of the last search, None when it settled all nodes
+        self.__target: Optional[str] = None
+
+    def shortest_path(self, target: Optional[str] = None,
+                      heuristic: Optional[Callable[[str], float]] = None) \
+            -> Tuple[np.ndarray, np.ndarray]:
+        """run the search. When target is given, the search stops as soon as
+        the target is settled: its distance and path are final, nodes not
+        settled yet keep an upper bound (or inf)
+
+        Parameters
+        ----------
+        target : str, default None
+            the node to stop at
+        heuristic : Callable[[str], float], default None
+            A* estimate of the distance from a node (label) to target.
+            Requires target
+
+        Returns
+        -------
+        Tuple[np.ndarray, np.ndarray]
+            the distance (inf when unreachable) and the predecessor on the
+            shortest path (-1 for sources and unreachable nodes) of every
+            node id
+        """
+        graph = self.__graph
+        target_id = -1 if target is None else graph.get_node_id(target, None)
+        if target_id is None:
+            raise ValueError("target node {} not in graph".format(target))
+        if heuristic is not None and target is None:
+            raise ValueError("heuristic requires a target node")
+        labels = graph.get_labels()
+        indptr, indices, weights = graph.indptr, graph.indices, graph.weights
+        num_of_nodes = graph.get_nodes_count()
+        dist: List[float] = [float('inf')] * num_of_nodes
+        pred: List[int] = [-1] * num_of_nodes
+        # entries are (priority, distance, node), the priority is the
+        # distance plus the heuristic estimate for A*
+        heap: List[Tuple[float, float, int]] = []
+        for src in self.__sources:
+            dist[src] = 0.0
+            heap.append((0.0, 0.0, src))
+        heapq.heapify(heap)
+
+        while heap:
+            _, node_dist, node = heapq.heappop(heap)
+            if node_dist > dist[node]:
+                # outdated entry, the node was settled with a shorter path
+                continue
+            if node == target_id:
+                break
+            start, end = indptr[node], indptr[node + 1]
+            lengths = repeat(1.0) if weights is None else \
+                weights[start:end].tolist()
+            for neighbour, length in zip(indices[start:end].tolist(),
+                                         lengths):
+                neighbour_dist = node_dist + length
+                if neighbour_dist < dist[neighbour]:
+                    dist[neighbour] = neighbour_dist
+                    pred[neighbour] = node
+                    priority = neighbour_dist if heuristic is None else \
+                        neighbour_dist + heuristic(labels[neighbour])
+                    heapq.heappush(heap, (priority, neighbour_dist,
+                                          neighbour))
+
+        self.__dist = np.array(dist)
+        self.__pred = np.array(pred, dtype=np.int64)
+        self.__target = target
+        return self.__dist, self.__pred
+
+    def __search(self, target: str,
+                 heuristic: Optional[Callable[[str], float]]):
+        """
+        run the search towards target unless the last search already
+        settled it
+        """
+        if self.__dist is None or self.__target not in (None, target):
+            self.shortest_path(target, heuristic)
+
+    def get_distance(self, target: str,
+                     heuristic: Optional[Callable[[str], float]] = None) \
+            -> float:
+        """
+        return the shortest distance from the source(s) to target, inf when
+        target is unreachable. See shortest_path for heuristic
+        """
+        self.__search(target, heuristic)
+        return float(self.__dist[self.__graph.get_node_id(target)])
+
+    def get_path(self, target: str,
+                 heuristic: Optional[Callable[[str], float]] = None) \
+            -> List[str]:
+        """reconstruct the shortest path from the closest source to target
+
+        Parameters
+        ----------
+        target : str
+            the destination node
+        heuristic : Callable[[str], float], default None
+            A* estimate, see shortest_path
+
+        Returns
+        -------
+        List[str]
+            the nodes on the path, starting from a source and ending with
+            target. Empty when target is unreachable
+        """
+        self.__search(target, heuristic)
+        node = self.__graph.get_node_id(target)
+        if self.__dist[node] == float('inf'):
+            return []
+        path: List[int] = []
+        while node != -1:
+            path.append(node)
+            node = int(self.__pred[node])
+        labels = self.__graph.get_labels()
+        return [labels[node] for node in reversed(path)]
@@ -0,0 +1,175 @@
+#
+# Bit-parallel multi-source BFS for many-source hop distances
+#
+# @Author: Terry Pan
+# @Date: Sun Oct 18 2026
+# @Email: pttdev123@gmail.com
+# @Last modified by: Terry Pan
+# @Last modified time: Sun Oct 18 2026 5:40:27 PM
+#
+from netwalk.utils.graph import Graph
+from netwalk.utils.csr import CSRGraph, gather_neighbours
+from typing import List, Optional, Sequence, Union
+import numpy as np
+
+"""
+Multi-source BFS (MS-BFS) implementation
+
+Hop distances from many sources (landmarks) are computed in batches of up to
+BATCH_SIZE sources. Every node keeps one 64 bits word per state, bit i
+standing for the i-th source of the batch:
+
+1. seen: the sources which already reached the node
+2. visit: the sources whose frontier holds the node at the current level
+
+One level of all the BFS of a batch is a single pass: the visit words of the
+frontier are ORed into their out going neighbours, and the bits not seen yet
+are the sources reaching the neighbour at this level. Nodes shared by the
+frontiers of several sources are expanded once per batch instead of once per
+source (Then et al., The More the Merrier: Efficient Multi-Source Graph
+Traversal).
+
+A level either pushes the frontier words along the out going edges, or, when
+the frontier is large, pulls the words of all incoming neighbours with one
+segmented OR over the CSR arrays.
+
+The distances are returned as a (sources x nodes) matrix of uint8, widened to
+uint16 once a distance does not fit. Unreachable nodes hold the maximum value
+of the dtype.
+
+Examples
+--------
+>> msbfs = MultiSourceBFS(graph)
+>> dist = msbfs.search(['a', 'b', 'c'])
+>> unreachable = dist == np.iinfo(dist.dtype).max
+"""
+
+BATCH_SIZE = 64
+# pull instead of push once the frontier holds more than this fraction of
+# the edges
+PULL_THRESHOLD = 0.1
+
+
+class MultiSourceBFS:
+    def __init__(self, graph: Union[Graph, CSRGraph]):
+        """create a multi-source BFS, the graph is converted once and shared
+        by all searches
+
+        Parameters
+        ----------
+        graph : Union[Graph, CSRGraph]
+            data source, either undigraph, digraph or the frozen CSRGraph
+        """
+        self.__graph = graph.to_csr()
+        self.__out_degrees = self.__graph.get_out_degrees()
+        in_degrees = self.__graph.get_in_degrees()
+        # reduceat needs the start of every non empty row
+        self.__pull_nodes = np.flatnonzero(in_degrees)
+        self.__pull_starts = self.__graph.in_indptr[self.__pull_nodes]
+
+    def search(self, sources: Sequence[str],
+               max_depth: Optional[int] = None) -> np.ndarray:
+        """compute the hop distances from every source to every node
+
+        Parameters
+        ----------
+        sources : Sequence[str]
+            the source nodes, row i of the result belongs to sources[i]
+        max_depth : int, default None
+            stop after this many hops, farther nodes are reported as
+            unreachable. Unlimited when None
+
+        Returns
+        -------
+        np.ndarray
+            the (len(sources), number of nodes) distance matrix indexed by
+            node id, uint8 or uint16. Unreachable nodes hold
+            np.iinfo(dtype).max
+        """
+        graph = self.__graph
+        if max_depth is not None and max_depth < 0:
+            raise ValueError("max_depth must not be negative")
+        source_ids: List[int] = []
+        for node in sources:
+            node_id = graph.get_node_id(node, None)
+            if node_id is None:
+                raise ValueError("source node {} not in graph".format(node))
+            source_ids.append(node_id)
+        if not source_ids:
+            raise ValueError("at least one source node is required")
+
+        dist = np.full((len(source_ids), graph.get_nodes_count()),
+                       np.iinfo(np.uint8).max, dtype=np.uint8)
+        for start in range(0, len(source_ids), BATCH_SIZE):
+            dist = self.__search_batch(source_ids[start:start + BATCH_SIZE],
+                                       start, dist, max_depth)
+        return dist
+
+    def __search_batch(self, source_ids: List[int], row: int,
+                       dist: np.ndarray, max_depth: Optional[int]) \
+            -> np.ndarray:
+        """
+        run the BFS of up to BATCH_SIZE sources at once and fill their rows
+        of dist starting at row, returns dist which may have been widened
+        """
+        num_of_nodes = self.__graph.get_nodes_count()
+        seen = np.zeros(num_of_nodes, dtype=np.uint64)
+        visit = np.zeros(num_of_nodes, dtype=np.uint64)
+        for bit, node in enumerate(source_ids):
+            # several sources may share the same node
+            visit[node] |= np.uint64(1) << np.uint64(bit)
+        seen |= visit
+        dist = self.__record(visit, row, 0, dist)
+        frontier = np.flatnonzero(visit)
+        level = 0
+        while len(frontier) and (max_depth is None or level < max_depth):
+            level += 1
+            visit_next = self.__expand(frontier, visit)
+            visit_next &= ~seen
+            seen |= visit_next
+            visit = visit_next
+            frontier = np.flatnonzero(visit)
+            dist = self.__record(visit, row, level, dist)
+        return dist
+
+    def __expand(self, frontier: np.ndarray, visit: np.ndarray) \
+            -> np.ndarray:
+        """
+        OR the visit words of the frontier into their out going neighbours
+        """
+        graph = self.__graph
+        num_of_nodes = graph.get_nodes_count()
+        frontier_edges = int(self.__out_degrees[frontier].sum())
+        visit_next = np.zeros(num_of_nodes, dtype=np.uint64)
+        if frontier_edges > PULL_THRESHOLD * len(graph.in_indices):
+            if len(self.__pull_nodes):
+                visit_next[self.__pull_nodes] = np.bitwise_or.reduceat(
+                    visit[graph.in_indices], self.__pull_starts)
+            return visit_next
+        neighbours, owners = gather_neighbours(graph.indptr, graph.indices,
+                                               frontier)
+        np.bitwise_or.at(visit_next, neighbours, visit[owners])
+        return visit_next
+
+    def __record(self, visit: np.ndarray, row: int, level: int,
+                 dist: np.ndarray) -> np.ndarray:
+        """
+        write level into dist for every (source, node) bit set in visit,
+        widens dist to uint16 when level does not fit
+        """
+        nodes = np.flatnonzero(visit)
+        if not len(nodes):
+            return dist
+        if level >= np.iinfo(dist.dtype).max:
+            if dist.dtype != np.uint8:
+                raise ValueError("hop distance {} does not fit in {}"
+                                 .format(level, dist.dtype))
+            unreachable = dist == np.iinfo(np.uint8).max
+            dist = dist.astype(np.uint16)
+            dist[unreachable] = np.iinfo(np.uint16).max
+        # bit i of a little endian word is bit i % 8 of byte i // 8
+        bits = np.unpackbits(visit[nodes].astype('<u8').view(np.uint8)
+                             .reshape(-1, 8), axis=1, bitorder='little')
+        node_index, bit = np.nonzero(bits)
+        dist[row + bit, nodes[node_index]] = level
+        return dist
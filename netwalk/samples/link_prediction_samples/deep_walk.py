@@ -7,7 +7,6 @@
 # @Last modified by: Terry Pan
 # @Last modified time: Thu Jun 18 2020 3:45:14 PM
 #
-from gensim.models.callbacks import CallbackAny2Vec
 import multiprocessing
 from typing import (
     List,
@@ -15,49 +14,55 @@ from typing import (
 )
 from netwalk.utils.misc import (
     link_prediction_eval,
-    top_n_rank,
-    calc_similarity_from_validation_set,
-    get_edge_without_score
+    top_n_indices,
 )
 from netwalk.utils.graph import Graph
+from netwalk.utils.csr import CSRGraph
 from netwalk.algorithms\
     .link_prediction\
     .deepwalk import Deepwalk
+from netwalk.algorithms\
+    .link_prediction\
+    .embedding_similarity import EmbeddingSimilarity
+from netwalk.algorithms\
+    .link_prediction\
+    .similarity_methods import EmbeddingMeasure
+from netwalk.algorithms\
+    .link_prediction\
+    .skipgram import SkipGram
 from netwalk.algorithms\
     .link_prediction\
     .walk_strategy import Walk
-import gensim
 
 
-class callback(CallbackAny2Vec):
+class callback:
     """
     Callback to print loss and accuracy after each epoch.
     """
 
-    def __init__(self, valid_set):
-        self.epoch = 0
-        self.loss_to_be_substracted = 0
+    def __init__(self, graph: CSRGraph, valid_set):
+        self.graph = graph
         self.validation_set = valid_set
+        self.similarity = None
+        self.pair_ids = None
 
-    def helper(self, model):
-        res: List[Tuple[str, str, str]
-                  ] = get_edge_without_score(
-                      top_n_rank(
-                          calc_similarity_from_validation_set(
-                              self.validation_set,
-                              model.similarity
-                          ), 100))
+    def helper(self, model: SkipGram):
+        # the embeddings are a view of the trained matrix, the validation
+        # pairs are looked up once and scored in one batch per epoch
+        if self.similarity is None:
+            self.similarity = EmbeddingSimilarity(self.graph,
+                                                  model.get_embeddings())
+            self.pair_ids = self.similarity.get_pair_ids(self.validation_set)
+        scores = self.similarity.compute_proximity_scores_by_ids(
+            *self.pair_ids, EmbeddingMeasure.COSINE)
+        res: List[Tuple[str, str, str]] = [
+            self.validation_set[i] for i in top_n_indices(scores, 100)]
         return link_prediction_eval(res)
 
-    def on_epoch_end(self, model):
-        loss = model.get_latest_training_loss()
-        new_loss = loss - self.loss_to_be_substracted
-        self.loss_to_be_substracted = loss
+    def __call__(self, epoch: int, model: SkipGram):
         accuracy = self.helper(model)
-        print('Loss and Accuracy after epoch {}: {}  |  {}'.format(self.epoch,
-                                                                   new_loss,
-                                                                   accuracy))
-        self.epoch += 1
+        print('Loss and Accuracy after epoch {}: {}  |  {}'.format(
+            epoch, model.get_latest_training_loss(), accuracy))
 
 
 def deep_walk_application(train_set: Graph,
@@ -77,18 +82,18 @@ def deep_walk_application(train_set: Graph,
     random_walk_params = {
         'walk_length': 5,
         'iteration': 100,
-        'strategy': Walk.BFS
+        'strategy': Walk.BFS,
+        'seed': 10,
+        'workers': multiprocessing.cpu_count()
     }
-    sentences = Deepwalk(train_set, **random_walk_params)
+    # the walks are trained as a matrix of node ids of the CSR graph
+    walks = Deepwalk(train_set, **random_walk_params).get_walks()
+    graph = train_set.to_csr()
     hyper_params = {
-        'min_count': 1,
         'workers': multiprocessing.cpu_count(),
-        'iter': 30,
         'seed': 10,
-        'sg': 1,
         'window': 4,
-        'size': 100,
-        'compute_loss': True,
-        'callbacks': [callback(valid_set)]
+        'dimensions': 100,
     }
-    _ = gensim.models.Word2Vec(sentences, **hyper_params)
+    model = SkipGram(graph.get_nodes_count(), **hyper_params)
+    model.train(walks, epochs=30, callbacks=[callback(graph, valid_set)])
@@ -8,6 +8,7 @@
 # @Last modified time: Thu Jun 18 2020 3:47:40 PM
 #
 from typing import (
+    Dict,
     List,
     Tuple,
 )
@@ -38,28 +39,41 @@ def neighbourhood_application(train_set: Graph, validation_set: List[Tuple[str,
     since neighbourhood based methods using memory based machine learning
     algorithm. Therefore, validation_set is essentially test set
     """
-    for measure in Measure:
-        scores = calc_similarity_by_measure(train_set, validation_set, measure)
+    similarity = NeighbourhoodBasedSimilarity(train_set)
+    all_scores = calc_similarity_by_measures(similarity, validation_set,
+                                             list(Measure))
+    for measure, scores in all_scores.items():
         evalation = link_prediction_eval(
             get_edge_without_score(
                 top_n_rank(scores, 100)))
         print('Accuracy for method {} is {}'.format(measure, evalation))
 
 
-def calc_similarity_by_measure(train_set: Graph,
+def calc_similarity_by_measure(similarity: NeighbourhoodBasedSimilarity,
                                validation_set: List[Tuple[str, str, str]],
                                measure: Measure) -> \
         List[Tuple[str, str, str, float]]:
     """
     A helper function
 
-    make the method neighbourhood_application calculating similarity easier
+    make the method neighbourhood_application calculating similarity easier,
+    all the pairs are scored in one batch
     """
+    return calc_similarity_by_measures(similarity, validation_set,
+                                       [measure])[measure]
 
-    similarity = NeighbourhoodBasedSimilarity(train_set)
-    scores: List[Tuple[str, str, str, float]] = []
-    for pair in validation_set:
-        scores.append(similarity.compute_proximity_score(
-            (pair[0], pair[1], pair[2]), measure))
 
-    return scores
+def calc_similarity_by_measures(similarity: NeighbourhoodBasedSimilarity,
+                                validation_set: List[Tuple[str, str, str]],
+                                measures: List[Measure]) -> \
+        Dict[Measure, List[Tuple[str, str, str, float]]]:
+    """
+    A helper function
+
+    score the pairs of every measure from one pass over the common
+    neighbours
+    """
+    scores = similarity.compute_proximity_scores(validation_set, measures)
+    return {measure: [(pair[0], pair[1], pair[2], score) for pair, score
+                      in zip(validation_set, scores[:, column].tolist())]
+            for column, measure in enumerate(measures)}
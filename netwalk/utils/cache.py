@@ -0,0 +1,79 @@
+#
+# Bounded least recently used cache
+#
+# @Author: Terry Pan
+# @Date: Sun Oct 18 2026
+# @Email: pttdev123@gmail.com
+# @Last modified by: Terry Pan
+# @Last modified time: Sun Oct 18 2026 3:05:12 PM
+#
+from typing import Callable, Generic, Hashable, TypeVar
+from collections import OrderedDict
+
+"""
+LRUCache keeps the values built for the most recently used keys, at most
+capacity of them. Unlike functools.lru_cache, single keys can be invalidated,
+which lets a mutable graph drop only the entries of the nodes an edge
+touches.
+
+Examples
+--------
+>> cache = LRUCache(1024)
+>> neighbours = cache.get(node, lambda: frozenset(adj_list.get(node, ())))
+>> cache.invalidate(node)
+"""
+
+# the default number of neighbour sets kept by a graph
+NEIGHBOUR_SET_CACHE_SIZE = 1 << 16
+
+V = TypeVar('V')
+
+
+class LRUCache(Generic[V]):
+    def __init__(self, capacity: int = NEIGHBOUR_SET_CACHE_SIZE):
+        """create an empty cache
+
+        Parameters
+        ----------
+        capacity : int, default NEIGHBOUR_SET_CACHE_SIZE
+            the maximum number of values kept, the least recently used one
+            is dropped first
+        """
+        if not isinstance(capacity, int):
+            raise TypeError("capacity must be integer")
+        if capacity <= 0:
+            raise ValueError("capacity must be greater than zero")
+        self.__capacity = capacity
+        self.__values: 'OrderedDict[Hashable, V]' = OrderedDict()
+
+    def get(self, key: Hashable, factory: Callable[[], V]) -> V:
+        """
+        return the value of key, built by factory when it is not cached
+        """
+        values = self.__values
+        if key in values:
+            values.move_to_end(key)
+            return values[key]
+        value = factory()
+        values[key] = value
+        if len(values) > self.__capacity:
+            values.popitem(last=False)
+        return value
+
+    def invalidate(self, key: Hashable):
+        """
+        drop the value of key, if cached
+        """
+        self.__values.pop(key, None)
+
+    def clear(self):
+        """
+        drop all values
+        """
+        self.__values.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.__values
+
+    def __len__(self) -> int:
+        return len(self.__values)
@@ -0,0 +1,647 @@
+#
+# Compact compressed sparse row (CSR) graph representation
+#
+# @Author: Terry Pan
+# @Date: Sun Oct 18 2026
+# @Email: pttdev123@gmail.com
+# @Last modified by: Terry Pan
+# @Last modified time: Sun Oct 18 2026 10:12:40 AM
+#
+from typing import Dict, FrozenSet, Iterator, List, Mapping, Optional, \
+    Sequence, Tuple
+import os
+import struct
+import numpy as np
+from netwalk.utils.cache import LRUCache
+
+"""
+CSRGraph is a frozen, read-only graph. Node labels are interned to contiguous
+integer ids [0, n) and the adjacency of node i is stored as
+indices[indptr[i]:indptr[i + 1]]. Both the out going and the incoming
+directions are kept, for an undirected graph they share the same arrays. Edge
+weights, when present, are stored in float arrays aligned with indices.
+
+The class exposes the same read methods as Graph (get_nodes,
+get_out_adj_list, ...) so the existing algorithms can consume it directly,
+while the raw arrays are available for array based implementations.
+
+The graph can be saved to a binary file and opened again with np.memmap,
+without parsing and without copying the arrays into memory. The file is a
+fixed header followed by the label offsets, the UTF-8 label blob and the CSR
+arrays, each section aligned to 8 bytes:
+
+    header       magic, version, flags, nodes, out entries, in entries,
+                 label blob size
+    labels       int64 offsets (nodes + 1) and the label blob
+    out going    int64 indptr (nodes + 1), int32 indices
+    incoming     int64 in_indptr, int32 in_indices (directed only)
+    weights      float64 weights, in_weights (directed only), when weighted
+
+Examples
+--------
+>> graph = file_to_graph("asset/data.txt")
+>> csr = graph.to_csr()
+>> csr.get_out_neighbour_ids(csr.get_node_id('0'))
+>> csr.save("data.graph")
+>> csr = CSRGraph.load("data.graph")
+"""
+
+INDPTR_DTYPE = np.int64
+INDICES_DTYPE = np.int32
+WEIGHTS_DTYPE = np.float64
+
+MAGIC = b'NETWALK\x00'
+FORMAT_VERSION = 1
+# magic, version, flags, nodes, out entries, in entries, label blob size
+HEADER = struct.Struct('<8sIIqqqq')
+DIRECTED_FLAG = 1
+WEIGHTED_FLAG = 2
+
+
+class _AdjacencyView(Mapping):
+    """
+    read-only dict-like view that decodes the neighbours of a node back to
+    labels. Like the defaultdict used by Graph, an unknown node has no
+    neighbours, but looking it up never inserts anything.
+    """
+
+    def __init__(self, graph: 'CSRGraph', indptr: np.ndarray,
+                 indices: np.ndarray):
+        self.__graph = graph
+        self.__indptr = indptr
+        self.__indices = indices
+
+    def __getitem__(self, node: str) -> List[str]:
+        node_id = self.__graph.get_node_id(node, None)
+        if node_id is None:
+            return []
+        labels = self.__graph.get_labels()
+        start, end = self.__indptr[node_id], self.__indptr[node_id + 1]
+        return [labels[i] for i in self.__indices[start:end].tolist()]
+
+    def __contains__(self, node) -> bool:
+        return self.__graph.get_node_id(node, None) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.__graph.get_labels())
+
+    def __len__(self) -> int:
+        return self.__graph.get_nodes_count()
+
+
+class _LabelTable(Sequence):
+    """
+    read-only list of labels backed by the offsets and the UTF-8 blob of a
+    saved graph. A single label is decoded on access, the whole table is
+    decoded once when it is iterated
+    """
+
+    def __init__(self, offsets: np.ndarray, blob: np.ndarray):
+        self.__offsets = offsets
+        self.__blob = blob
+        self.__labels: Optional[List[str]] = None
+
+    def __getitem__(self, index):
+        if self.__labels is not None:
+            return self.__labels[index]
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("label index out of range")
+        start, end = self.__offsets[index], self.__offsets[index + 1]
+        return self.__blob[start:end].tobytes().decode()
+
+    def __len__(self) -> int:
+        return len(self.__offsets) - 1
+
+    def __iter__(self) -> Iterator[str]:
+        if self.__labels is None:
+            blob = self.__blob.tobytes()
+            bounds = self.__offsets.tolist()
+            self.__labels = [blob[start:end].decode() for start, end in
+                             zip(bounds[:-1], bounds[1:])]
+        return iter(self.__labels)
+
+
+class CSRGraph(object):
+    def __init__(self, labels: Sequence[str],
+                 indptr: np.ndarray, indices: np.ndarray,
+                 in_indptr: Optional[np.ndarray] = None,
+                 in_indices: Optional[np.ndarray] = None,
+                 directed: bool = True,
+                 weights: Optional[np.ndarray] = None,
+                 in_weights: Optional[np.ndarray] = None):
+        """create a frozen graph from already compressed arrays
+
+        Parameters
+        ----------
+        labels : Sequence[str]
+            the node label for each node id
+        indptr : np.ndarray
+            the out going row pointers, length len(labels) + 1
+        indices : np.ndarray
+            the out going neighbour ids
+        in_indptr : np.ndarray, default None
+            the incoming row pointers. Required for directed graph, for
+            undirected graph the out going arrays are reused
+        in_indices : np.ndarray, default None
+            the incoming neighbour ids
+        directed : bool, default True
+            indicates if the edges have direction
+        weights : np.ndarray, default None
+            the out going edge weights aligned with indices, None for an
+            unweighted graph
+        in_weights : np.ndarray, default None
+            the incoming edge weights aligned with in_indices
+        """
+        if len(indptr) != len(labels) + 1:
+            raise ValueError("indptr length must be number of nodes + 1")
+        if directed and (in_indptr is None or in_indices is None):
+            raise ValueError("directed graph requires incoming arrays")
+        if directed and weights is not None and in_weights is None:
+            raise ValueError("directed graph requires incoming weights")
+        self._labels = labels
+        self._ids: Optional[Dict[str, int]] = None
+        self._directed = directed
+        self.indptr = indptr
+        self.indices = indices
+        self.in_indptr = in_indptr if directed else indptr
+        self.in_indices = in_indices if directed else indices
+        self.weights = weights
+        self.in_weights = in_weights if directed else weights
+        # the file the arrays are mapped from, set by load
+        self._file: Optional[str] = None
+        # built on first use, the graph never changes
+        self._out_degrees: Optional[Dict[str, int]] = None
+        self._in_degrees: Optional[Dict[str, int]] = None
+        self._out_sets: LRUCache[FrozenSet[str]] = LRUCache()
+        self._in_sets: LRUCache[FrozenSet[str]] = LRUCache()
+
+    @classmethod
+    def from_adj_list(cls, nodes: Sequence[str],
+                      out_adj_list: Mapping[str, List[str]],
+                      in_adj_list: Mapping[str, List[str]],
+                      directed: bool = True,
+                      out_weights: Optional[Mapping[str, Sequence[float]]]
+                      = None,
+                      in_weights: Optional[Mapping[str, Sequence[float]]]
+                      = None) -> 'CSRGraph':
+        """build CSRGraph from the adjacency lists kept by Graph. Node ids
+        are assigned in sorted label order, the order of neighbours inside
+        each adjacency list is preserved
+
+        Parameters
+        ----------
+        nodes : Sequence[str]
+            all nodes of the graph
+        out_adj_list : Mapping[str, List[str]]
+            the out going adjacency list
+        in_adj_list : Mapping[str, List[str]]
+            the incoming adjacency list, ignored for undirected graph
+        directed : bool, default True
+            indicates if the edges have direction
+        out_weights : Mapping[str, Sequence[float]], default None
+            the weights aligned with out_adj_list, None when unweighted
+        in_weights : Mapping[str, Sequence[float]], default None
+            the weights aligned with in_adj_list
+
+        Returns
+        -------
+        CSRGraph
+            the frozen graph
+        """
+        labels = sorted(nodes)
+        ids = {label: i for i, label in enumerate(labels)}
+        indptr, indices, weights = _compress(out_adj_list, ids, out_weights)
+        in_indptr, in_indices, in_weights = \
+            _compress(in_adj_list, ids, in_weights) \
+            if directed else (None, None, None)
+        graph = cls(labels, indptr, indices, in_indptr, in_indices, directed,
+                    weights, in_weights)
+        graph._ids = ids
+        return graph
+
+    @classmethod
+    def from_edges(cls, labels: Sequence[str], src: np.ndarray,
+                   dst: np.ndarray, directed: bool = True,
+                   weights: Optional[np.ndarray] = None) -> 'CSRGraph':
+        """build CSRGraph from edge arrays of node ids. The neighbours of
+        each node keep the order of the edges, which is the order Graph
+        would have after calling add_edge on the same edges
+
+        Parameters
+        ----------
+        labels : Sequence[str]
+            the node label for each node id, must be sorted
+        src : np.ndarray
+            the source node id of every edge
+        dst : np.ndarray
+            the target node id of every edge
+        directed : bool, default True
+            indicates if the edges have direction
+        weights : np.ndarray, default None
+            the weight of every edge, None for an unweighted graph
+
+        Returns
+        -------
+        CSRGraph
+            the frozen graph
+        """
+        if len(src) != len(dst) or \
+                (weights is not None and len(weights) != len(src)):
+            raise ValueError("edge arrays must have the same length")
+        num_of_nodes = len(labels)
+        src = np.asarray(src, dtype=INDICES_DTYPE)
+        dst = np.asarray(dst, dtype=INDICES_DTYPE)
+        if directed:
+            indptr, indices, values = _group(src, dst, weights, num_of_nodes)
+            in_indptr, in_indices, in_values = \
+                _group(dst, src, weights, num_of_nodes)
+            return cls(labels, indptr, indices, in_indptr, in_indices, True,
+                       values, in_values)
+        # an undirected edge is stored on both ends, a self-loop only once
+        loop = src == dst
+        owners = np.concatenate((src, dst[~loop]))
+        neighbours = np.concatenate((dst, src[~loop]))
+        if weights is not None:
+            weights = np.concatenate((weights, weights[~loop]))
+        # the ends of the same edge must stay at the position of the edge
+        order = np.concatenate((np.arange(len(src)),
+                                np.flatnonzero(~loop)))
+        sort = np.lexsort((order, owners))
+        indptr, indices, values = _group(
+            owners[sort], neighbours[sort],
+            None if weights is None else weights[sort], num_of_nodes)
+        return cls(labels, indptr, indices, directed=False, weights=values)
+
+    def is_directed(self) -> bool:
+        """
+        return True if the edges have direction
+        """
+        return self._directed
+
+    def is_weighted(self) -> bool:
+        """
+        return True if the edges carry weights
+        """
+        return self.weights is not None
+
+    def get_labels(self) -> Sequence[str]:
+        """
+        return node labels indexed by node id
+        """
+        return self._labels
+
+    def get_nodes(self) -> Sequence[str]:
+        """
+        return nodes in the graph, ordered by node id
+        """
+        return self._labels
+
+    def get_nodes_count(self) -> int:
+        """
+        return the total number of nodes in the graph
+        """
+        return len(self._labels)
+
+    def get_edges_count(self) -> int:
+        """
+        return the number of stored out going entries, an undirected edge
+        counts twice unless it is a self-loop
+        """
+        return len(self.indices)
+
+    def get_node_id(self, node: str, default=KeyError) -> int:
+        """
+        return the integer id of a node label. When the node does not exist
+        default is returned, or KeyError raised when no default is given
+        """
+        if self._ids is None:
+            self._ids = {label: i for i, label in enumerate(self._labels)}
+        node_id = self._ids.get(node)
+        if node_id is None:
+            if default is KeyError:
+                raise KeyError(node)
+            return default
+        return node_id
+
+    def get_node_label(self, node_id: int) -> str:
+        """
+        return the node label of an integer id
+        """
+        return self._labels[node_id]
+
+    def get_out_neighbour_ids(self, node_id: int) -> np.ndarray:
+        """
+        return the out going neighbour ids of a node id (a view, no copy)
+        """
+        return self.indices[self.indptr[node_id]:self.indptr[node_id + 1]]
+
+    def get_in_neighbour_ids(self, node_id: int) -> np.ndarray:
+        """
+        return the incoming neighbour ids of a node id (a view, no copy)
+        """
+        return self.in_indices[
+            self.in_indptr[node_id]:self.in_indptr[node_id + 1]]
+
+    def get_out_weight_values(self, node_id: int) -> np.ndarray:
+        """
+        return the weights aligned with get_out_neighbour_ids, all ones for
+        an unweighted graph
+        """
+        start, end = self.indptr[node_id], self.indptr[node_id + 1]
+        if self.weights is None:
+            return np.ones(end - start, dtype=WEIGHTS_DTYPE)
+        return self.weights[start:end]
+
+    def get_out_degrees(self) -> np.ndarray:
+        """
+        return the out degree of every node id
+        """
+        return np.diff(self.indptr)
+
+    def get_in_degrees(self) -> np.ndarray:
+        """
+        return the in degree of every node id
+        """
+        return np.diff(self.in_indptr)
+
+    def get_out_degree(self, node: str) -> int:
+        """
+        return the out degree of a node label, 0 for an unknown node
+        """
+        node_id = self.get_node_id(node, None)
+        if node_id is None:
+            return 0
+        return int(self.indptr[node_id + 1] - self.indptr[node_id])
+
+    def get_in_degree(self, node: str) -> int:
+        """
+        return the in degree of a node label, 0 for an unknown node
+        """
+        node_id = self.get_node_id(node, None)
+        if node_id is None:
+            return 0
+        return int(self.in_indptr[node_id + 1] - self.in_indptr[node_id])
+
+    def get_out_degree_map(self) -> Mapping[str, int]:
+        """
+        return the out degree of every node label, same as Graph
+        """
+        if self._out_degrees is None:
+            self._out_degrees = dict(zip(
+                self._labels, self.get_out_degrees().tolist()))
+        return self._out_degrees
+
+    def get_in_degree_map(self) -> Mapping[str, int]:
+        """
+        return the in degree of every node label, same as Graph
+        """
+        if self._in_degrees is None:
+            self._in_degrees = dict(zip(
+                self._labels, self.get_in_degrees().tolist()))
+        return self._in_degrees
+
+    def get_out_neighbour_set(self, node: str) -> FrozenSet[str]:
+        """
+        return the out going neighbour labels of a node as a set, the most
+        recently used sets are cached
+        """
+        return self._out_sets.get(
+            node, lambda: frozenset(self.get_out_adj_list()[node]))
+
+    def get_in_neighbour_set(self, node: str) -> FrozenSet[str]:
+        """
+        return the incoming neighbour labels of a node as a set, the most
+        recently used sets are cached
+        """
+        return self._in_sets.get(
+            node, lambda: frozenset(self.get_in_adj_list()[node]))
+
+    def get_out_adj_list(self) -> Mapping[str, List[str]]:
+        """
+        return the out neighbourhood list as a read-only label view
+        """
+        return _AdjacencyView(self, self.indptr, self.indices)
+
+    def get_in_adj_list(self) -> Mapping[str, List[str]]:
+        """
+        return the in neighbourhood list as a read-only label view
+        """
+        return _AdjacencyView(self, self.in_indptr, self.in_indices)
+
+    def to_csr(self) -> 'CSRGraph':
+        """
+        CSRGraph is already frozen, return itself
+        """
+        return self
+
+    freeze = to_csr
+
+    def save(self, file: str):
+        """write the graph to a binary file, see the module docstring for
+        the layout
+
+        Parameters
+        ----------
+        file : str
+            file location
+        """
+        encoded = [label.encode() for label in self._labels]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum(np.fromiter(map(len, encoded), dtype=np.int64,
+                              count=len(encoded)), out=offsets[1:])
+        blob = b''.join(encoded)
+        flags = (DIRECTED_FLAG if self._directed else 0) | \
+            (WEIGHTED_FLAG if self.weights is not None else 0)
+        with open(file, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION, flags,
+                                len(self._labels), len(self.indices),
+                                len(self.in_indices), len(blob)))
+            for section in self.__sections(offsets, blob):
+                f.write(section)
+                f.write(b'\0' * (-len(section) % 8))
+
+    def __sections(self, offsets: np.ndarray, blob: bytes) -> List[bytes]:
+        """
+        return the sections of the binary file in order
+        """
+        arrays = [(self.indptr, INDPTR_DTYPE), (self.indices, INDICES_DTYPE)]
+        if self._directed:
+            arrays += [(self.in_indptr, INDPTR_DTYPE),
+                       (self.in_indices, INDICES_DTYPE)]
+        if self.weights is not None:
+            arrays.append((self.weights, WEIGHTS_DTYPE))
+            if self._directed:
+                arrays.append((self.in_weights, WEIGHTS_DTYPE))
+        return [_to_bytes(offsets, np.int64), blob] + \
+            [_to_bytes(array, dtype) for array, dtype in arrays]
+
+    @classmethod
+    def load(cls, file: str, mmap: bool = True) -> 'CSRGraph':
+        """open a graph written by save
+
+        Parameters
+        ----------
+        file : str
+            file location
+        mmap : bool, default True
+            map the file with np.memmap, the arrays are read-only views of
+            the mapped pages and are shared by all processes opening the
+            same file. When False the file is read into memory
+
+        Returns
+        -------
+        CSRGraph
+            the frozen graph
+        """
+        # a plain ndarray view keeps the mapping alive through its base,
+        # without turning every derived array into a memmap
+        data = np.memmap(file, dtype=np.uint8, mode='r').view(np.ndarray) \
+            if mmap else np.fromfile(file, dtype=np.uint8)
+        if len(data) < HEADER.size:
+            raise ValueError("{} is not a netwalk graph file".format(file))
+        magic, version, flags, num_of_nodes, num_of_entries, \
+            num_of_in_entries, blob_size = \
+            HEADER.unpack(data[:HEADER.size].tobytes())
+        if magic != MAGIC:
+            raise ValueError("{} is not a netwalk graph file".format(file))
+        if version != FORMAT_VERSION:
+            raise ValueError("unsupported graph file version {}"
+                             .format(version))
+        directed = bool(flags & DIRECTED_FLAG)
+        weighted = bool(flags & WEIGHTED_FLAG)
+        position = HEADER.size
+
+        def section(dtype, count: int) -> np.ndarray:
+            nonlocal position
+            size = np.dtype(dtype).itemsize * count
+            if position + size > len(data):
+                raise ValueError("{} is truncated".format(file))
+            array = data[position:position + size].view(
+                _little_endian(dtype))
+            position += size + (-size % 8)
+            return array
+
+        offsets = section(np.int64, num_of_nodes + 1)
+        blob = section(np.uint8, blob_size)
+        indptr = section(INDPTR_DTYPE, num_of_nodes + 1)
+        indices = section(INDICES_DTYPE, num_of_entries)
+        in_indptr = in_indices = weights = in_weights = None
+        if directed:
+            in_indptr = section(INDPTR_DTYPE, num_of_nodes + 1)
+            in_indices = section(INDICES_DTYPE, num_of_in_entries)
+        if weighted:
+            weights = section(WEIGHTS_DTYPE, num_of_entries)
+            if directed:
+                in_weights = section(WEIGHTS_DTYPE, num_of_in_entries)
+        graph = cls(_LabelTable(offsets, blob), indptr, indices, in_indptr,
+                    in_indices, directed, weights, in_weights)
+        if mmap:
+            graph._file = os.path.abspath(file)
+        return graph
+
+    def __reduce_ex__(self, protocol):
+        """
+        a mapped graph is pickled as its file location, so the worker
+        processes map the same pages instead of receiving copies
+        """
+        if self._file is not None:
+            return CSRGraph.load, (self._file,)
+        return super().__reduce_ex__(protocol)
+
+
+def gather_neighbours(indptr: np.ndarray, indices: np.ndarray,
+                      nodes: np.ndarray, skip: int = 0,
+                      positions: bool = False) \
+        -> Tuple[np.ndarray, np.ndarray]:
+    """gather the neighbours of the given nodes from CSR arrays in one
+    vectorized step
+
+    Parameters
+    ----------
+    indptr : np.ndarray
+        the neighbours of node i are indices[indptr[i]:indptr[i + 1]]
+    indices : np.ndarray
+        the neighbour arrays of all nodes, back to back
+    nodes : np.ndarray
+        the node ids whose neighbours are gathered
+    skip : int, default 0
+        the first skip neighbours of every node are left out
+    positions : bool, default False
+        return the position in nodes of the owner of every neighbour
+        instead of its node id
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray]
+        the neighbours, grouped by node in the order of nodes, and their
+        owners
+    """
+    starts = indptr[nodes] + skip
+    counts = indptr[nodes + 1] - starts
+    offsets = np.cumsum(counts) - counts
+    neighbours = indices[np.arange(counts.sum()) +
+                         np.repeat(starts - offsets, counts)]
+    owners = np.arange(len(nodes)) if positions else nodes
+    return neighbours, np.repeat(owners, counts)
+
+
+def _compress(adj_list: Mapping[str, List[str]], ids: Dict[str, int],
+              weights: Optional[Mapping[str, Sequence[float]]] = None):
+    """
+    a helper function to compress an adjacency list into indptr/indices and
+    the aligned weights
+    """
+    indptr = np.zeros(len(ids) + 1, dtype=INDPTR_DTYPE)
+    for node, neighbours in adj_list.items():
+        # the defaultdict in Graph may hold empty entries for nodes that
+        # were only looked up
+        if neighbours:
+            indptr[ids[node] + 1] = len(neighbours)
+    np.cumsum(indptr, out=indptr)
+    indices = np.empty(indptr[-1], dtype=INDICES_DTYPE)
+    values = None if weights is None else \
+        np.empty(indptr[-1], dtype=WEIGHTS_DTYPE)
+    for node, neighbours in adj_list.items():
+        if neighbours:
+            start = indptr[ids[node]]
+            indices[start:start + len(neighbours)] = \
+                [ids[neighbour] for neighbour in neighbours]
+            if values is not None:
+                values[start:start + len(neighbours)] = weights[node]
+    return indptr, indices, values
+
+
+def _group(owners: np.ndarray, neighbours: np.ndarray,
+           weights: Optional[np.ndarray], num_of_nodes: int):
+    """
+    a helper function to compress edge arrays into indptr/indices and the
+    aligned weights, the sort is stable so the edge order is preserved
+    """
+    sort = np.argsort(owners, kind='stable')
+    indptr = np.zeros(num_of_nodes + 1, dtype=INDPTR_DTYPE)
+    np.cumsum(np.bincount(owners, minlength=num_of_nodes),
+              out=indptr[1:])
+    indices = neighbours[sort].astype(INDICES_DTYPE)
+    values = None if weights is None else \
+        np.asarray(weights, dtype=WEIGHTS_DTYPE)[sort]
+    return indptr, indices, values
+
+
+def _little_endian(dtype) -> np.dtype:
+    """
+    a helper function to return the little endian dtype used by the binary
+    file
+    """
+    return np.dtype(dtype).newbyteorder('<')
+
+
+def _to_bytes(array: np.ndarray, dtype) -> bytes:
+    """
+    a helper function to encode an array as a section of the binary file
+    """
+    return np.asarray(array).astype(_little_endian(dtype),
+                                    copy=False).tobytes()
@@ -7,8 +7,14 @@
 # @Last modified by: Terry Pan
 # @Last modified time: Wed Jun 17 2020 2:36:53 PM
 #
-from typing import Tuple, Dict, List, Set
+from typing import Tuple, Dict, List, Set, FrozenSet, Mapping, Optional
 from collections import defaultdict
+from functools import partial
+from array import array
+import gc
+from netwalk.utils.cache import LRUCache
+from netwalk.utils.csr import CSRGraph
+import numpy as np
 
 """
 This is the abstract graph class, it's not meant to be creating objects
@@ -28,10 +34,31 @@ class Graph(object):
             the incoming adjacency list. For example
             a->b, a->c, a->d, the in_adj_list is
             {'b', ['a'], 'c':['a'], 'd':['a']}
+        __out_weights : Dict[str, array]
+            the edge weights aligned with the out going adjacency list,
+            stored as arrays of doubles. It stays empty until an edge with
+            weight other than 1.0 is added
+        __in_weights : Dict[str, array]
+            the edge weights aligned with the incoming adjacency list
+
+        Notes
+        -----
+        the degrees, the neighbour sets and the CSRGraph of to_csr are
+        cached for the algorithms. Adding an edge updates the degrees of
+        its nodes and drops their neighbour sets, the other entries stay
         """
         self._out_adj_list: Dict[str, List[str]] = defaultdict(list)
         self._in_adj_list: Dict[str, List[str]] = defaultdict(list)
         self._nodes: Set[str] = set()
+        self._out_weights: Dict[str, array] = defaultdict(partial(array, 'd'))
+        self._in_weights: Dict[str, array] = defaultdict(partial(array, 'd'))
+        self._weighted = False
+        # built on first use, kept up to date by _invalidate
+        self._out_degrees: Optional[Dict[str, int]] = None
+        self._in_degrees: Optional[Dict[str, int]] = None
+        self._out_sets: LRUCache[FrozenSet[str]] = LRUCache()
+        self._in_sets: LRUCache[FrozenSet[str]] = LRUCache()
+        self._csr: Optional[CSRGraph] = None
 
     def get_out_adj_list(self) -> Dict[str, List[str]]:
         """
@@ -45,6 +72,90 @@ class Graph(object):
         """
         return self._in_adj_list
 
+    def get_out_weights(self) -> Dict[str, array]:
+        """
+        return the weights aligned with the out neighbourhood list, empty
+        when the graph is unweighted
+        """
+        return self._out_weights
+
+    def get_in_weights(self) -> Dict[str, array]:
+        """
+        return the weights aligned with the in neighbourhood list, empty
+        when the graph is unweighted
+        """
+        return self._in_weights
+
+    def is_weighted(self) -> bool:
+        """
+        return True if any edge has a weight other than 1.0
+        """
+        return self._weighted
+
+    def get_out_degree(self, node: str) -> int:
+        """
+        return the length of the out going list of a node, 0 for a node
+        without one. Unlike indexing the adjacency list, no entry is added
+        """
+        return len(self._out_adj_list.get(node, ()))
+
+    def get_in_degree(self, node: str) -> int:
+        """
+        return the length of the incoming list of a node, 0 for a node
+        without one
+        """
+        return len(self._in_adj_list.get(node, ()))
+
+    def get_out_degree_map(self) -> Mapping[str, int]:
+        """
+        return the out degree of every node. The mapping is cached and kept
+        up to date, it must not be modified
+        """
+        if self._out_degrees is None:
+            self._out_degrees = {node: self.get_out_degree(node)
+                                 for node in self._nodes}
+        return self._out_degrees
+
+    def get_in_degree_map(self) -> Mapping[str, int]:
+        """
+        return the in degree of every node. The mapping is cached and kept
+        up to date, it must not be modified
+        """
+        if self._in_degrees is None:
+            self._in_degrees = {node: self.get_in_degree(node)
+                                for node in self._nodes}
+        return self._in_degrees
+
+    def get_out_neighbour_set(self, node: str) -> FrozenSet[str]:
+        """
+        return the out going neighbours of a node as a set, the most
+        recently used sets are cached
+        """
+        return self._out_sets.get(
+            node, lambda: frozenset(self._out_adj_list.get(node, ())))
+
+    def get_in_neighbour_set(self, node: str) -> FrozenSet[str]:
+        """
+        return the incoming neighbours of a node as a set, the most
+        recently used sets are cached
+        """
+        return self._in_sets.get(
+            node, lambda: frozenset(self._in_adj_list.get(node, ())))
+
+    def _invalidate(self, nodes: Tuple[str, ...]):
+        """
+        update the cached values of the nodes after their adjacency lists
+        changed or they are added
+        """
+        self._csr = None
+        for node in nodes:
+            if self._out_degrees is not None:
+                self._out_degrees[node] = self.get_out_degree(node)
+            if self._in_degrees is not None:
+                self._in_degrees[node] = self.get_in_degree(node)
+            self._out_sets.invalidate(node)
+            self._in_sets.invalidate(node)
+
     def get_nodes_count(self) -> int:
         """
         return the total number of nodes in the graph
@@ -59,7 +170,9 @@ class Graph(object):
             raise TypeError("node only support string type")
         if node == '':
             raise ValueError("node cannot be empty")
-        self._nodes.add(node)
+        if node not in self._nodes:
+            self._nodes.add(node)
+            self._invalidate((node,))
 
     def get_nodes(self) -> Set[str]:
         """
@@ -67,10 +180,11 @@ class Graph(object):
         """
         return self._nodes
 
-    def _add_edge(self, edge: Tuple[str, str]):
+    def _add_edge(self, edge: Tuple[str, str], weight: float = 1.0):
         """
         an abstract parent class method, this method is used to check
-        the format of the given edge
+        the format of the given edge and its weight. Once a weight other than
+        1.0 shows up, weights of the existing edges are filled with 1.0
         """
         if not isinstance(edge, tuple):
             raise TypeError("edge must be in tuple")
@@ -78,6 +192,126 @@ class Graph(object):
             raise ValueError("edge length must be 2")
         if not isinstance(edge[0], str) and not isinstance(edge[1], str):
             raise TypeError("edge value type must be string")
+        if isinstance(weight, bool) or not isinstance(weight, (int, float)):
+            raise TypeError("weight must be a number")
+        if not weight > 0:
+            raise ValueError("weight must be positive")
+        if weight != 1.0 and not self._weighted:
+            self._weighted = True
+            for adj_list, weights in ((self._out_adj_list, self._out_weights),
+                                      (self._in_adj_list, self._in_weights)):
+                for node, neighbours in adj_list.items():
+                    weights[node] = array('d', [1.0]) * len(neighbours)
+
+    def is_directed(self) -> bool:
+        """
+        return True if the edges have direction, implemented by concrete
+        classes
+        """
+        raise NotImplementedError("is_directed is defined by concrete graph")
+
+    def to_csr(self) -> CSRGraph:
+        """convert this graph to a frozen compact CSRGraph. Nodes are
+        interned to contiguous integer ids (sorted by label) and the
+        adjacency lists are packed into numpy indptr/indices arrays. Later
+        mutations of this graph are not reflected in the returned object.
+        The result is cached until the graph changes, so the algorithms
+        share one conversion
+
+        Returns
+        -------
+        CSRGraph
+            the frozen compact graph
+        """
+        if self._csr is not None:
+            return self._csr
+        if not self._weighted:
+            self._csr = CSRGraph.from_adj_list(
+                self._nodes, self._out_adj_list, self._in_adj_list,
+                self.is_directed())
+        else:
+            self._csr = CSRGraph.from_adj_list(
+                self._nodes, self._out_adj_list, self._in_adj_list,
+                self.is_directed(), self._out_weights, self._in_weights)
+        return self._csr
+
+    def freeze(self) -> CSRGraph:
+        """
+        alias of to_csr
+        """
+        return self.to_csr()
+
+    def save(self, file: str):
+        """
+        write the graph to a binary file, see CSRGraph.save
+        """
+        self.to_csr().save(file)
+
+    @classmethod
+    def load(cls, file: str) -> 'Graph':
+        """
+        read a graph written by save, the direction of the file must match
+        the graph class. Use CSRGraph.load to map the file without building
+        the adjacency lists
+        """
+        return cls.from_csr(CSRGraph.load(file))
+
+    @classmethod
+    def from_csr(cls, csr: CSRGraph) -> 'Graph':
+        """build a mutable graph from a CSRGraph, the reverse of to_csr. The
+        adjacency lists are filled per node, without calling add_edge per
+        edge
+
+        Parameters
+        ----------
+        csr : CSRGraph
+            the frozen graph, its direction must match the graph class
+
+        Returns
+        -------
+        Graph
+            the mutable graph
+        """
+        graph = cls()
+        if graph.is_directed() != csr.is_directed():
+            raise ValueError("graph direction does not match")
+        labels = csr.get_labels()
+        graph._nodes.update(labels)
+        graph._weighted = csr.is_weighted()
+        label_array = np.array(list(labels), dtype=object)
+        # millions of new lists would trigger full collections, while none
+        # of them can be part of a reference cycle
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            graph.__fill_adj_lists(csr, label_array)
+        finally:
+            if gc_enabled:
+                gc.enable()
+        # the adjacency lists match csr until the graph changes
+        graph._csr = csr
+        return graph
+
+    def __fill_adj_lists(self, csr: CSRGraph, label_array: np.ndarray):
+        """
+        fill the adjacency lists and weights from the CSR arrays
+        """
+        for adj_list, weights, indptr, indices, values in (
+                (self._out_adj_list, self._out_weights, csr.indptr,
+                 csr.indices, csr.weights),
+                (self._in_adj_list, self._in_weights, csr.in_indptr,
+                 csr.in_indices, csr.in_weights)):
+            nodes = np.flatnonzero(np.diff(indptr))
+            neighbours = label_array[indices].tolist()
+            bounds = zip(label_array[nodes].tolist(),
+                         indptr[nodes].tolist(), indptr[nodes + 1].tolist())
+            if values is None:
+                adj_list.update((node, neighbours[start:end])
+                                for node, start, end in bounds)
+                continue
+            for node, start, end in bounds:
+                adj_list[node] = neighbours[start:end]
+                weights[node] = array('d', values[start:end].tolist())
 
 
 """
@@ -89,15 +323,23 @@ class DiGraph(Graph):
     def __init__(self):
         super().__init__()
 
-    def add_edge(self, edge: Tuple[str, str]):
+    def is_directed(self) -> bool:
+        return True
+
+    def add_edge(self, edge: Tuple[str, str], weight: float = 1.0):
         """
-        adding directional edge to this graph
-        """        
-        self._add_edge(edge)
+        adding directional edge to this graph, with an optional positive
+        weight
+        """
+        self._add_edge(edge, weight)
         self._out_adj_list[edge[0]].append(edge[1])
         self._in_adj_list[edge[1]].append(edge[0])
+        if self._weighted:
+            self._out_weights[edge[0]].append(weight)
+            self._in_weights[edge[1]].append(weight)
         self.get_nodes().add(edge[0])
         self.get_nodes().add(edge[1])
+        self._invalidate(edge)
 
 
 """
@@ -109,16 +351,26 @@ class UndiGraph(Graph):
     def __init__(self):
         super().__init__()
 
-    def add_edge(self, edge: Tuple[str, str]):
+    def is_directed(self) -> bool:
+        return False
+
+    def add_edge(self, edge: Tuple[str, str], weight: float = 1.0):
+        """
+        adding undirectional edge to graph, with an optional positive weight
         """
-        adding undirectional edge to graph
-        """        
-        self._add_edge(edge)
+        self._add_edge(edge, weight)
         self._out_adj_list[edge[0]].append(edge[1])
         self._in_adj_list[edge[0]].append(edge[1])
+        if self._weighted:
+            self._out_weights[edge[0]].append(weight)
+            self._in_weights[edge[0]].append(weight)
         self.get_nodes().add(edge[0])
         self.get_nodes().add(edge[1])
         # when there is a self-loop, avoid adding node to the list again
         if edge[0] != edge[1]:
             self._out_adj_list[edge[1]].append(edge[0])
             self._in_adj_list[edge[1]].append(edge[0])
+            if self._weighted:
+                self._out_weights[edge[1]].append(weight)
+                self._in_weights[edge[1]].append(weight)
+        self._invalidate(edge)
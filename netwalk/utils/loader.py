@@ -0,0 +1,422 @@
+#
+# Bulk edge list loader
+#
+# @Author: Terry Pan
+# @Date: Sun Oct 18 2026
+# @Email: pttdev123@gmail.com
+# @Last modified by: Terry Pan
+# @Last modified time: Sun Oct 18 2026 6:25:03 PM
+#
+from typing import List, Optional, Tuple, Union
+from netwalk.utils.csr import CSRGraph, INDICES_DTYPE, WEIGHTS_DTYPE
+from netwalk.utils.reader import STDIN, detect_compression, open_file
+import multiprocessing
+import numpy as np
+import os
+import warnings
+
+"""
+Bulk edge list loader
+
+The edge list is read in large binary chunks instead of line by line. A chunk
+is tokenized with a single bytes.split call, the tokens go straight into a
+numpy bytes array, and the node labels of the whole file are factorized into
+sorted integer ids with one np.unique call. The CSR arrays are then built
+from the id arrays, there is no Python call per edge.
+
+Lines starting with the comment character and empty lines are skipped. When
+the chunk does not split into whole records (comments, blank lines or extra
+columns), the chunk falls back to a line by line split, which keeps the first
+columns of every line, like get_dataset_from_file does.
+
+A large plain file can be parsed by several processes. The file is split into
+byte ranges which start at the beginning of a line, every process parses and
+factorizes its own range, then the local labels are merged into the sorted
+union and the local ids are mapped to it. The result is the same as the
+result of a single process.
+
+Examples
+--------
+>> csr = load_edge_list("asset/data.txt", directed=False)
+>> labels, src, dst, weights = read_edge_list("asset/data.txt", workers=4)
+"""
+
+CHUNK_SIZE = 1 << 24
+
+# the bytes bytes.split treats as whitespace
+_WHITESPACE = np.zeros(256, dtype=bool)
+_WHITESPACE[list(b' \t\n\r\x0b\x0c')] = True
+
+
+def read_edge_list(file: str, delimiter: Optional[str] = None,
+                   weighted: bool = False, comments: str = '#',
+                   chunk_size: int = CHUNK_SIZE, parallel: bool = False,
+                   workers: int = 1) \
+        -> Tuple[List[str], np.ndarray, np.ndarray, Optional[np.ndarray]]:
+    """read an edge list file into node id arrays
+
+    Parameters
+    ----------
+    file : str
+        file location, plain or compressed (gzip, bzip2, xz), '-' for stdin
+    delimiter : str, default None
+        the column delimiter, None for any whitespace
+    weighted : bool, default False
+        read the third column as the edge weight
+    comments : str, default '#'
+        lines starting with it are skipped
+    chunk_size : int, default CHUNK_SIZE
+        the number of bytes read at a time
+    parallel : bool, default False
+        decompress with a multi-threaded tool when installed, see open_file
+    workers : int, default 1
+        the number of processes parsing a plain file, each one parses a
+        byte range of the file. Compressed files and stdin cannot be split
+        and are parsed by a single process
+
+    Returns
+    -------
+    Tuple[List[str], np.ndarray, np.ndarray, Optional[np.ndarray]]
+        the sorted node labels, the source and target ids of every edge in
+        file order, and the edge weights (None when weighted is False)
+    """
+    if not isinstance(workers, int):
+        raise TypeError("workers must be integer")
+    if workers <= 0:
+        raise ValueError("workers must be greater than zero")
+    num_of_columns = 3 if weighted else 2
+    ranges = _split(file, workers) if workers > 1 else []
+    if len(ranges) <= 1:
+        with open_file(file, binary=True, parallel=parallel) as f:
+            columns = _read_columns(f, delimiter, num_of_columns, comments,
+                                    chunk_size)
+        return _factorize(columns, weighted)
+    tasks = [(file, start, end, delimiter, weighted, comments, chunk_size)
+             for start, end in ranges]
+    with multiprocessing.get_context().Pool(len(tasks)) as pool:
+        parts = pool.map(_read_range, tasks)
+    return _merge(parts, weighted)
+
+
+def load_edge_list(file: str, directed: bool = False,
+                   delimiter: Optional[str] = None, weighted: bool = False,
+                   comments: str = '#', chunk_size: int = CHUNK_SIZE,
+                   parallel: bool = False, workers: int = 1) -> CSRGraph:
+    """read an edge list file straight into a CSRGraph. Neighbours keep the
+    file order, so the result equals building the graph with add_edge and
+    calling to_csr. See read_edge_list for the parameters
+
+    Parameters
+    ----------
+    directed : bool, default False
+        indicates if the edges have direction
+    """
+    labels, src, dst, weights = read_edge_list(file, delimiter, weighted,
+                                               comments, chunk_size, parallel,
+                                               workers)
+    if weights is not None and (weights == 1.0).all():
+        # like Graph, a graph whose weights are all 1.0 is unweighted
+        weights = None
+    return CSRGraph.from_edges(labels, src, dst, directed, weights)
+
+
+def _split(file: str, workers: int) -> List[Tuple[int, int]]:
+    """
+    a helper function to split a plain file into at most workers byte
+    ranges, every range starts at the beginning of a line. Returns no range
+    for stdin and compressed files
+    """
+    if file == STDIN:
+        return []
+    with open(file, 'rb') as f:
+        if detect_compression(f.peek(8)) is not None:
+            return []
+        size = os.fstat(f.fileno()).st_size
+        bounds = [0]
+        for i in range(1, workers):
+            f.seek(max(size * i // workers, bounds[-1]))
+            # move to the beginning of the next line
+            f.readline()
+            if f.tell() >= size:
+                break
+            if f.tell() > bounds[-1]:
+                bounds.append(f.tell())
+    bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _read_range(task: Tuple[str, int, int, Optional[str], bool, str, int]) \
+        -> Union[List[np.ndarray], Tuple[np.ndarray, np.ndarray, np.ndarray,
+                                         Optional[np.ndarray]]]:
+    """
+    pool task, parses the byte range [start, end) of a file. Integer labels
+    are cheap to factorize and are returned as parsed, other labels are
+    factorized into ids local to the range
+    """
+    file, start, end, delimiter, weighted, comments, chunk_size = task
+    with open(file, 'rb') as f:
+        f.seek(start)
+        columns = _read_columns(f, delimiter, 3 if weighted else 2,
+                                comments, chunk_size, end - start)
+    if all(column.dtype == np.int64 for column in columns):
+        return columns
+    labels, src, dst, weights = _factorize(columns, weighted)
+    # one numpy array pickles much faster than a list of strings
+    return np.array(labels, dtype=str), src, dst, weights
+
+
+def _merge(parts: List[Union[List[np.ndarray],
+                             Tuple[np.ndarray, np.ndarray, np.ndarray,
+                                   Optional[np.ndarray]]]],
+           weighted: bool) \
+        -> Tuple[List[str], np.ndarray, np.ndarray, Optional[np.ndarray]]:
+    """
+    a helper function to merge the edges of the ranges, the local node ids
+    of every range are mapped to the ids of the sorted union of labels
+    """
+    if all(isinstance(part, list) for part in parts):
+        return _factorize([column for part in parts for column in part],
+                          weighted)
+    parts = [_factorize(part, weighted) if isinstance(part, list) else part
+             for part in parts]
+    local_labels = [np.asarray(labels, dtype=str)
+                    for labels, _, _, _ in parts]
+    labels, inverse = _factorize_labels(np.concatenate(local_labels))
+    offsets = np.cumsum([0] + [len(labels) for labels in local_labels])
+    src, dst = [], []
+    for i, (_, part_src, part_dst, _) in enumerate(parts):
+        mapping = inverse[offsets[i]:offsets[i + 1]]
+        src.append(mapping[part_src])
+        dst.append(mapping[part_dst])
+    weights = np.concatenate([part[3] for part in parts]) if weighted \
+        else None
+    return labels, np.concatenate(src), np.concatenate(dst), weights
+
+
+def _read_columns(f, delimiter: Optional[str], num_of_columns: int,
+                  comments: str, chunk_size: int,
+                  size: Optional[int] = None) -> List[np.ndarray]:
+    """
+    a helper function to read the first num_of_columns columns of a binary
+    file object, returns one (rows, num_of_columns) bytes array per chunk.
+    When size is given, only the next size bytes are read
+    """
+    separator = None if delimiter is None else delimiter.encode()
+    comment = comments.encode() if comments else None
+    columns: List[np.ndarray] = []
+    tail = b''
+    while size is None or size > 0:
+        chunk = f.read(chunk_size if size is None else
+                       min(chunk_size, size))
+        if not chunk:
+            break
+        if size is not None:
+            size -= len(chunk)
+        chunk = tail + chunk
+        # keep the last partial line for the next chunk
+        end = chunk.rfind(b'\n') + 1
+        chunk, tail = chunk[:end], chunk[end:]
+        if chunk:
+            columns.append(_tokenize(chunk, separator, num_of_columns,
+                                     comment))
+    if tail:
+        columns.append(_tokenize(tail, separator, num_of_columns, comment))
+    return columns
+
+
+def _tokenize(chunk: bytes, separator: Optional[bytes], num_of_columns: int,
+              comment: Optional[bytes]) -> np.ndarray:
+    """
+    a helper function to split a chunk of whole lines into a
+    (rows, num_of_columns) bytes array, or an int64 array when the chunk
+    holds integer labels only
+    """
+    if comment is None or comment not in chunk:
+        if num_of_columns == 2:
+            values = _parse_chunk_integers(chunk, separator)
+            if values is not None:
+                return values
+        tokens = chunk.split() if separator is None else \
+            chunk.replace(b'\n', separator).split(separator)
+        if separator is not None and tokens and not tokens[-1]:
+            # the separator appended after the last line
+            tokens.pop()
+        num_of_lines = chunk.count(b'\n') + (not chunk.endswith(b'\n'))
+        if len(tokens) == num_of_lines * num_of_columns and \
+                (separator is None or b'' not in tokens) and \
+                (_count_line_tokens(chunk, separator) == num_of_columns) \
+                .all():
+            tokens = np.array(tokens).reshape(-1, num_of_columns)
+            if separator is not None and \
+                    (b' ' in chunk or b'\t' in chunk or b'\r' in chunk):
+                tokens = np.char.strip(tokens)
+            return tokens
+    rows = []
+    for line in chunk.splitlines():
+        if comment is not None and line.lstrip().startswith(comment):
+            continue
+        fields = line.split(separator)
+        if separator is not None:
+            fields = [field.strip() for field in fields]
+        if not fields or fields == [b'']:
+            continue
+        if len(fields) < num_of_columns:
+            raise ValueError("expect {} columns, got line {!r}"
+                             .format(num_of_columns, line.decode()))
+        rows.append(fields[:num_of_columns])
+    return np.array(rows, dtype=bytes).reshape(-1, num_of_columns)
+
+
+def _factorize(columns: List[np.ndarray], weighted: bool) \
+        -> Tuple[List[str], np.ndarray, np.ndarray, Optional[np.ndarray]]:
+    """
+    a helper function to turn the label columns into sorted labels and id
+    arrays
+    """
+    columns = [column for column in columns if len(column)]
+    if any(column.dtype != np.int64 for column in columns):
+        columns = [column.astype(bytes) if column.dtype == np.int64
+                   else column for column in columns]
+    if not columns:
+        empty = np.empty(0, dtype=INDICES_DTYPE)
+        return [], empty, empty.copy(), \
+            np.empty(0, dtype=WEIGHTS_DTYPE) if weighted else None
+    src = np.concatenate([column[:, 0] for column in columns])
+    dst = np.concatenate([column[:, 1] for column in columns])
+    labels, inverse = _factorize_labels(np.concatenate((src, dst)))
+    weights = None
+    if weighted:
+        try:
+            weights = np.concatenate([column[:, 2] for column in columns]) \
+                .astype(WEIGHTS_DTYPE)
+        except ValueError:
+            raise ValueError("weight column must be numeric")
+        if not (weights > 0).all():
+            raise ValueError("weight must be positive")
+    return labels, inverse[:len(src)], inverse[len(src):], weights
+
+
+def _factorize_labels(tokens: np.ndarray) -> Tuple[List[str], np.ndarray]:
+    """
+    a helper function to map the label tokens (bytes, str or int64 array)
+    to ids in sorted label order.
+    Sorting millions of byte strings is slow, when all the labels are
+    integers written without sign or leading zeros, the integers are
+    factorized instead and only the distinct labels are sorted as strings
+    """
+    values = tokens if tokens.dtype == np.int64 else _parse_integers(tokens)
+    if values is None:
+        uniques, inverse = np.unique(tokens, return_inverse=True)
+        if not len(uniques[0]):
+            raise ValueError("node cannot be empty")
+        labels = uniques.tolist()
+        if tokens.dtype.kind == 'S':
+            labels = [label.decode() for label in labels]
+        return labels, inverse.astype(INDICES_DTYPE)
+    if values.max() < 4 * len(values):
+        # dense ids, factorize with a lookup table instead of a sort
+        present = np.zeros(values.max() + 1, dtype=bool)
+        present[values] = True
+        uniques = np.flatnonzero(present)
+        inverse = (np.cumsum(present, dtype=INDICES_DTYPE) - 1)[values]
+    else:
+        uniques, inverse = np.unique(values, return_inverse=True)
+    labels = uniques.astype(str)
+    order = np.argsort(labels)
+    rank = np.empty(len(order), dtype=INDICES_DTYPE)
+    rank[order] = np.arange(len(order), dtype=INDICES_DTYPE)
+    return labels[order].tolist(), rank[inverse]
+
+
+def _parse_chunk_integers(chunk: bytes, separator: Optional[bytes]) \
+        -> Optional[np.ndarray]:
+    """
+    a helper function to parse a chunk of two integer labels per line
+    directly with numpy, returns None unless every line holds two integers
+    written without sign or leading zeros
+    """
+    if separator is not None:
+        if separator.strip():
+            # an empty field would be a second separator on the line
+            if not (_count_line_tokens(chunk, separator) == 2).all():
+                return None
+            chunk = chunk.replace(separator, b' ')
+        elif separator not in b' \t':
+            return None
+    try:
+        with warnings.catch_warnings():
+            # older numpy warns and stops at the first unparsable token
+            warnings.simplefilter('error', DeprecationWarning)
+            values = np.fromstring(chunk, dtype=np.int64, sep=' ')
+    except (ValueError, DeprecationWarning):
+        return None
+    num_of_lines = chunk.count(b'\n') + (not chunk.endswith(b'\n'))
+    if len(values) != 2 * num_of_lines or \
+            not (_count_line_tokens(chunk) == 2).all():
+        return None
+    # a sign, leading zeros or any other character takes more bytes than
+    # the digits of the parsed value
+    num_of_bytes = len(chunk) - sum(chunk.count(space)
+                                    for space in (b' ', b'\t', b'\r', b'\n'))
+    if num_of_bytes != int(_count_digits(values).sum()):
+        return None
+    return values.reshape(-1, 2)
+
+
+def _count_line_tokens(chunk: bytes, separator: Optional[bytes] = None) \
+        -> np.ndarray:
+    """
+    a helper function to count the tokens of every line of a chunk, split
+    on whitespace when separator is None. A line count matching the total
+    count does not mean every line is whole, a long line and a short line
+    balance out
+    """
+    data = np.frombuffer(chunk, dtype=np.uint8)
+    ends = np.flatnonzero(data == ord('\n'))
+    if not chunk.endswith(b'\n'):
+        ends = np.append(ends, len(data))
+    if separator is None:
+        # the start of every token, as bytes.split sees whitespace
+        blank = _WHITESPACE[data]
+        starts = ~blank
+        starts[1:] &= blank[:-1]
+        marks = np.flatnonzero(starts)
+        extra = 0
+    elif len(separator) == 1:
+        marks = np.flatnonzero(data == separator[0])
+        extra = 1
+    else:
+        # the end of every field but the last one, where a separator starts
+        lengths = np.fromiter(map(len, chunk.split(separator)),
+                              dtype=np.int64)
+        marks = np.cumsum(lengths + len(separator))[:-1] - len(separator)
+        extra = 1
+    return np.diff(np.searchsorted(marks, ends), prepend=0) + extra
+
+
+def _count_digits(values: np.ndarray) -> np.ndarray:
+    """
+    a helper function to count the decimal digits of non negative integers,
+    negative values get one digit
+    """
+    return np.searchsorted(10 ** np.arange(1, 19, dtype=np.int64),
+                           values, side='right') + 1
+
+
+def _parse_integers(tokens: np.ndarray) -> Optional[np.ndarray]:
+    """
+    a helper function to parse the tokens as integers, returns None unless
+    every token is the canonical text of its integer, so that the integer
+    and the label identify a node alike
+    """
+    # the widest token, a str array takes 4 bytes per character
+    width = tokens.dtype.itemsize // (4 if tokens.dtype.kind == 'U' else 1)
+    if not len(tokens) or width > 18:
+        return None
+    try:
+        values = tokens.astype(np.int64)
+    except ValueError:
+        return None
+    if not (np.char.str_len(tokens) == _count_digits(values)).all():
+        return None
+    return values
@@ -10,7 +10,10 @@
 from typing import List, Tuple, Union, Callable
 from random import choice
 from netwalk.utils.graph import UndiGraph, DiGraph
-from netwalk.utils.reader import FileReader
+from netwalk.utils.csr import CSRGraph
+from netwalk.utils.loader import load_edge_list, read_edge_list
+from itertools import repeat
+import numpy as np
 import os
 
 
@@ -41,7 +44,7 @@ def calc_similarity_from_validation_set(valid_set: List[Tuple[str, str, str]],
     return res
 
 
-def get_dataset_from_file(file: str, label: str = '') -> \
+def get_dataset_from_file(file: str, label: str = '', workers: int = 1) -> \
         List[Tuple[str, str, str]]:
     """return a list of edges with format (src_node, dst_node, label)
     by given the location of a file. When the edge of given data file has no
@@ -50,22 +53,24 @@ def get_dataset_from_file(file: str, label: str = '') -> \
     Parameters
     ----------
     str
-        file: file locatoin
+        file: file locatoin, plain or compressed, '-' for stdin
 
     str
         label: the label for given dataset
 
+    int
+        workers: the number of processes parsing the file, see
+        read_edge_list
+
     Returns
     -------
     List[Tuple[str, str, str]]
         res: the res with (src_node, dst_node, label)
     """
-    res: List[Tuple[str, str, str]] = []
-    with open(file, 'r') as f:
-        for line in f.readlines():
-            edge = line.strip().split()
-            res.append((edge[0], edge[1], label))
-    return res
+    labels, src, dst, _ = read_edge_list(file, workers=workers)
+    labels = np.array(labels, dtype=object)
+    return list(zip(labels[src].tolist(), labels[dst].tolist(),
+                    repeat(label, len(src))))
 
 
 def file_writer(file_loc: str, res: List[Tuple[str, str, str]]):
@@ -93,10 +98,13 @@ def format_print(weights: Union[List[str], List[Tuple[str, float]]]):
     print()
 
 
-def file_to_graph(file: str, digraph: bool = False) -> \
-        Union[DiGraph, UndiGraph]:
+def file_to_graph(file: str, digraph: bool = False, compact: bool = False,
+                  weighted: bool = False, workers: int = 1) -> \
+        Union[DiGraph, UndiGraph, CSRGraph]:
     """read a dataset by given file name then convert the dataset to a
-    digraph or undigraph instance
+    digraph or undigraph instance. The file is parsed by the bulk loader,
+    the graph is built from the edge arrays without calling add_edge per
+    edge
 
     Parameters
     ----------
@@ -107,16 +115,27 @@ def file_to_graph(file: str, digraph: bool = False) -> \
         digraph: the default graph type is undigraph. However, when setting this
         value as True, the returned graph type becomes digraph
 
+    bool
+        compact: return the frozen CSRGraph instead of the mutable graph,
+        which skips building the adjacency lists of labels
+
+    bool
+        weighted: read the third column of the file as the edge weight
+
+    int
+        workers: the number of processes parsing the file, see
+        read_edge_list
+
     Returns
     -------
-    Union[DiGraph, UndiGraph]
-        return either digraph or undigraph
+    Union[DiGraph, UndiGraph, CSRGraph]
+        return either digraph or undigraph, or CSRGraph when compact is True
     """
-    txt_reader = FileReader(file)
-    graph: Union[DiGraph, UndiGraph] = DiGraph() if digraph else UndiGraph()
-    for record in txt_reader.get_data():
-        graph.add_edge((record[0], record[1]))
-    return graph
+    csr = load_edge_list(file, directed=digraph, weighted=weighted,
+                         workers=workers)
+    if compact:
+        return csr
+    return DiGraph.from_csr(csr) if digraph else UndiGraph.from_csr(csr)
 
 
 def link_prediction_eval(nodes: List[Tuple[str, str, str]]) -> float:
@@ -177,9 +196,45 @@ def top_n_rank(scores: List[Tuple[str, str, str, float]], n: int = None) -> \
     List[Tuple[str, str, str, float]]
         top n edges
     """
+    values = np.fromiter((score[3] for score in scores), dtype=np.float64,
+                         count=len(scores))
+    return [scores[i] for i in top_n_indices(values, n).tolist()]
+
+
+def top_n_indices(scores: np.ndarray, n: int = None) -> np.ndarray:
+    """return the positions of the top n scores, from the highest score. Equal
+    scores keep their order, like a stable sort of the scores
+
+    Parameters
+    ----------
+    scores : np.ndarray
+        the scores
+    n : int, default None
+        the number of positions, all of them when None
+
+    Returns
+    -------
+    np.ndarray
+        the positions of the top n scores
+
+    Notes
+    -----
+    only the top n are sorted, they are selected with np.argpartition
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    positions = np.arange(len(scores))
     if n is not None:
-        return sorted(scores, key=lambda x: x[3], reverse=True)[:n]
-    return sorted(scores, key=lambda x: x[3], reverse=True)
+        n = len(scores) + n if n < 0 else n
+        n = min(max(n, 0), len(scores))
+        if n == 0:
+            return positions[:0]
+        if n < len(scores):
+            selected = np.argpartition(-scores, n - 1)[:n]
+            # the scores equal to the n-th score are all candidates, the
+            # first of them by position win
+            positions = np.flatnonzero(scores >= scores[selected].min())
+    order = np.lexsort((positions, -scores[positions]))
+    return positions[order][:n]
 
 
 def generate_non_connection_data(nodes: List[str],
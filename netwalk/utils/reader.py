@@ -1,13 +1,23 @@
-import itertools
-import os
+from typing import BinaryIO, Iterator, List, Optional, TextIO, Union
+import bz2
+import gzip
+import io
+import lzma
+import shutil
+import subprocess
+import sys
 
 """This class is mainly to read text data files like tab, space or comma
-separated file format
+separated file format. Files compressed with gzip, bzip2 or xz are
+decompressed on the fly (detected by their magic bytes, not the file
+extension), and the file name '-' reads from stdin
 
 Returns
 -------
 data: generator
     a generator that yields data line by line from the give file
+batches: generator
+    a generator that yields lists of rows, reading the file in large blocks
 header: list
     a list that represent the header fields
 
@@ -20,57 +30,211 @@ e: PermissonError
 
 Examples
 --------
->> txtReader = FileReader("file_loc", header=True)
->> txtReader.get_header()
->> for line in txtReader.get_data():
->>      print(line)
+>> with FileReader("file_loc.gz", header=True) as txtReader:
+>>      txtReader.get_header()
+>>      for line in txtReader.get_data():
+>>          print(line)
 """
 
+DELIMITERS = (' ', ',', '\t')
+STDIN = '-'
+# the number of bytes read for each batch of rows
+BATCH_SIZE = 1 << 20
+
+# magic bytes at the beginning of compressed files
+COMPRESSIONS = {
+    'gz': (b'\x1f\x8b', gzip),
+    'bz2': (b'BZh', bz2),
+    'xz': (b'\xfd7zXZ\x00', lzma),
+}
+# multi-threaded decompressors, the first one found on PATH is used
+PARALLEL_DECOMPRESSORS = {
+    'gz': (['pigz', '-dc'],),
+    'bz2': (['lbzip2', '-dc'], ['pbzip2', '-dc']),
+    'xz': (['xz', '-T0', '-dc'],),
+}
+
 
 class FileReader:
     def __init__(self, file_name: str,
-                 delimiter: str = ' ', header: bool = False):
+                 delimiter: str = ' ', header: bool = False,
+                 parallel: bool = False):
         """create FileReader object, with default delimiter as space and assume
         without header presents in given file
 
         Parameters
         ----------
         file_name : str
-            the given file location
+            the given file location, plain or compressed, '-' for stdin
         delimiter : str, default ' '
             the delimiter of given file, can be space, comma or tab
         header : bool, default False
             indicates if header is presented on the given file
+        parallel : bool, default False
+            decompress with a multi-threaded tool (pigz, lbzip2, pbzip2 or
+            xz) in a sub process when it is installed
         """
+        if delimiter not in DELIMITERS:
+            raise ValueError("for delimiter, only space, comma, tab supported")
         try:
-            self.fd = open(file_name, 'r')
+            self.fd = open_file(file_name, parallel=parallel)
         except IOError as e:
             raise e
         except PermissionError as e:
             raise e
-        if delimiter not in ", " + os.linesep:
-            raise ValueError("for delimiter, only space, comma, tab supported")
         self.delimiter = delimiter
         self.header = header
+        self.__header: Optional[List[str]] = None
 
-    def get_data(self):
+    def get_data(self) -> Iterator[List[str]]:
         """
         get the data body, if header presents, skip header
         """
-        for line in itertools.islice(self.fd, self.header, None):
-            fields = list(map(str.strip, line.rstrip().split(self.delimiter)))
-            yield fields
+        self.__skip_header()
+        for line in self.fd:
+            yield self.__parse(line)
+
+    def get_batches(self, batch_size: int = BATCH_SIZE) \
+            -> Iterator[List[List[str]]]:
+        """
+        get the data body as lists of rows, about batch_size bytes of the
+        file at a time. If header presents, skip header
+        """
+        self.__skip_header()
+        while True:
+            lines = self.fd.readlines(batch_size)
+            if not lines:
+                break
+            yield [self.__parse(line) for line in lines]
 
-    def get_header(self):
+    def get_header(self) -> List[str]:
         """
         return the header field of give file
         """
-        return list(map(str.strip,
-                        self.fd.readline().rstrip().split(self.delimiter)))
+        if self.__header is None:
+            self.__header = self.__parse(self.fd.readline())
+        return self.__header
 
-    def __del__(self):
+    def close(self):
         """
-        destructor for closing opened resources
+        close the file, also stops the decompression process
         """
         if hasattr(self, 'fd'):
             self.fd.close()
+
+    def __skip_header(self):
+        """
+        read the header line unless it is already read
+        """
+        if self.header and self.__header is None:
+            self.get_header()
+
+    def __parse(self, line: str) -> List[str]:
+        """
+        split a line into stripped fields
+        """
+        return list(map(str.strip, line.rstrip().split(self.delimiter)))
+
+    def __enter__(self) -> 'FileReader':
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def __del__(self):
+        """
+        destructor for closing opened resources
+        """
+        self.close()
+
+
+class _ProcessReader(io.RawIOBase):
+    """
+    raw stream over the output of a decompression process. Closing it before
+    the end stops the process, reaching the end checks its exit status
+    """
+
+    def __init__(self, process: subprocess.Popen):
+        self.__process = process
+        self.__eof = False
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        size = self.__process.stdout.readinto(buffer)
+        self.__eof = size == 0
+        return size
+
+    def close(self):
+        if self.closed:
+            return
+        super().close()
+        self.__process.stdout.close()
+        if not self.__eof:
+            self.__process.terminate()
+            self.__process.wait()
+        elif self.__process.wait() != 0:
+            raise IOError("decompression failed with exit status {}"
+                          .format(self.__process.returncode))
+
+
+def open_file(file_name: str, binary: bool = False,
+              parallel: bool = False) -> Union[TextIO, BinaryIO]:
+    """open a plain or compressed file for reading. The compression is
+    detected from the first bytes of the file
+
+    Parameters
+    ----------
+    file_name : str
+        the given file location, '-' for stdin
+    binary : bool, default False
+        return a binary stream instead of a UTF-8 text stream
+    parallel : bool, default False
+        decompress with a multi-threaded tool in a sub process when one is
+        installed, ignored for stdin
+
+    Returns
+    -------
+    Union[TextIO, BinaryIO]
+        the decompressed stream. Closing it leaves stdin open
+    """
+    # a second buffer on the stdin descriptor, closing it keeps stdin open
+    stream = open(sys.stdin.fileno(), 'rb', closefd=False) \
+        if file_name == STDIN else open(file_name, 'rb')
+    magic = stream.peek(8)
+    compression = detect_compression(magic)
+    if compression is not None:
+        command = _find_decompressor(compression) \
+            if parallel and file_name != STDIN else None
+        if command is not None:
+            stream.close()
+            process = subprocess.Popen(command + [file_name],
+                                       stdout=subprocess.PIPE)
+            stream = io.BufferedReader(_ProcessReader(process))
+        elif file_name != STDIN:
+            # let the module open the file, so closing it closes the file
+            stream.close()
+            stream = COMPRESSIONS[compression][1].open(file_name, 'rb')
+        else:
+            stream = COMPRESSIONS[compression][1].open(stream, 'rb')
+    return stream if binary else io.TextIOWrapper(stream, encoding='utf-8')
+
+
+def detect_compression(magic: bytes) -> Optional[str]:
+    """
+    return the compression ('gz', 'bz2' or 'xz') of a file by its first
+    bytes, None for a plain file
+    """
+    return next((name for name, (prefix, _) in COMPRESSIONS.items()
+                 if magic.startswith(prefix)), None)
+
+
+def _find_decompressor(compression: str) -> Optional[List[str]]:
+    """
+    a helper function to return the command of the first multi-threaded
+    decompressor installed for the compression
+    """
+    return next((command for command in PARALLEL_DECOMPRESSORS[compression]
+                 if shutil.which(command[0])), None)
+
@@ -0,0 +1,17 @@
+import random
+
+
+def build_random_graph(graph_class, num_of_nodes, num_of_edges, seed,
+                       weights=None):
+    # the edges join random nodes "0" to num_of_nodes - 1, with a weight
+    # picked from weights when given
+    rng = random.Random(seed)
+    graph = graph_class()
+    for _ in range(num_of_edges):
+        edge = (str(rng.randrange(num_of_nodes)),
+                str(rng.randrange(num_of_nodes)))
+        if weights is None:
+            graph.add_edge(edge)
+        else:
+            graph.add_edge(edge, rng.choice(weights))
+    return graph
@@ -0,0 +1,56 @@
+import unittest
+import numpy as np
+from parameterized import parameterized
+from netwalk.algorithms.link_prediction.alias import (
+    build_alias_tables,
+    sample_alias
+)
+
+
+def implied_probabilities(prob, alias, start, stop):
+    size = stop - start
+    implied = np.zeros(size)
+    for k in range(size):
+        implied[k] += prob[start + k] / size
+        implied[alias[start + k]] += (1 - prob[start + k]) / size
+    return implied
+
+
+class AliasTest(unittest.TestCase):
+    @parameterized.expand([
+        (1, False),
+        (2, True),
+        (3, False),
+        (4, True),
+    ])
+    def test_same_distribution(self, seed, integral):
+        rng = np.random.default_rng(seed)
+        sizes = rng.integers(0, 12, 40)
+        indptr = np.concatenate(([0], np.cumsum(sizes)))
+        weights = rng.random(indptr[-1]) ** 3
+        if integral:
+            # zero weights and ties
+            weights = np.round(weights * 3)
+        prob, alias = build_alias_tables(indptr, weights)
+        for start, stop in zip(indptr[:-1].tolist(), indptr[1:].tolist()):
+            if start == stop:
+                continue
+            total = weights[start:stop].sum()
+            expected = weights[start:stop] / total if total > 0 else \
+                np.full(stop - start, 1 / (stop - start))
+            self.assertTrue(np.allclose(
+                expected, implied_probabilities(prob, alias, start, stop),
+                atol=1e-6))
+
+    def test_sample(self):
+        weights = np.array([1.0, 0.0, 2.0, 5.0, 5.0])
+        prob, alias = build_alias_tables(np.array([0, 3, 5]), weights)
+        rng = np.random.default_rng(5)
+        offsets = sample_alias(np.zeros(9000, dtype=np.int64),
+                               np.full(9000, 3), prob, alias, rng)
+        counts = np.bincount(offsets, minlength=3) / 9000
+        self.assertEqual(0, counts[1])
+        self.assertAlmostEqual(2 / 3, counts[2], delta=0.02)
+        offsets = sample_alias(np.full(1000, 3), np.full(1000, 2), prob,
+                               alias, rng)
+        self.assertSetEqual({0, 1}, set(offsets.tolist()))
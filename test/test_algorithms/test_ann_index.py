@@ -0,0 +1,148 @@
+import unittest
+import os
+import pickle
+import tempfile
+import numpy as np
+from parameterized import parameterized
+from netwalk.utils.graph import DiGraph, UndiGraph
+from netwalk.algorithms.link_prediction.similarity_methods import \
+    EmbeddingMeasure
+from netwalk.algorithms.link_prediction.ann_index import IVFIndex
+from test.graphs import build_random_graph
+
+
+def random_embeddings(num_of_nodes, seed):
+    return np.random.default_rng(seed).standard_normal(
+        (num_of_nodes, 8)).astype(np.float32)
+
+
+def brute_force(embeddings, queries, metric):
+    if metric == EmbeddingMeasure.COSINE:
+        embeddings = embeddings / np.linalg.norm(embeddings, axis=1,
+                                                 keepdims=True)
+        queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    return queries @ embeddings.T
+
+
+class IVFIndexTest(unittest.TestCase):
+    @parameterized.expand([
+        (EmbeddingMeasure.COSINE,),
+        (EmbeddingMeasure.DOT,),
+    ])
+    def test_search_all_lists_is_exact(self, metric):
+        embeddings = random_embeddings(200, 1)
+        queries = random_embeddings(30, 2)
+        index = IVFIndex.build(embeddings, 10, metric, seed=1)
+        self.assertEqual(10, index.get_lists_count())
+        ids, scores = index.search(queries, 5, probes=10)
+        expected = brute_force(embeddings, queries, metric)
+        self.assertEqual((30, 5), ids.shape)
+        for row, row_ids, row_scores in zip(expected, ids, scores):
+            np.testing.assert_allclose(np.sort(row)[::-1][:5], row_scores,
+                                       rtol=1e-5)
+            np.testing.assert_allclose(row[row_ids], row_scores, rtol=1e-5)
+
+    def test_search_recall(self):
+        embeddings = random_embeddings(2000, 3)
+        index = IVFIndex.build(embeddings, seed=3)
+        ids, _ = index.search(embeddings[:100], 10)
+        expected = np.argsort(-brute_force(embeddings, embeddings[:100],
+                                           EmbeddingMeasure.COSINE),
+                              axis=1)[:, :10]
+        recall = np.mean([len(set(a) & set(b)) / 10 for a, b
+                          in zip(ids.tolist(), expected.tolist())])
+        self.assertGreater(recall, 0.5)
+
+    def test_missing_neighbours(self):
+        index = IVFIndex.build(random_embeddings(3, 4), 2, seed=4)
+        ids, scores = index.search(random_embeddings(2, 5), 5, probes=2)
+        self.assertListEqual([-1, -1], ids[:, -1].tolist())
+        self.assertTrue(np.isneginf(scores[:, -1]).all())
+        self.assertListEqual([0, 1, 2], sorted(ids[0, :3].tolist()))
+
+    @parameterized.expand([
+        (DiGraph, 1),
+        (UndiGraph, 2),
+    ])
+    def test_recommend(self, graph_class, seed):
+        graph = build_random_graph(graph_class, 60, 300, seed)
+        csr = graph.to_csr()
+        embeddings = random_embeddings(csr.get_nodes_count(), seed)
+        index = IVFIndex.build(embeddings, 6, seed=seed)
+        scores = brute_force(embeddings, embeddings, EmbeddingMeasure.COSINE)
+        adj_list = graph.get_out_adj_list()
+        chunks = list(index.recommend(graph, 4, probes=6, chunk_size=16))
+        self.assertEqual(4, len(chunks))
+        links = [link for chunk in chunks for link in chunk]
+        self.assertEqual(4 * csr.get_nodes_count(), len(links))
+        for src in csr.get_labels():
+            excluded = set(adj_list.get(src, ())) | {src}
+            candidates = [dst for dst in csr.get_labels()
+                          if dst not in excluded]
+            expected = sorted(
+                candidates, key=lambda dst: -scores[
+                    csr.get_node_id(src), csr.get_node_id(dst)])[:4]
+            actual = [link for link in links if link[0] == src]
+            self.assertListEqual(expected, [link[1] for link in actual])
+        self.assertListEqual(
+            links, [link for chunk in index.recommend(
+                graph, 4, probes=6, chunk_size=16, workers=2)
+                for link in chunk])
+
+    def test_recommend_nodes(self):
+        graph = build_random_graph(UndiGraph, 30, 60, 3)
+        index = IVFIndex.build(random_embeddings(graph.get_nodes_count(),
+                                                 3), 3, seed=3)
+        chunks = list(index.recommend(graph, 2, ["5", "missing", "1"]))
+        self.assertListEqual(["5", "5", "1", "1"],
+                             [link[0] for link in chunks[0]])
+        similar = index.most_similar(graph, "5", 3, probes=3)
+        self.assertEqual(3, len(similar))
+        self.assertNotIn("5", [node for node, _ in similar])
+        with self.assertRaises(ValueError):
+            index.most_similar(UndiGraph(), "5", 3)
+
+    def test_save_and_load(self):
+        embeddings = random_embeddings(100, 6)
+        index = IVFIndex.build(embeddings, 5, EmbeddingMeasure.DOT, seed=6)
+        expected = index.search(embeddings[:10], 3)
+        with tempfile.TemporaryDirectory() as folder:
+            file = os.path.join(folder, "embeddings.index")
+            index.save(file)
+            for mmap in (True, False):
+                loaded = IVFIndex.load(file, mmap=mmap)
+                self.assertEqual(EmbeddingMeasure.DOT, loaded.metric)
+                actual = loaded.search(embeddings[:10], 3)
+                self.assertListEqual(expected[0].tolist(),
+                                     actual[0].tolist())
+                self.assertListEqual(expected[1].tolist(),
+                                     actual[1].tolist())
+            # a mapped index is pickled as its file location
+            loaded = pickle.loads(pickle.dumps(IVFIndex.load(file)))
+            self.assertListEqual(expected[0].tolist(),
+                                 loaded.search(embeddings[:10], 3)[0]
+                                 .tolist())
+            del loaded
+            with open(file, 'wb') as f:
+                f.write(b'not an index')
+            with self.assertRaises(ValueError):
+                IVFIndex.load(file)
+
+    @parameterized.expand([
+        (0, 1, ValueError),
+        (1.5, 1, TypeError),
+        (1, 0, ValueError),
+    ])
+    def test_search_exceptions(self, k, probes, expected):
+        index = IVFIndex.build(random_embeddings(10, 7), 2, seed=7)
+        with self.assertRaises(expected):
+            index.search(random_embeddings(2, 8), k, probes)
+
+    def test_build_exceptions(self):
+        with self.assertRaises(ValueError):
+            IVFIndex.build(np.zeros((0, 4)))
+        with self.assertRaises(ValueError):
+            IVFIndex.build(random_embeddings(10, 9), 0)
+        with self.assertRaises(ValueError):
+            IVFIndex.build(random_embeddings(10, 9),
+                           metric=EmbeddingMeasure.HADAMARD)
@@ -0,0 +1,56 @@
+import unittest
+from parameterized import parameterized
+from netwalk.utils.graph import DiGraph, UndiGraph
+from netwalk.algorithms.shortestpath.dijkstra import Dijkstra
+from netwalk.algorithms.shortestpath.BFS import BFS, BOTTOM_UP, TOP_DOWN
+from test.graphs import build_random_graph
+
+
+class BFSTest(unittest.TestCase):
+    @parameterized.expand([
+        (DiGraph, 60, 150, 1),
+        (UndiGraph, 60, 90, 2),
+        (DiGraph, 200, 4000, 3),
+        (UndiGraph, 200, 4000, 4),
+    ])
+    def test_levels_match_dijkstra(self, graph_class, num_of_nodes,
+                                   num_of_edges, seed):
+        csr = build_random_graph(graph_class, num_of_nodes, num_of_edges,
+                                 seed).to_csr()
+        src = csr.get_node_label(0)
+        dist, _ = Dijkstra(csr, src).shortest_path()
+        levels, parents = BFS(csr).search(src)
+        self.assertListEqual([-1 if d == float('inf') else int(d)
+                              for d in dist], levels.tolist())
+        for node, parent in enumerate(parents.tolist()):
+            if parent >= 0:
+                self.assertEqual(levels[parent] + 1, levels[node])
+                self.assertIn(node,
+                              csr.get_out_neighbour_ids(parent).tolist())
+
+    def test_directions(self):
+        csr = build_random_graph(UndiGraph, 200, 4000, 5).to_csr()
+        bfs = BFS(csr)
+        bfs.search(csr.get_node_label(0))
+        self.assertEqual(TOP_DOWN, bfs.get_steps()[0])
+        self.assertIn(BOTTOM_UP, bfs.get_steps())
+
+    def test_max_depth_and_multi_source(self):
+        graph = DiGraph()
+        for edge in [("a", "b"), ("b", "c"), ("c", "d"), ("x", "d")]:
+            graph.add_edge(edge)
+        bfs = BFS(graph)
+        self.assertDictEqual({"a": 0, "b": 1}, bfs.get_levels("a", 1))
+        self.assertDictEqual({"a": 0, "b": 1, "c": 2, "d": 1, "x": 0},
+                             bfs.get_levels(["a", "x"]))
+
+    @parameterized.expand([
+        ("unknown", None),
+        ([], None),
+        ("a", -1),
+    ])
+    def test_exceptions(self, src, max_depth):
+        graph = DiGraph()
+        graph.add_edge(("a", "b"))
+        with self.assertRaises(ValueError):
+            BFS(graph).search(src, max_depth)
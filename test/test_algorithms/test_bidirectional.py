@@ -0,0 +1,67 @@
+import unittest
+import math
+from parameterized import parameterized
+from netwalk.utils.graph import DiGraph, UndiGraph
+from netwalk.algorithms.shortestpath.dijkstra import Dijkstra
+from netwalk.algorithms.shortestpath.bidirectional import BidirectionalSearch
+from test.graphs import build_random_graph
+
+WEIGHTS = [1.0, 2.0, 0.5]
+
+
+def path_length(graph, path):
+    csr = graph.to_csr()
+    length = 0.0
+    for u, v in zip(path, path[1:]):
+        u_id, v_id = csr.get_node_id(u), csr.get_node_id(v)
+        neighbours = csr.get_out_neighbour_ids(u_id).tolist()
+        weights = csr.get_out_weight_values(u_id).tolist()
+        length += min(w for n, w in zip(neighbours, weights) if n == v_id)
+    return length
+
+
+class BidirectionalSearchTest(unittest.TestCase):
+    @parameterized.expand([
+        (DiGraph, False),
+        (DiGraph, True),
+        (UndiGraph, False),
+        (UndiGraph, True),
+    ])
+    def test_matches_dijkstra(self, graph_class, weighted):
+        for seed in range(3):
+            graph = build_random_graph(
+                graph_class, 30, 60, seed, WEIGHTS if weighted else None)
+            search = BidirectionalSearch(graph)
+            nodes = sorted(graph.get_nodes())
+            for src in nodes[:8]:
+                for dst in nodes[-8:]:
+                    expected = Dijkstra(graph, src).get_distance(dst)
+                    distance, path = search.shortest_path(src, dst)
+                    self.assertAlmostEqual(expected, distance)
+                    if math.isinf(expected):
+                        self.assertListEqual([], path)
+                    else:
+                        self.assertEqual(src, path[0])
+                        self.assertEqual(dst, path[-1])
+                        self.assertAlmostEqual(distance,
+                                               path_length(graph, path))
+
+    def test_same_node(self):
+        search = BidirectionalSearch(build_random_graph(UndiGraph, 30, 60, 0))
+        self.assertEqual((0.0, ["1"]), search.shortest_path("1", "1"))
+
+    def test_heuristic(self):
+        # nodes on a line, the heuristic is the remaining distance
+        graph = UndiGraph()
+        for i in range(10):
+            graph.add_edge((str(i), str(i + 1)), 2.0)
+        graph.add_edge(("0", "10"), 25.0)
+        distance, path = BidirectionalSearch(graph).shortest_path(
+            "0", "10", heuristic=lambda node: 2.0 * (10 - int(node)))
+        self.assertEqual(20.0, distance)
+        self.assertListEqual([str(i) for i in range(11)], path)
+
+    def test_unknown_node(self):
+        with self.assertRaises(ValueError):
+            BidirectionalSearch(build_random_graph(DiGraph, 30, 60, 0))\
+                .shortest_path("1", "unknown")
@@ -0,0 +1,160 @@
+import unittest
+from parameterized import parameterized
+from netwalk.utils.graph import DiGraph, UndiGraph
+from netwalk.algorithms.centrality import brandes
+from netwalk.algorithms.centrality.brandes import Brandes
+
+
+def build_graph(graph_class, size=40):
+    graph = graph_class()
+    for i in range(size):
+        graph.add_edge((str(i), str((i + 1) % size)))
+        graph.add_edge((str(i), str((i * 7) % size)))
+    return graph
+
+
+class BrandesTest(unittest.TestCase):
+    def test_path_graph(self):
+        graph = UndiGraph()
+        for edge in [("a", "b"), ("b", "c")]:
+            graph.add_edge(edge)
+        b = Brandes(graph)
+        b.run_brandes_algorithm()
+        # endpoints count the reachable nodes, "b" is also on a-c and c-a
+        self.assertDictEqual({"a": 2.0, "b": 4.0, "c": 2.0},
+                             b.get_betweenness())
+
+    @parameterized.expand([
+        (DiGraph,),
+        (UndiGraph,),
+    ])
+    def test_workers_identical_to_serial(self, graph_class):
+        graph = build_graph(graph_class)
+        serial = Brandes(graph)
+        serial.run_brandes_algorithm()
+        parallel = Brandes(graph)
+        chunk_size = brandes.SOURCES_PER_CHUNK
+        try:
+            brandes.SOURCES_PER_CHUNK = 8
+            serial_small_chunks = Brandes(graph)
+            serial_small_chunks.run_brandes_algorithm()
+            parallel.run_brandes_algorithm(workers=3)
+        finally:
+            brandes.SOURCES_PER_CHUNK = chunk_size
+        self.assertDictEqual(serial_small_chunks.get_betweenness(),
+                             parallel.get_betweenness())
+        for node, value in serial.get_betweenness().items():
+            self.assertAlmostEqual(value, parallel.get_betweenness()[node])
+
+    @parameterized.expand([
+        (0, ValueError),
+        (1.5, TypeError),
+    ])
+    def test_workers_exceptions(self, workers, expected):
+        with self.assertRaises(expected):
+            Brandes(build_graph(UndiGraph)).run_brandes_algorithm(workers)
+
+
+class ApproximateBrandesTest(unittest.TestCase):
+    def setUp(self):
+        self.graph = build_graph(UndiGraph, 60)
+        exact = Brandes(self.graph)
+        exact.run_brandes_algorithm()
+        self.exact = exact.get_betweenness()
+
+    @parameterized.expand([
+        (False,),
+        (True,),
+    ])
+    def test_within_error_bound(self, stratified):
+        b = Brandes(self.graph)
+        b.run_approximate_brandes_algorithm(k=30, seed=1,
+                                            stratified=stratified)
+        bound = b.get_error_bound()
+        self.assertGreater(bound, 0)
+        for node, value in self.exact.items():
+            self.assertLessEqual(abs(value - b.get_betweenness()[node]),
+                                 bound)
+
+    def test_seed_reproducible(self):
+        results = []
+        for _ in range(2):
+            b = Brandes(self.graph)
+            b.run_approximate_brandes_algorithm(k=10, seed=7)
+            results.append(b.get_betweenness())
+        self.assertDictEqual(results[0], results[1])
+
+    def test_epsilon_exceeding_nodes_is_exact(self):
+        b = Brandes(self.graph)
+        b.run_approximate_brandes_algorithm(epsilon=0.01)
+        self.assertEqual(0.0, b.get_error_bound())
+        self.assertDictEqual(self.exact, b.get_betweenness())
+
+    @parameterized.expand([
+        (None, None, 0.1, ValueError),
+        (0, None, 0.1, ValueError),
+        (2.5, None, 0.1, TypeError),
+        (None, 0.1, 1.5, ValueError),
+    ])
+    def test_exceptions(self, k, epsilon, delta, expected):
+        with self.assertRaises(expected):
+            Brandes(self.graph).run_approximate_brandes_algorithm(
+                k=k, epsilon=epsilon, delta=delta)
+
+
+class WeightedBrandesTest(unittest.TestCase):
+    def setUp(self):
+        # a -> c directly costs 5, through b costs 2
+        self.graph = DiGraph()
+        self.graph.add_edge(("a", "b"), 1.0)
+        self.graph.add_edge(("b", "c"), 1.0)
+        self.graph.add_edge(("a", "c"), 5.0)
+
+    def test_weighted_shortest_paths(self):
+        b = Brandes(self.graph)
+        b.run_brandes_algorithm()
+        self.assertDictEqual({"a": 2.0, "b": 2.0, "c": 0.0},
+                             b.get_betweenness())
+
+    def test_ignore_weights(self):
+        b = Brandes(self.graph, weighted=False)
+        b.run_brandes_algorithm()
+        self.assertDictEqual({"a": 2.0, "b": 1.0, "c": 0.0},
+                             b.get_betweenness())
+
+    def test_edge_betweenness(self):
+        b = Brandes(self.graph, edge_betweenness=True)
+        b.run_brandes_algorithm()
+        self.assertDictEqual({("a", "b"): 2.0, ("b", "c"): 2.0,
+                              ("a", "c"): 0.0},
+                             b.get_edge_betweenness())
+
+    def test_undirected_edge_betweenness(self):
+        graph = UndiGraph()
+        for edge in [("a", "b"), ("b", "c")]:
+            graph.add_edge(edge)
+        b = Brandes(graph, edge_betweenness=True)
+        b.run_brandes_algorithm()
+        self.assertDictEqual({("a", "b"): 4.0, ("b", "c"): 4.0},
+                             b.get_edge_betweenness())
+
+    def test_edge_betweenness_not_enabled(self):
+        with self.assertRaises(ValueError):
+            Brandes(self.graph).get_edge_betweenness()
+
+    def test_workers_with_edges(self):
+        graph = build_graph(UndiGraph)
+        for i in range(0, 40, 3):
+            graph.add_edge((str(i), str((i + 11) % 40)), 0.5)
+        chunk_size = brandes.SOURCES_PER_CHUNK
+        results = []
+        try:
+            brandes.SOURCES_PER_CHUNK = 8
+            for workers in (1, 2):
+                b = Brandes(graph, edge_betweenness=True)
+                b.run_brandes_algorithm(workers)
+                results.append((b.get_betweenness(),
+                                b.get_edge_betweenness()))
+        finally:
+            brandes.SOURCES_PER_CHUNK = chunk_size
+        self.assertEqual(results[0], results[1])
@@ -0,0 +1,58 @@
+import unittest
+import math
+from parameterized import parameterized
+from netwalk.utils.graph import DiGraph, UndiGraph
+from netwalk.algorithms.shortestpath.dijkstra import Dijkstra
+
+
+def build_graph():
+    graph = DiGraph()
+    graph.add_edge(("a", "b"), 1.0)
+    graph.add_edge(("b", "c"), 2.0)
+    graph.add_edge(("a", "c"), 4.0)
+    graph.add_edge(("c", "d"), 1.0)
+    graph.add_edge(("e", "a"), 1.0)
+    return graph
+
+
+class DijkstraTest(unittest.TestCase):
+    def test_single_source(self):
+        graph = build_graph()
+        dist, pred = Dijkstra(graph, "a").shortest_path()
+        csr = graph.to_csr()
+        distances = {csr.get_node_label(i): d for i, d in enumerate(dist)}
+        self.assertDictEqual({"a": 0.0, "b": 1.0, "c": 3.0, "d": 4.0,
+                              "e": math.inf}, distances)
+        self.assertEqual(-1, pred[csr.get_node_id("a")])
+        self.assertEqual(csr.get_node_id("b"), pred[csr.get_node_id("c")])
+
+    @parameterized.expand([
+        ("a", "d", ["a", "b", "c", "d"], 4.0),
+        ("e", "c", ["e", "a", "b", "c"], 4.0),
+        ("d", "a", [], math.inf),
+        ("b", "b", ["b"], 0.0),
+    ])
+    def test_path(self, src, target, expected, distance):
+        dijkstra = Dijkstra(build_graph(), src)
+        self.assertListEqual(expected, dijkstra.get_path(target))
+        self.assertEqual(distance, dijkstra.get_distance(target))
+
+    def test_multi_source(self):
+        dijkstra = Dijkstra(build_graph(), ["b", "e"])
+        self.assertListEqual(["e", "a"], dijkstra.get_path("a"))
+        self.assertListEqual(["b", "c", "d"], dijkstra.get_path("d"))
+
+    def test_unweighted(self):
+        graph = UndiGraph()
+        for edge in [("1", "2"), ("2", "3"), ("3", "4"), ("1", "4")]:
+            graph.add_edge(edge)
+        self.assertEqual(2.0, Dijkstra(graph, "1").get_distance("3"))
+        self.assertListEqual(["1", "4"], Dijkstra(graph, "1").get_path("4"))
+
+    @parameterized.expand([
+        ("x",),
+        ([],),
+    ])
+    def test_source_exceptions(self, src):
+        with self.assertRaises(ValueError):
+            Dijkstra(build_graph(), src)
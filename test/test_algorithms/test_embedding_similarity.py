@@ -0,0 +1,102 @@
+import unittest
+import math
+from unittest import mock
+import numpy as np
+from parameterized import parameterized
+from netwalk.utils.graph import UndiGraph
+from netwalk.algorithms.link_prediction import embedding_similarity
+from netwalk.algorithms.link_prediction.similarity_methods import \
+    EmbeddingMeasure
+from netwalk.algorithms.link_prediction.embedding_similarity import \
+    EmbeddingSimilarity
+from test.graphs import build_random_graph
+
+
+def expected_score(a, b, measure, weights):
+    if measure == EmbeddingMeasure.DOT:
+        return sum(x * y for x, y in zip(a, b))
+    if measure == EmbeddingMeasure.HADAMARD:
+        return sum(x * y * w for x, y, w in zip(a, b, weights))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return sum(x * y for x, y in zip(a, b)) / norm if norm else 0.0
+
+
+class EmbeddingSimilarityTest(unittest.TestCase):
+    def setUp(self):
+        self.graph = build_random_graph(UndiGraph, 30, 60, 1)
+        rng = np.random.default_rng(1)
+        self.embeddings = rng.standard_normal(
+            (self.graph.get_nodes_count(), 8)).astype(np.float32)
+        # a zero embedding has no cosine
+        self.embeddings[0] = 0
+        self.weights = rng.standard_normal(8)
+        labels = self.graph.to_csr().get_labels()
+        self.pairs = [(labels[i], labels[j], "1")
+                      for i in range(len(labels))
+                      for j in range(0, len(labels), 3)] + \
+            [("missing", labels[1], "0")]
+
+    @parameterized.expand([
+        (EmbeddingMeasure.COSINE,),
+        (EmbeddingMeasure.DOT,),
+        (EmbeddingMeasure.HADAMARD,),
+    ])
+    def test_matches_per_pair(self, measure):
+        similarity = EmbeddingSimilarity(self.graph, self.embeddings,
+                                         self.weights)
+        csr = self.graph.to_csr()
+        scores = similarity.compute_proximity_scores(self.pairs, measure)
+        self.assertEqual(len(self.pairs), len(scores))
+        for pair, score in zip(self.pairs[:-1], scores.tolist()):
+            a = self.embeddings[csr.get_node_id(pair[0])].tolist()
+            b = self.embeddings[csr.get_node_id(pair[1])].tolist()
+            self.assertAlmostEqual(
+                expected_score(a, b, measure,
+                               self.weights.astype(np.float32).tolist()),
+                score, places=4)
+        self.assertEqual(0.0, scores[-1])
+
+    def test_multiple_measures_and_chunks(self):
+        similarity = EmbeddingSimilarity(self.graph.to_csr(),
+                                         self.embeddings, self.weights)
+        measures = list(EmbeddingMeasure)
+        with mock.patch.object(embedding_similarity, "CHUNK_SIZE", 7):
+            scores = similarity.compute_proximity_scores(self.pairs,
+                                                         measures)
+        self.assertEqual((len(self.pairs), len(measures)), scores.shape)
+        for column, measure in enumerate(measures):
+            np.testing.assert_allclose(
+                similarity.compute_proximity_scores(self.pairs, measure),
+                scores[:, column], atol=1e-5)
+
+    def test_follows_embeddings(self):
+        similarity = EmbeddingSimilarity(self.graph, self.embeddings)
+        src, dst = similarity.get_pair_ids(self.pairs[:5])
+        before = similarity.compute_proximity_scores_by_ids(
+            src, dst, EmbeddingMeasure.DOT)
+        self.embeddings *= 2
+        np.testing.assert_allclose(
+            before * 4, similarity.compute_proximity_scores_by_ids(
+                src, dst, EmbeddingMeasure.DOT), rtol=1e-6)
+
+    def test_hadamard_features(self):
+        similarity = EmbeddingSimilarity(self.graph, self.embeddings)
+        features = similarity.hadamard_features([1, 2, -1], [3, 4, 5])
+        self.assertEqual((3, 8), features.shape)
+        self.assertEqual(np.float32, features.dtype)
+        self.assertListEqual((self.embeddings[1] * self.embeddings[3])
+                             .tolist(), features[0].tolist())
+        self.assertListEqual([0.0] * 8, features[2].tolist())
+
+    def test_exceptions(self):
+        with self.assertRaises(ValueError):
+            EmbeddingSimilarity(self.graph, self.embeddings[1:])
+        with self.assertRaises(ValueError):
+            EmbeddingSimilarity(self.graph, self.embeddings, np.ones(3))
+        similarity = EmbeddingSimilarity(self.graph, self.embeddings)
+        with self.assertRaises(ValueError):
+            similarity.compute_proximity_scores(self.pairs,
+                                                EmbeddingMeasure.HADAMARD)
+        with self.assertRaises(ValueError):
+            similarity.compute_proximity_scores_by_ids(
+                [1, 2], [3], EmbeddingMeasure.DOT)
@@ -0,0 +1,61 @@
+import unittest
+import numpy as np
+from parameterized import parameterized
+from netwalk.utils.graph import DiGraph, UndiGraph
+from netwalk.algorithms.shortestpath.BFS import BFS
+from netwalk.algorithms.shortestpath.multi_source_bfs import MultiSourceBFS
+from test.graphs import build_random_graph
+
+
+class MultiSourceBFSTest(unittest.TestCase):
+    @parameterized.expand([
+        (DiGraph, 150, 300, 1),
+        (UndiGraph, 150, 200, 2),
+        (DiGraph, 150, 3000, 3),
+    ])
+    def test_distances_match_bfs(self, graph_class, num_of_nodes,
+                                 num_of_edges, seed):
+        csr = build_random_graph(graph_class, num_of_nodes, num_of_edges,
+                                 seed).to_csr()
+        # more than one batch, with a repeated source
+        sources = list(csr.get_labels())[:100] + [csr.get_node_label(0)]
+        dist = MultiSourceBFS(csr).search(sources)
+        self.assertEqual(np.uint8, dist.dtype)
+        bfs = BFS(csr)
+        for row, src in enumerate(sources):
+            levels, _ = bfs.search(src)
+            levels[levels < 0] = np.iinfo(np.uint8).max
+            self.assertListEqual(levels.tolist(), dist[row].tolist())
+
+    def test_widen_to_uint16(self):
+        graph = DiGraph()
+        for i in range(300):
+            graph.add_edge(("n{:03d}".format(i), "n{:03d}".format(i + 1)))
+        graph.add_node("x")
+        csr = graph.to_csr()
+        dist = MultiSourceBFS(csr).search(["n000", "n299"])
+        self.assertEqual(np.uint16, dist.dtype)
+        self.assertEqual(300, dist[0, csr.get_node_id("n300")])
+        self.assertEqual(np.iinfo(np.uint16).max,
+                         dist[0, csr.get_node_id("x")])
+        self.assertEqual(np.iinfo(np.uint16).max,
+                         dist[1, csr.get_node_id("n000")])
+
+    def test_max_depth(self):
+        graph = UndiGraph()
+        for edge in [("a", "b"), ("b", "c"), ("c", "d")]:
+            graph.add_edge(edge)
+        dist = MultiSourceBFS(graph).search(["a", "d"], max_depth=1)
+        self.assertListEqual([[0, 1, 255, 255], [255, 255, 1, 0]],
+                             dist.tolist())
+
+    @parameterized.expand([
+        (["unknown"], None),
+        ([], None),
+        (["a"], -1),
+    ])
+    def test_exceptions(self, sources, max_depth):
+        graph = DiGraph()
+        graph.add_edge(("a", "b"))
+        with self.assertRaises(ValueError):
+            MultiSourceBFS(graph).search(sources, max_depth)
@@ -0,0 +1,274 @@
+import unittest
+import math
+import random
+from unittest import mock
+from parameterized import parameterized
+from netwalk.utils.graph import DiGraph, UndiGraph
+from netwalk.algorithms.link_prediction import neighbourhood_based_similarity
+from netwalk.algorithms.link_prediction.similarity_methods import Measure
+from netwalk.algorithms\
+    .link_prediction\
+    .neighbourhood_based_similarity import NeighbourhoodBasedSimilarity
+from netwalk.utils.csr import gather_neighbours
+from test.graphs import build_random_graph
+
+
+def random_pairs(num_of_nodes, num_of_pairs, seed):
+    rng = random.Random(seed)
+    # includes nodes not in the graph and pairs of the same node
+    return [(str(rng.randrange(num_of_nodes + 5)),
+             str(rng.randrange(num_of_nodes + 5)), "1")
+            for _ in range(num_of_pairs)] + [("0", "0", "0")]
+
+
+def expected_top_k(graph, k, measure):
+    csr = graph.to_csr()
+    similarity = NeighbourhoodBasedSimilarity(csr)
+    adj_list = {node: set(neighbours) for node, neighbours
+                in csr.get_out_adj_list().items()}
+    links = []
+    for src in csr.get_labels():
+        candidates = [dst for dst in csr.get_labels()
+                      if dst != src and dst not in adj_list.get(src, ())
+                      and (measure == Measure.KATZ or
+                           adj_list.get(src, set()) &
+                           adj_list.get(dst, set()))]
+        scores = similarity.compute_proximity_scores(
+            [(src, dst) for dst in candidates], measure).tolist()
+        if measure == Measure.KATZ:
+            # the pairs without a path of length 2 or 3
+            candidates = [dst for dst, score in zip(candidates, scores)
+                          if score > 0]
+            scores = [score for score in scores if score > 0]
+        ranked = sorted(zip(scores, candidates),
+                        key=lambda x: (-x[0], csr.get_node_id(x[1])))
+        links.extend((src, dst, score) for score, dst in ranked[:k])
+    return links
+
+
+def expected_score(adj_list, pair, measure, beta=0.05):
+    def neighbours(node):
+        return set(adj_list.get(node, []))
+
+    setA, setB = neighbours(pair[0]), neighbours(pair[1])
+    commons = setA & setB
+    degrees = [len(adj_list.get(node, [])) for node in commons]
+    if measure == Measure.KATZ:
+        second = [neighbours(node) for node in setA]
+        third = [neighbours(node) for nodes in second for node in nodes]
+        return beta * (pair[1] in setA) + \
+            beta ** 2 * sum(pair[1] in nodes for nodes in second) + \
+            beta ** 3 * sum(pair[1] in nodes for nodes in third)
+    if measure == Measure.PREFERENTIAL:
+        return len(setA) * len(setB)
+    if measure == Measure.ADAR:
+        return sum(1 / math.log(degree) for degree in degrees if degree > 1)
+    if measure == Measure.RESOURCE_ALLOCATION:
+        return sum(1 / degree for degree in degrees if degree > 0)
+    if measure == Measure.COMMON_NEIGHBOURS:
+        return len(commons)
+    denominator = {
+        Measure.JACCARD: len(setA | setB),
+        Measure.SALTON: math.sqrt(len(setA) * len(setB)),
+        Measure.SORENSEN: (len(setA) + len(setB)) / 2,
+        Measure.HUB_PROMOTED: min(len(setA), len(setB)),
+        Measure.HUB_DEPRESSED: max(len(setA), len(setB)),
+    }[measure]
+    return len(commons) / denominator if denominator else 0.0
+
+
+class NeighbourhoodBasedSimilarityTest(unittest.TestCase):
+    @parameterized.expand([
+        (DiGraph, 40, 150, 1),
+        (UndiGraph, 40, 150, 2),
+        (UndiGraph, 30, 600, 3),
+    ])
+    def test_batch_matches_per_pair(self, graph_class, num_of_nodes,
+                                    num_of_edges, seed):
+        graph = build_random_graph(graph_class, num_of_nodes, num_of_edges,
+                                   seed)
+        adj_list = dict(graph.get_out_adj_list())
+        pairs = random_pairs(num_of_nodes, 300, seed)
+        similarity = NeighbourhoodBasedSimilarity(graph)
+        for measure in Measure:
+            scores = similarity.compute_proximity_scores(pairs, measure)
+            self.assertEqual(len(pairs), len(scores))
+            for pair, score in zip(pairs, scores.tolist()):
+                self.assertAlmostEqual(
+                    expected_score(adj_list, pair, measure), score)
+
+    def test_same_as_compute_proximity_score(self):
+        graph = build_random_graph(UndiGraph, 30, 200, 4)
+        pairs = [(str(i), str(i + 1), "1") for i in range(29)]
+        similarity = NeighbourhoodBasedSimilarity(graph.to_csr())
+        for measure in Measure:
+            scores = similarity.compute_proximity_scores(pairs, measure)
+            for pair, score in zip(pairs, scores.tolist()):
+                self.assertAlmostEqual(
+                    similarity.compute_proximity_score(pair, measure)[3],
+                    score)
+
+    @parameterized.expand([
+        (DiGraph, 1),
+        (UndiGraph, 2),
+    ])
+    def test_multiple_measures(self, graph_class, seed):
+        graph = build_random_graph(graph_class, 30, 120, seed)
+        pairs = random_pairs(30, 100, seed)
+        similarity = NeighbourhoodBasedSimilarity(graph, beta=0.1)
+        measures = [Measure.KATZ, Measure.SALTON, Measure.ADAR,
+                    Measure.RESOURCE_ALLOCATION, Measure.PREFERENTIAL]
+        scores = similarity.compute_proximity_scores(pairs, measures)
+        self.assertEqual((len(pairs), len(measures)), scores.shape)
+        for column, measure in enumerate(measures):
+            self.assertListEqual(
+                similarity.compute_proximity_scores(pairs, measure).tolist(),
+                scores[:, column].tolist())
+        adj_list = dict(graph.get_out_adj_list())
+        for pair, score in zip(pairs, scores[:, 0].tolist()):
+            self.assertAlmostEqual(
+                expected_score(adj_list, pair, Measure.KATZ, 0.1), score)
+            self.assertAlmostEqual(
+                similarity.katz_similarity(pair[0], pair[1]), score)
+
+    def test_chunks(self):
+        graph = build_random_graph(UndiGraph, 50, 400, 5)
+        pairs = random_pairs(50, 200, 5)
+        expected = NeighbourhoodBasedSimilarity(graph)\
+            .compute_proximity_scores(pairs, Measure.ADAR)
+        expected_katz = NeighbourhoodBasedSimilarity(graph)\
+            .compute_proximity_scores(pairs, Measure.KATZ)
+        with mock.patch.object(neighbourhood_based_similarity,
+                               "CHUNK_SIZE", 7):
+            actual = NeighbourhoodBasedSimilarity(graph)\
+                .compute_proximity_scores(pairs, Measure.ADAR)
+            actual_katz = NeighbourhoodBasedSimilarity(graph)\
+                .compute_proximity_scores(pairs, Measure.KATZ)
+        self.assertListEqual(expected.tolist(), actual.tolist())
+        self.assertListEqual(expected_katz.tolist(), actual_katz.tolist())
+
+    def test_by_ids(self):
+        graph = build_random_graph(DiGraph, 20, 60, 6)
+        csr = graph.to_csr()
+        pairs = random_pairs(20, 50, 6)
+        similarity = NeighbourhoodBasedSimilarity(graph)
+        src = [csr.get_node_id(pair[0], -1) for pair in pairs]
+        dst = [csr.get_node_id(pair[1], -1) for pair in pairs]
+        self.assertListEqual(
+            similarity.compute_proximity_scores(pairs,
+                                                Measure.JACCARD).tolist(),
+            similarity.compute_proximity_scores_by_ids(
+                src, dst, Measure.JACCARD).tolist())
+        self.assertEqual(0, len(similarity.compute_proximity_scores(
+            [], Measure.ADAR)))
+        with self.assertRaises(ValueError):
+            similarity.compute_proximity_scores_by_ids(src, dst[1:],
+                                                       Measure.ADAR)
+
+    @parameterized.expand([
+        (DiGraph, Measure.ADAR, 3, 1),
+        (UndiGraph, Measure.ADAR, 2, 2),
+        (UndiGraph, Measure.JACCARD, 4, 3),
+        (DiGraph, Measure.JACCARD, 1, 4),
+        (UndiGraph, Measure.PREFERENTIAL, 3, 5),
+        (UndiGraph, Measure.COMMON_NEIGHBOURS, 3, 6),
+        (DiGraph, Measure.RESOURCE_ALLOCATION, 2, 7),
+        (UndiGraph, Measure.SALTON, 3, 8),
+        (UndiGraph, Measure.SORENSEN, 2, 9),
+        (DiGraph, Measure.HUB_PROMOTED, 3, 10),
+        (UndiGraph, Measure.HUB_DEPRESSED, 3, 11),
+        (UndiGraph, Measure.KATZ, 2, 12),
+        (DiGraph, Measure.KATZ, 3, 13),
+    ])
+    def test_top_k_candidates(self, graph_class, measure, k, seed):
+        graph = build_random_graph(graph_class, 40, 200, seed)
+        # a star makes the centre a hub
+        for i in range(12):
+            graph.add_edge(("hub", str(i * 3)))
+        expected = expected_top_k(graph, k, measure)
+        for hub_degree in (64, 3):
+            with mock.patch.object(neighbourhood_based_similarity,
+                                   "HUB_DEGREE", hub_degree):
+                chunks = list(NeighbourhoodBasedSimilarity(graph)
+                              .top_k_candidates(k, measure, chunk_size=7))
+            self.assertEqual(6, len(chunks))
+            actual = [link for chunk in chunks for link in chunk]
+            self.assertEqual(len(expected), len(actual))
+            for expected_link, actual_link in zip(expected, actual):
+                self.assertEqual(expected_link[:2], actual_link[:2])
+                self.assertAlmostEqual(expected_link[2], actual_link[2])
+
+    def test_top_k_candidates_in_pool(self):
+        graph = build_random_graph(UndiGraph, 60, 300, 7)
+        similarity = NeighbourhoodBasedSimilarity(graph)
+        nodes = ["5", "missing", "1", "30"]
+        expected = list(similarity.top_k_candidates(3, Measure.ADAR, nodes,
+                                                    chunk_size=1))
+        actual = list(similarity.top_k_candidates(3, Measure.ADAR, nodes,
+                                                  chunk_size=1, workers=2))
+        self.assertListEqual(expected, actual)
+        self.assertListEqual(["5", "1", "30"],
+                             [chunk[0][0] for chunk in actual])
+
+    def test_top_k_candidates_katz_three_hops(self):
+        graph = DiGraph()
+        for edge in (("a", "b"), ("b", "c"), ("c", "d")):
+            graph.add_edge(edge)
+        similarity = NeighbourhoodBasedSimilarity(graph, beta=0.5)
+        links = [link for chunk in similarity.top_k_candidates(
+            3, Measure.KATZ) for link in chunk]
+        self.assertListEqual([("a", "c", 0.25), ("a", "d", 0.125),
+                              ("b", "d", 0.25)], links)
+
+    def test_top_k_candidates_katz_bounded_walks(self):
+        graph = build_random_graph(UndiGraph, 30, 400, 14)
+        csr = graph.to_csr()
+        adj_list = dict(csr.get_out_adj_list())
+        gathered = []
+
+        def gather(*args, **kwargs):
+            neighbours, owners = gather_neighbours(*args, **kwargs)
+            gathered.append(len(neighbours))
+            return neighbours, owners
+
+        with mock.patch.object(neighbourhood_based_similarity,
+                               "CHUNK_SIZE", 40), \
+                mock.patch.object(neighbourhood_based_similarity,
+                                  "gather_neighbours", gather):
+            links = [link for chunk in NeighbourhoodBasedSimilarity(graph)
+                     .top_k_candidates(3, Measure.KATZ, chunk_size=1)
+                     for link in chunk]
+        max_degree = max(len(set(nodes)) for nodes in adj_list.values())
+        self.assertLessEqual(max(gathered), 40 + max_degree)
+        expected = []
+        for src in csr.get_labels():
+            scores = [(-expected_score(adj_list, (src, dst), Measure.KATZ),
+                       csr.get_node_id(dst), dst)
+                      for dst in csr.get_labels()
+                      if dst != src and dst not in adj_list[src]]
+            expected.extend((src, dst, -score)
+                            for score, _, dst in sorted(scores)[:3]
+                            if score < 0)
+        self.assertEqual(len(expected), len(links))
+        for expected_link, link in zip(expected, links):
+            self.assertEqual(expected_link[:2], link[:2])
+            self.assertAlmostEqual(expected_link[2], link[2])
+
+    def test_top_k_candidates_in_pool_keeps_beta(self):
+        graph = build_random_graph(UndiGraph, 60, 300, 8)
+        similarity = NeighbourhoodBasedSimilarity(graph, beta=0.3)
+        expected = list(similarity.top_k_candidates(3, Measure.KATZ,
+                                                    chunk_size=20))
+        actual = list(similarity.top_k_candidates(3, Measure.KATZ,
+                                                  chunk_size=20, workers=2))
+        self.assertListEqual(expected, actual)
+
+    @parameterized.expand([
+        (0, 1, ValueError),
+        (1.5, 1, TypeError),
+        (1, 0, ValueError),
+    ])
+    def test_top_k_candidates_exceptions(self, k, workers, expected):
+        similarity = NeighbourhoodBasedSimilarity(UndiGraph())
+        with self.assertRaises(expected):
+            similarity.top_k_candidates(k, Measure.ADAR, workers=workers)
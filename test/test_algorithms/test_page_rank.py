@@ -0,0 +1,112 @@
+import unittest
+import random
+from unittest import mock
+import numpy as np
+from parameterized import parameterized
+from netwalk.utils.graph import DiGraph, UndiGraph
+from netwalk.algorithms.centrality.pageRank import PageRank
+
+
+EDGES = [
+    ("a", "b"),
+    ("a", "c"),
+    ("b", "c"),
+    ("c", "a"),
+    ("d", "c"),
+    ("c", "e"),
+]
+
+
+def google_matrix_rank(graph, alpha):
+    """
+    dense reference solution of the page rank linear system
+    """
+    csr = graph.to_csr()
+    n = csr.get_nodes_count()
+    transition = np.zeros((n, n))
+    for src in range(n):
+        neighbours = csr.get_out_neighbour_ids(src)
+        if len(neighbours):
+            for dst in neighbours:
+                transition[dst, src] += 1 / len(neighbours)
+        else:
+            transition[:, src] = 1 / n
+    weights = np.linalg.solve(np.eye(n) - alpha * transition,
+                              np.full(n, (1 - alpha) / n))
+    return dict(zip(csr.get_labels(), weights))
+
+
+class PageRankSparseTest(unittest.TestCase):
+    @parameterized.expand([
+        (DiGraph,),
+        (UndiGraph,),
+    ])
+    def test_sparse_matches_dense_solution(self, graph_class):
+        graph = graph_class()
+        for edge in EDGES:
+            graph.add_edge(edge)
+        expected = google_matrix_rank(graph, 0.85)
+        actual = PageRank(graph, threshold=1.0e-12,
+                          sparse=True).run_page_rank_algorithm()
+        self.assertSetEqual(set(expected), set(actual))
+        for node, weight in expected.items():
+            self.assertAlmostEqual(weight, actual[node], places=8)
+        self.assertAlmostEqual(1.0, sum(actual.values()))
+
+
+class PageRankUpdateTest(unittest.TestCase):
+    def assert_fixed_point(self, graph, weights):
+        expected = google_matrix_rank(graph, 0.85)
+        self.assertSetEqual(set(expected), set(weights))
+        for node, weight in expected.items():
+            self.assertAlmostEqual(weight, weights[node], places=8)
+
+    @parameterized.expand([
+        (DiGraph, 1),
+        (UndiGraph, 2),
+    ])
+    def test_update_matches_full_recompute(self, graph_class, seed):
+        rng = random.Random(seed)
+        graph = graph_class()
+        for edge in EDGES:
+            graph.add_edge(edge)
+        page_rank = PageRank(graph, threshold=1.0e-12, sparse=True)
+        page_rank.run_page_rank_algorithm()
+        for _ in range(4):
+            # new nodes, duplicated edges, self loops and edges leaving
+            # dangling nodes
+            edges = [(str(rng.randrange(12)), str(rng.randrange(12)))
+                     for _ in range(6)] + [("e", "f"), ("g", "g")]
+            weights = page_rank.update(edges)
+            self.assert_fixed_point(graph, weights)
+            self.assertAlmostEqual(1.0, sum(weights.values()))
+
+    def test_update_without_previous_run(self):
+        graph = DiGraph()
+        page_rank = PageRank(graph, threshold=1.0e-12)
+        self.assert_fixed_point(graph, page_rank.update(EDGES[:3]))
+        self.assert_fixed_point(graph, page_rank.update(EDGES[3:]))
+        self.assertEqual(5, len(page_rank.update([])))
+
+    def test_update_is_incremental(self):
+        graph = UndiGraph()
+        for edge in EDGES:
+            graph.add_edge(edge)
+        page_rank = PageRank(graph, threshold=1.0e-12, sparse=True)
+        page_rank.run_page_rank_algorithm()
+        # the graph changed after the run, the first update compares the
+        # weights with the whole graph
+        graph.add_edge(("d", "e"))
+        page_rank.update([("b", "d")])
+        with mock.patch.object(PageRank, "page_rank_sparse_alg",
+                               side_effect=AssertionError), \
+                mock.patch.object(PageRank, "_get_transition",
+                                  side_effect=AssertionError):
+            weights = page_rank.update([("x", "a"), ("e", "x")])
+        self.assert_fixed_point(graph, weights)
+
+    def test_update_needs_mutable_graph(self):
+        graph = DiGraph()
+        graph.add_edge(("a", "b"))
+        with self.assertRaises(ValueError):
+            PageRank(graph.to_csr()).update([("a", "c")])
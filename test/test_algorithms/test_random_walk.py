@@ -0,0 +1,235 @@
+import unittest
+import io
+import os
+import tempfile
+from collections import Counter
+from parameterized import parameterized
+from netwalk.utils.graph import DiGraph, UndiGraph
+from netwalk.algorithms.link_prediction.walk_strategy import Walk
+from netwalk.algorithms.link_prediction.deepwalk import Deepwalk
+from netwalk.algorithms.link_prediction.random_walk import RandomWalker, PAD
+from test.graphs import build_random_graph
+
+
+class RandomWalkerTest(unittest.TestCase):
+    @parameterized.expand([
+        (DiGraph, Walk.DFS),
+        (UndiGraph, Walk.DFS),
+        (DiGraph, Walk.BFS),
+        (UndiGraph, Walk.BFS),
+        (DiGraph, Walk.BFS_DFS),
+        (UndiGraph, Walk.BFS_DFS),
+    ])
+    def test_walks_follow_edges(self, graph_class, strategy):
+        graph = build_random_graph(graph_class, 30, 60, 1)
+        graph.add_node("isolated")
+        adj_list = graph.get_out_adj_list()
+        walker = RandomWalker(graph, strategy, walk_length=8, seed=1)
+        walks = walker.walks(iteration=3)
+        self.assertEqual((3 * graph.get_nodes_count(), 8), walks.shape)
+        for walk in walker.to_labels(walks):
+            for step, node in enumerate(walk[1:]):
+                if strategy == Walk.DFS:
+                    self.assertIn(node, adj_list.get(walk[step], []))
+                elif strategy == Walk.BFS_DFS:
+                    # a BFS step does not move, so the node is next to one
+                    # of the nodes visited before
+                    self.assertTrue(any(
+                        node == visited or node in adj_list.get(visited, [])
+                        for visited in walk[:step + 1]))
+        labels = list(walker.graph.get_labels())
+        for start, walk in zip(list(range(len(labels))) * 3,
+                               walks.tolist()):
+            walk = [node for node in walk if node != PAD]
+            if strategy == Walk.BFS:
+                closed = set(adj_list.get(labels[start], [])) | \
+                    {labels[start]}
+                self.assertTrue({labels[i] for i in walk} <= closed)
+            else:
+                self.assertEqual(start, walk[0])
+
+    def test_dead_end_is_padded(self):
+        graph = DiGraph()
+        graph.add_edge(("a", "b"))
+        graph.add_node("c")
+        walker = RandomWalker(graph, Walk.DFS, walk_length=4, seed=2)
+        self.assertListEqual([[0, 1, PAD, PAD], [1, PAD, PAD, PAD],
+                              [2, PAD, PAD, PAD]],
+                             walker.walks().tolist())
+        self.assertListEqual([["a", "b"], ["b"], ["c"]],
+                             walker.to_labels(walker.walks()))
+
+    @parameterized.expand([
+        (Walk.DFS,),
+        (Walk.BFS,),
+        (Walk.BFS_DFS,),
+    ])
+    def test_seeded(self, strategy):
+        graph = build_random_graph(UndiGraph, 50, 200, 3)
+        expected = RandomWalker(graph, strategy, 6, seed=7).walks(2)
+        self.assertListEqual(
+            expected.tolist(),
+            RandomWalker(graph.to_csr(), strategy, 6, seed=7)
+            .walks(2).tolist())
+        self.assertNotEqual(
+            expected.tolist(),
+            RandomWalker(graph, strategy, 6, seed=8).walks(2).tolist())
+
+    def test_uniform_neighbours(self):
+        graph = UndiGraph()
+        for node in "abcd":
+            graph.add_edge(("centre", node))
+        walker = RandomWalker(graph, Walk.DFS, walk_length=2, seed=4)
+        centre = walker.graph.get_node_id("centre")
+        walks = walker.walk([centre] * 4000)
+        counts = Counter(walker.to_labels(walks[:, 1]))
+        self.assertSetEqual(set("abcd"), set(counts))
+        for count in counts.values():
+            self.assertAlmostEqual(1000, count, delta=150)
+
+    @parameterized.expand([
+        (Walk.DFS, 1, 1 << 16),
+        (Walk.BFS_DFS, 2, 7),
+        (Walk.BFS, 3, 10),
+        (Walk.DFS, 4, 1),
+    ])
+    def test_shards_independent_of_workers(self, strategy, workers,
+                                           shard_size):
+        graph = build_random_graph(DiGraph, 25, 60, 6)
+        expected = list(RandomWalker(graph, strategy, 5, seed=3)
+                        .walk_shards(4, shard_size=shard_size))
+        self.assertEqual(-(-4 * graph.get_nodes_count() // shard_size),
+                         len(expected))
+        actual = list(RandomWalker(graph, strategy, 5, seed=3)
+                      .walk_shards(4, workers, shard_size))
+        self.assertListEqual([shard.tolist() for shard in expected],
+                             [shard.tolist() for shard in actual])
+        walks = [walk for shard in actual for walk in shard.tolist()]
+        num_of_nodes = graph.get_nodes_count()
+        for i, walk in enumerate(walks):
+            if strategy != Walk.BFS:
+                self.assertEqual(i % num_of_nodes, walk[0])
+
+    def test_write_corpus(self):
+        graph = build_random_graph(UndiGraph, 30, 80, 7)
+        graph.add_edge(("é", "0"))
+        walker = RandomWalker(graph, Walk.DFS, 6, seed=5)
+        walks = [walk for shard in walker.walk_shards(3, shard_size=11)
+                 for walk in walker.to_labels(shard)]
+        stream = io.BytesIO()
+        self.assertEqual(len(walks), walker.write_corpus(
+            stream, 3, workers=2, shard_size=11))
+        fd, file = tempfile.mkstemp(suffix=".txt")
+        os.close(fd)
+        try:
+            walker.write_corpus(file, 3, shard_size=11)
+            with open(file, encoding='utf-8') as f:
+                self.assertListEqual(walks, [line.split() for line in f])
+            with open(file, 'rb') as f:
+                self.assertEqual(stream.getvalue(), f.read())
+        finally:
+            os.remove(file)
+
+    @parameterized.expand([
+        ({"iteration": 0}, ValueError),
+        ({"workers": 0}, ValueError),
+        ({"shard_size": 1.5}, TypeError),
+    ])
+    def test_shard_exceptions(self, params, expected):
+        with self.assertRaises(expected):
+            RandomWalker(UndiGraph()).walk_shards(**params)
+
+    @parameterized.expand([
+        (None, 1.0),
+        (0, 1.0),
+        (None, 3.0),
+        (1, 3.0),
+    ])
+    def test_node2vec_bias(self, lazy_degree, weight):
+        graph = UndiGraph()
+        for edge in (("0", "1"), ("0", "2"), ("1", "2")):
+            graph.add_edge(edge)
+        graph.add_edge(("1", "3"), weight)
+        walker = RandomWalker(graph, Walk.NODE2VEC, walk_length=3, seed=9,
+                              return_param=2.0, inout_param=0.5,
+                              lazy_degree=lazy_degree)
+        walks = walker.walk([walker.graph.get_node_id("0")] * 20000)
+        walks = walks[walks[:, 1] == walker.graph.get_node_id("1")]
+        counts = Counter(walker.to_labels(walks[:, 2]))
+        # returning is divided by p, leaving the neighbourhood of the
+        # previous node by q
+        expected = {"0": 0.5, "2": 1.0, "3": 2.0 * weight}
+        total = sum(expected.values())
+        for node, value in expected.items():
+            self.assertAlmostEqual(value / total, counts[node] / len(walks),
+                                   delta=0.02)
+
+    @parameterized.expand([
+        (DiGraph, None),
+        (UndiGraph, 2),
+        (UndiGraph, 0),
+    ])
+    def test_node2vec_walks_follow_edges(self, graph_class, lazy_degree):
+        graph = build_random_graph(graph_class, 40, 150, 8)
+        for i in range(10):
+            graph.add_edge(("hub", str(i)), 1.0 + i)
+        adj_list = graph.get_out_adj_list()
+        walker = RandomWalker(graph, Walk.NODE2VEC, walk_length=6, seed=3,
+                              return_param=0.5, inout_param=2.0,
+                              lazy_degree=lazy_degree)
+        expected = walker.walks(2)
+        for walk in walker.to_labels(expected):
+            for step, node in enumerate(walk[1:]):
+                self.assertIn(node, adj_list[walk[step]])
+        self.assertListEqual(
+            expected.tolist(),
+            RandomWalker(graph, Walk.NODE2VEC, walk_length=6, seed=3,
+                         return_param=0.5, inout_param=2.0,
+                         lazy_degree=lazy_degree).walks(2).tolist())
+
+    def test_weighted_dfs(self):
+        graph = DiGraph()
+        graph.add_edge(("a", "b"), 1.0)
+        graph.add_edge(("a", "c"), 3.0)
+        walker = RandomWalker(graph, Walk.DFS, walk_length=2, seed=6)
+        walks = walker.walk([walker.graph.get_node_id("a")] * 8000)
+        counts = Counter(walker.to_labels(walks[:, 1]))
+        self.assertAlmostEqual(0.75, counts["c"] / 8000, delta=0.02)
+
+    @parameterized.expand([
+        ({"walk_length": 0}, ValueError),
+        ({"walk_length": 1.5}, TypeError),
+        ({"p": 2}, ValueError),
+        ({"strategy": 1}, TypeError),
+        ({"return_param": 0}, ValueError),
+        ({"inout_param": -1}, ValueError),
+        ({"lazy_degree": 1.5}, TypeError),
+    ])
+    def test_exceptions(self, params, expected):
+        with self.assertRaises(expected):
+            RandomWalker(UndiGraph(), **params)
+
+
+class DeepwalkTest(unittest.TestCase):
+    def test_iteration(self):
+        graph = build_random_graph(UndiGraph, 20, 50, 5)
+        deepwalk = Deepwalk(graph, Walk.BFS_DFS, walk_length=4, iteration=3,
+                            seed=11, shard_size=7)
+        sentences = list(deepwalk)
+        self.assertEqual(3 * graph.get_nodes_count(), len(sentences))
+        self.assertListEqual(sentences, list(deepwalk))
+        walker = RandomWalker(graph, Walk.BFS_DFS, 4, seed=11)
+        self.assertListEqual(walker.to_labels(deepwalk.get_walks()),
+                             sentences)
+        self.assertListEqual(
+            sentences,
+            list(Deepwalk(graph, Walk.BFS_DFS, walk_length=4, iteration=3,
+                          seed=11, workers=2, shard_size=7)))
+
+    @parameterized.expand([
+        (0, ValueError),
+        (1.5, TypeError),
+    ])
+    def test_exceptions(self, iteration, expected):
+        with self.assertRaises(expected):
+            Deepwalk(UndiGraph(), Walk.DFS, iteration=iteration)
@@ -0,0 +1,108 @@
+import unittest
+from unittest import mock
+import numpy as np
+from parameterized import parameterized
+from netwalk.utils.graph import UndiGraph
+from netwalk.algorithms.link_prediction import skipgram
+from netwalk.algorithms.link_prediction.walk_strategy import Walk
+from netwalk.algorithms.link_prediction.random_walk import RandomWalker, PAD
+from netwalk.algorithms.link_prediction.skipgram import SkipGram
+
+
+def build_two_cliques(size):
+    graph = UndiGraph()
+    for clique in ("a", "b"):
+        for i in range(size):
+            for j in range(i + 1, size):
+                graph.add_edge(("{}{}".format(clique, i),
+                                "{}{}".format(clique, j)))
+    graph.add_edge(("a0", "b0"))
+    return graph
+
+
+def nearest_in_same_clique(walker, embeddings):
+    normalized = embeddings / np.linalg.norm(embeddings, axis=1,
+                                             keepdims=True)
+    similarities = normalized @ normalized.T
+    np.fill_diagonal(similarities, -np.inf)
+    cliques = np.array([label[0] for label in walker.graph.get_labels()])
+    return (cliques[similarities.argmax(axis=1)] == cliques).all()
+
+
+class SkipGramTest(unittest.TestCase):
+    def setUp(self):
+        self.walker = RandomWalker(build_two_cliques(8), Walk.DFS,
+                                   walk_length=10, seed=1)
+        self.walks = self.walker.walks(iteration=40)
+
+    def test_embeddings_separate_cliques(self):
+        model = SkipGram(self.walker.graph.get_nodes_count(), dimensions=16,
+                         window=3, batch_size=64, seed=1)
+        losses = model.train(self.walks, epochs=4)
+        embeddings = model.get_embeddings()
+        self.assertEqual((16, 16), embeddings.shape)
+        self.assertEqual(np.float32, embeddings.dtype)
+        self.assertLess(losses[-1], losses[0])
+        self.assertEqual(losses[-1], model.get_latest_training_loss())
+        self.assertTrue(nearest_in_same_clique(self.walker, embeddings))
+        self.assertAlmostEqual(
+            float(embeddings[0] @ embeddings[1] /
+                  np.linalg.norm(embeddings[0]) /
+                  np.linalg.norm(embeddings[1])),
+            model.similarity(0, 1), places=5)
+
+    def test_seeded(self):
+        embeddings = []
+        for _ in range(2):
+            model = SkipGram(16, dimensions=8, batch_size=32, seed=3)
+            model.train(self.walks, epochs=2)
+            embeddings.append(model.get_embeddings().copy())
+        self.assertListEqual(embeddings[0].tolist(), embeddings[1].tolist())
+        # training again continues with new samples
+        model.train(self.walks)
+        self.assertNotEqual(embeddings[1].tolist(),
+                            model.get_embeddings().tolist())
+
+    def test_pad_is_skipped(self):
+        walks = np.full((4, 6), PAD, dtype=np.int32)
+        walks[:, 0] = [0, 1, 2, 3]
+        model = SkipGram(5, dimensions=4, seed=1)
+        initial = model.get_embeddings().copy()
+        self.assertListEqual([0.0], model.train(walks))
+        self.assertListEqual(initial.tolist(),
+                             model.get_embeddings().tolist())
+
+    def test_callbacks(self):
+        epochs = []
+        model = SkipGram(16, dimensions=8, seed=1)
+        model.train(self.walks, epochs=3, callbacks=[
+            lambda epoch, trained: epochs.append((epoch, trained))])
+        self.assertListEqual([(0, model), (1, model), (2, model)], epochs)
+
+    def test_workers(self):
+        with mock.patch.object(skipgram, "BLOCK_SIZE", 100):
+            model = SkipGram(self.walker.graph.get_nodes_count(),
+                             dimensions=16, window=3, batch_size=64, seed=1,
+                             workers=2)
+            model.train(self.walks, epochs=4)
+        self.assertTrue(nearest_in_same_clique(self.walker,
+                                               model.get_embeddings()))
+
+    @parameterized.expand([
+        ({"dimensions": 0}, ValueError),
+        ({"window": 1.5}, TypeError),
+        ({"negative": 0}, ValueError),
+        ({"batch_size": 0}, ValueError),
+        ({"workers": 0}, ValueError),
+        ({"learning_rate": 0}, ValueError),
+    ])
+    def test_exceptions(self, params, expected):
+        with self.assertRaises(expected):
+            SkipGram(16, **params)
+
+    def test_train_exceptions(self):
+        model = SkipGram(16)
+        with self.assertRaises(ValueError):
+            model.train(self.walks, epochs=0)
+        with self.assertRaises(ValueError):
+            model.train(self.walks[0])
@@ -0,0 +1,38 @@
+import unittest
+from parameterized import parameterized
+from netwalk.utils.cache import LRUCache
+
+
+class LRUCacheTest(unittest.TestCase):
+    def test_least_recently_used_dropped(self):
+        cache = LRUCache(2)
+        calls = []
+
+        def factory(key):
+            return lambda: calls.append(key) or key * 2
+
+        self.assertEqual(2, cache.get(1, factory(1)))
+        self.assertEqual(4, cache.get(2, factory(2)))
+        self.assertEqual(2, cache.get(1, factory(1)))
+        self.assertEqual(6, cache.get(3, factory(3)))
+        self.assertListEqual([1, 2, 3], calls)
+        self.assertIn(1, cache)
+        self.assertNotIn(2, cache)
+        self.assertEqual(2, len(cache))
+
+    def test_invalidate(self):
+        cache = LRUCache(4)
+        cache.get("a", lambda: 1)
+        cache.invalidate("a")
+        cache.invalidate("missing")
+        self.assertEqual(2, cache.get("a", lambda: 2))
+        cache.clear()
+        self.assertEqual(0, len(cache))
+
+    @parameterized.expand([
+        (0, ValueError),
+        (1.5, TypeError),
+    ])
+    def test_exceptions(self, capacity, expected):
+        with self.assertRaises(expected):
+            LRUCache(capacity)
@@ -0,0 +1,200 @@
+import unittest
+import os
+import pickle
+import tempfile
+import numpy as np
+from parameterized import parameterized
+from netwalk.utils.csr import CSRGraph, gather_neighbours
+from netwalk.utils.graph import DiGraph, UndiGraph
+from netwalk.algorithms.centrality.brandes import Brandes
+from netwalk.algorithms.centrality.pageRank import PageRank
+from netwalk.algorithms.link_prediction.similarity_methods import Measure
+from netwalk.algorithms\
+    .link_prediction\
+    .neighbourhood_based_similarity import NeighbourhoodBasedSimilarity
+
+
+EDGES = [
+    ("1", "2"),
+    ("1", "3"),
+    ("2", "3"),
+    ("3", "1"),
+    ("3", "4"),
+    ("4", "4"),
+]
+
+
+def build_graph(graph_class):
+    graph = graph_class()
+    for edge in EDGES:
+        graph.add_edge(edge)
+    return graph
+
+
+class CSRGraphTest(unittest.TestCase):
+    @parameterized.expand([
+        (DiGraph,),
+        (UndiGraph,),
+    ])
+    def test_adj_list_round_trip(self, graph_class):
+        graph = build_graph(graph_class)
+        csr = graph.to_csr()
+        self.assertEqual(graph.is_directed(), csr.is_directed())
+        self.assertEqual(graph.get_nodes_count(), csr.get_nodes_count())
+        self.assertSetEqual(graph.get_nodes(), set(csr.get_nodes()))
+        for node in graph.get_nodes():
+            self.assertListEqual(graph.get_out_adj_list()[node],
+                                 csr.get_out_adj_list()[node])
+            self.assertListEqual(graph.get_in_adj_list()[node],
+                                 csr.get_in_adj_list()[node])
+
+    def test_node_ids(self):
+        csr = build_graph(DiGraph).freeze()
+        self.assertListEqual(["1", "2", "3", "4"], list(csr.get_labels()))
+        node_id = csr.get_node_id("3")
+        self.assertEqual("3", csr.get_node_label(node_id))
+        self.assertListEqual([0, 3],
+                             csr.get_out_neighbour_ids(node_id).tolist())
+        self.assertListEqual([2, 1, 2, 1], csr.get_out_degrees().tolist())
+        self.assertListEqual([1, 1, 2, 2], csr.get_in_degrees().tolist())
+        with self.assertRaises(KeyError):
+            csr.get_node_id("unknown")
+
+    def test_gather_neighbours(self):
+        csr = build_graph(DiGraph).to_csr()
+        nodes = np.array([2, 0, 2])
+        neighbours, owners = gather_neighbours(csr.indptr, csr.indices,
+                                               nodes)
+        self.assertListEqual([0, 3, 1, 2, 0, 3], neighbours.tolist())
+        self.assertListEqual([2, 2, 0, 0, 2, 2], owners.tolist())
+        _, owners = gather_neighbours(csr.indptr, csr.indices, nodes,
+                                      positions=True)
+        self.assertListEqual([0, 0, 1, 1, 2, 2], owners.tolist())
+        neighbours, owners = gather_neighbours(csr.indptr, csr.indices,
+                                               nodes, skip=1)
+        self.assertListEqual([3, 2, 3], neighbours.tolist())
+        self.assertListEqual([2, 0, 2], owners.tolist())
+
+    def test_unknown_node_is_not_inserted(self):
+        csr = build_graph(UndiGraph).to_csr()
+        self.assertListEqual([], csr.get_out_adj_list()["unknown"])
+        self.assertNotIn("unknown", csr.get_out_adj_list())
+        self.assertEqual(4, len(csr.get_out_adj_list()))
+
+    @parameterized.expand([
+        (DiGraph,),
+        (UndiGraph,),
+    ])
+    def test_same_cache_api_as_graph(self, graph_class):
+        graph = build_graph(graph_class)
+        graph.add_node("isolated")
+        csr = graph.to_csr()
+        self.assertDictEqual(dict(graph.get_out_degree_map()),
+                             dict(csr.get_out_degree_map()))
+        self.assertDictEqual(dict(graph.get_in_degree_map()),
+                             dict(csr.get_in_degree_map()))
+        for node in ("1", "3", "4", "isolated", "unknown"):
+            self.assertEqual(graph.get_out_degree(node),
+                             csr.get_out_degree(node))
+            self.assertEqual(graph.get_in_degree(node),
+                             csr.get_in_degree(node))
+            self.assertSetEqual(graph.get_out_neighbour_set(node),
+                                csr.get_out_neighbour_set(node))
+            self.assertSetEqual(graph.get_in_neighbour_set(node),
+                                csr.get_in_neighbour_set(node))
+
+    @parameterized.expand([
+        (DiGraph,),
+        (UndiGraph,),
+    ])
+    def test_algorithms_accept_csr(self, graph_class):
+        graph = build_graph(graph_class)
+        csr = graph.to_csr()
+
+        self.assertDictEqual(PageRank(graph).run_page_rank_algorithm(),
+                             PageRank(csr).run_page_rank_algorithm())
+
+        expected = Brandes(graph)
+        expected.run_brandes_algorithm()
+        actual = Brandes(csr)
+        actual.run_brandes_algorithm()
+        self.assertDictEqual(expected.get_betweenness(),
+                             actual.get_betweenness())
+
+        pair = ("1", "4", "1")
+        for measure in Measure:
+            self.assertEqual(
+                NeighbourhoodBasedSimilarity(graph)
+                .compute_proximity_score(pair, measure),
+                NeighbourhoodBasedSimilarity(csr)
+                .compute_proximity_score(pair, measure))
+
+
+class CSRGraphFileTest(unittest.TestCase):
+    def setUp(self):
+        fd, self.file = tempfile.mkstemp(suffix=".graph")
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.file)
+
+    def assertSameGraph(self, expected, actual):
+        self.assertEqual(expected.is_directed(), actual.is_directed())
+        self.assertListEqual(list(expected.get_labels()),
+                             list(actual.get_labels()))
+        for name in ("indptr", "indices", "in_indptr", "in_indices",
+                     "weights", "in_weights"):
+            expected_array = getattr(expected, name)
+            if expected_array is None:
+                self.assertIsNone(getattr(actual, name))
+            else:
+                self.assertListEqual(expected_array.tolist(),
+                                     getattr(actual, name).tolist())
+
+    @parameterized.expand([
+        (DiGraph, 1.0, True),
+        (UndiGraph, 1.0, True),
+        (DiGraph, 2.5, True),
+        (UndiGraph, 2.5, False),
+    ])
+    def test_save_load(self, graph_class, weight, mmap):
+        graph = build_graph(graph_class)
+        graph.add_edge(("ä", "1"), weight)
+        graph.add_node("isolated")
+        csr = graph.to_csr()
+        csr.save(self.file)
+        loaded = CSRGraph.load(self.file, mmap)
+        self.assertSameGraph(csr, loaded)
+        self.assertEqual("ä", loaded.get_node_label(csr.get_node_id("ä")))
+        self.assertEqual(csr.get_node_id("isolated"),
+                         loaded.get_node_id("isolated"))
+        self.assertSameGraph(csr, pickle.loads(pickle.dumps(loaded)))
+
+    @parameterized.expand([
+        (DiGraph,),
+        (UndiGraph,),
+    ])
+    def test_graph_save_load(self, graph_class):
+        graph = build_graph(graph_class)
+        graph.save(self.file)
+        loaded = graph_class.load(self.file)
+        self.assertIsInstance(loaded, graph_class)
+        self.assertSetEqual(graph.get_nodes(), loaded.get_nodes())
+        self.assertDictEqual(dict(graph.get_out_adj_list()),
+                             dict(loaded.get_out_adj_list()))
+        self.assertDictEqual(dict(graph.get_in_adj_list()),
+                             dict(loaded.get_in_adj_list()))
+        other_class = UndiGraph if graph_class is DiGraph else DiGraph
+        with self.assertRaises(ValueError):
+            other_class.load(self.file)
+
+    def test_load_exceptions(self):
+        with open(self.file, 'wb') as f:
+            f.write(b"1 2\n")
+        with self.assertRaises(ValueError):
+            CSRGraph.load(self.file)
+        build_graph(DiGraph).save(self.file)
+        with open(self.file, 'r+b') as f:
+            f.truncate(80)
+        with self.assertRaises(ValueError):
+            CSRGraph.load(self.file)
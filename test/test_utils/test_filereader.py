@@ -1,8 +1,14 @@
 import unittest
-from netwalk.utils import reader
+from netwalk.utils import misc, reader
 from parameterized import parameterized
 from unittest.mock import patch
+import bz2
+import gzip
+import lzma
 import os
+import subprocess
+import sys
+import tempfile
 
 
 class FileReaderTest(unittest.TestCase):
@@ -41,3 +47,61 @@ class FileReaderTest(unittest.TestCase):
         with patch('netwalk.utils.reader.FileReader', side_effect=expected):
             with self.assertRaises(expected):
                 _ = reader.FileReader(file_name, delimiter=delimiter)
+
+
+class CompressedFileReaderTest(unittest.TestCase):
+    TEXT = "name\theight\nabc\t10\ndef\t20\n"
+    ROWS = [['abc', '10'], ['def', '20']]
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, compression):
+        file_name = os.path.join(self.directory.name, "data." + compression)
+        module = {'gz': gzip, 'bz2': bz2, 'xz': lzma, 'txt': None}[compression]
+        data = self.TEXT.encode()
+        with open(file_name, 'wb') as f:
+            f.write(data if module is None else module.compress(data))
+        return file_name
+
+    @parameterized.expand([
+        ('txt', False),
+        ('gz', False),
+        ('bz2', False),
+        ('xz', False),
+        ('gz', True),
+        ('xz', True),
+    ])
+    def test_decompression(self, compression, parallel):
+        with reader.FileReader(self.write(compression), delimiter='\t',
+                               header=True, parallel=parallel) as txtReader:
+            self.assertListEqual(['name', 'height'], txtReader.get_header())
+            self.assertListEqual(self.ROWS, list(txtReader.get_data()))
+        self.assertTrue(txtReader.fd.closed)
+
+    def test_batches(self):
+        with reader.FileReader(self.write('gz'), delimiter='\t',
+                               header=True) as txtReader:
+            batches = list(txtReader.get_batches(batch_size=1))
+        self.assertListEqual([[row] for row in self.ROWS], batches)
+
+    def test_stdin(self):
+        code = ("from netwalk.utils.reader import FileReader\n"
+                "with FileReader('-', delimiter='\\t', header=True) as r:\n"
+                "    print(list(r.get_data()))\n")
+        with open(self.write('gz'), 'rb') as f:
+            output = subprocess.run([sys.executable, '-c', code], stdin=f,
+                                    stdout=subprocess.PIPE, check=True)
+        self.assertEqual(str(self.ROWS), output.stdout.decode().strip())
+
+    def test_loader_reads_compressed_file(self):
+        file_name = os.path.join(self.directory.name, "edges.bz2")
+        with open(file_name, 'wb') as f:
+            f.write(bz2.compress(b"1 2\n2 3\n"))
+        graph = misc.file_to_graph(file_name)
+        self.assertSetEqual({"1", "2", "3"}, graph.get_nodes())
+        self.assertListEqual([("1", "2", "x"), ("2", "3", "x")],
+                             misc.get_dataset_from_file(file_name, "x"))
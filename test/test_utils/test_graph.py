@@ -1,5 +1,5 @@
 import unittest
-from netwalk.utils.graph import Graph
+from netwalk.utils.graph import Graph, DiGraph, UndiGraph
 from parameterized import parameterized
 
 
@@ -32,3 +32,91 @@ class GraphTest(unittest.TestCase):
             self.graph.add_node(arg)
 
         self.assertEqual(expected, self.graph.get_nodes_count())
+
+
+class WeightedGraphTest(unittest.TestCase):
+    def test_weights_filled_when_first_weight_added(self):
+        graph = DiGraph()
+        graph.add_edge(("a", "b"))
+        self.assertFalse(graph.is_weighted())
+        self.assertDictEqual({}, dict(graph.get_out_weights()))
+        graph.add_edge(("a", "c"), 2.5)
+        self.assertTrue(graph.is_weighted())
+        self.assertListEqual([1.0, 2.5], list(graph.get_out_weights()["a"]))
+        self.assertListEqual([2.5], list(graph.get_in_weights()["c"]))
+
+    def test_undirected_weights(self):
+        graph = UndiGraph()
+        graph.add_edge(("a", "b"), 3.0)
+        graph.add_edge(("b", "b"), 2.0)
+        self.assertListEqual([3.0], list(graph.get_out_weights()["a"]))
+        self.assertListEqual([3.0, 2.0], list(graph.get_out_weights()["b"]))
+        csr = graph.to_csr()
+        self.assertTrue(csr.is_weighted())
+        self.assertListEqual(
+            [3.0, 2.0],
+            csr.get_out_weight_values(csr.get_node_id("b")).tolist())
+
+    @parameterized.expand([
+        (0, ValueError),
+        (-1.0, ValueError),
+        ("1", TypeError),
+        (True, TypeError),
+    ])
+    def test_weight_exceptions(self, weight, expected):
+        with self.assertRaises(expected):
+            DiGraph().add_edge(("a", "b"), weight)
+
+
+class GraphCacheTest(unittest.TestCase):
+    @parameterized.expand([
+        (DiGraph,),
+        (UndiGraph,),
+    ])
+    def test_degrees_follow_mutations(self, graph_class):
+        graph = graph_class()
+        graph.add_edge(("a", "b"))
+        out_degrees = graph.get_out_degree_map()
+        in_degrees = graph.get_in_degree_map()
+        graph.add_edge(("a", "c"))
+        graph.add_edge(("c", "c"))
+        graph.add_node("d")
+        for node in ("a", "b", "c", "d"):
+            self.assertEqual(len(graph.get_out_adj_list().get(node, [])),
+                             out_degrees[node])
+            self.assertEqual(len(graph.get_in_adj_list().get(node, [])),
+                             in_degrees[node])
+            self.assertEqual(out_degrees[node], graph.get_out_degree(node))
+            self.assertEqual(in_degrees[node], graph.get_in_degree(node))
+        self.assertIs(out_degrees, graph.get_out_degree_map())
+        self.assertEqual(0, graph.get_out_degree("unknown"))
+        self.assertNotIn("unknown", graph.get_out_adj_list())
+
+    @parameterized.expand([
+        (DiGraph,),
+        (UndiGraph,),
+    ])
+    def test_neighbour_sets_follow_mutations(self, graph_class):
+        graph = graph_class()
+        graph.add_edge(("a", "b"))
+        self.assertSetEqual({"b"}, graph.get_out_neighbour_set("a"))
+        self.assertSetEqual({"a"}, graph.get_in_neighbour_set("b"))
+        graph.add_edge(("a", "c"))
+        self.assertSetEqual({"b", "c"}, graph.get_out_neighbour_set("a"))
+        self.assertSetEqual(set(graph.get_in_adj_list()["c"]),
+                            graph.get_in_neighbour_set("c"))
+        self.assertSetEqual(frozenset(), graph.get_out_neighbour_set("x"))
+        self.assertNotIn("x", graph.get_out_adj_list())
+
+    def test_csr_cached_until_mutation(self):
+        graph = DiGraph()
+        graph.add_edge(("a", "b"))
+        csr = graph.to_csr()
+        self.assertIs(csr, graph.to_csr())
+        graph.add_node("b")
+        self.assertIs(csr, graph.to_csr())
+        graph.add_node("c")
+        self.assertEqual(3, graph.to_csr().get_nodes_count())
+        graph.add_edge(("c", "a"))
+        self.assertEqual(2, graph.to_csr().get_edges_count())
+        self.assertEqual(1, csr.get_edges_count())
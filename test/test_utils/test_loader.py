@@ -0,0 +1,193 @@
+import unittest
+import os
+import random
+import tempfile
+from parameterized import parameterized
+from netwalk.utils.graph import DiGraph, UndiGraph
+from netwalk.utils.loader import load_edge_list, read_edge_list
+from netwalk.utils.misc import file_to_graph, get_dataset_from_file
+
+
+EDGES = [
+    ("1", "2"),
+    ("1", "3"),
+    ("2", "3"),
+    ("3", "1"),
+    ("3", "10"),
+    ("10", "10"),
+    ("2", "1"),
+]
+
+
+def build_graph(graph_class, edges):
+    graph = graph_class()
+    for edge in edges:
+        graph.add_edge(*edge)
+    return graph
+
+
+class LoaderTest(unittest.TestCase):
+    def setUp(self):
+        fd, self.file = tempfile.mkstemp(suffix=".txt")
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.file)
+
+    def write(self, text):
+        with open(self.file, 'w') as f:
+            f.write(text)
+
+    def assertSameCSR(self, expected, actual):
+        self.assertListEqual(list(expected.get_labels()),
+                             list(actual.get_labels()))
+        for name in ("indptr", "indices", "in_indptr", "in_indices",
+                     "weights", "in_weights"):
+            expected_array = getattr(expected, name)
+            actual_array = getattr(actual, name)
+            if expected_array is None:
+                self.assertIsNone(actual_array)
+            else:
+                self.assertListEqual(expected_array.tolist(),
+                                     actual_array.tolist())
+
+    @parameterized.expand([
+        (DiGraph, 1 << 20),
+        (UndiGraph, 1 << 20),
+        (DiGraph, 7),
+        (UndiGraph, 5),
+    ])
+    def test_same_as_add_edge(self, graph_class, chunk_size):
+        self.write("".join("{} {}\n".format(*edge) for edge in EDGES))
+        expected = build_graph(graph_class,
+                               [(edge,) for edge in EDGES]).to_csr()
+        actual = load_edge_list(self.file, graph_class is DiGraph,
+                                chunk_size=chunk_size)
+        self.assertSameCSR(expected, actual)
+
+    @parameterized.expand([
+        ("# comment\n1 2\n\n2 3\n#\n", None, ["1", "2", "3"]),
+        ("1,2\n2 , 3\r\n", ',', ["1", "2", "3"]),
+        ("01 1\n-1 a\n", None, ["-1", "01", "1", "a"]),
+        ("b\ta\tlabel\nc\ta\tlabel", '\t', ["a", "b", "c"]),
+    ])
+    def test_formats(self, text, delimiter, labels):
+        self.write(text)
+        actual, src, dst, weights = read_edge_list(self.file, delimiter)
+        self.assertListEqual(labels, actual)
+        self.assertEqual(len(src), len(dst))
+        self.assertIsNone(weights)
+
+    @parameterized.expand([
+        ("1 2 3\n4\n", None),
+        ("a b c\nd\n", None),
+        ("1,2,3\n4\n", ','),
+        ("a,b,c\nd\n", ','),
+        ("1,,2\n", ','),
+    ])
+    def test_unbalanced_lines(self, text, delimiter):
+        # a long line and a short line have the tokens of two edges
+        self.write(text)
+        with self.assertRaises(ValueError):
+            read_edge_list(self.file, delimiter)
+
+    def test_mixed_chunks(self):
+        self.write("1 2\n2 3\n# comment\nx 1\n")
+        labels, src, dst, _ = read_edge_list(self.file, chunk_size=8)
+        self.assertListEqual(["1", "2", "3", "x"], labels)
+        self.assertListEqual([("1", "2"), ("2", "3"), ("x", "1")],
+                             [(labels[i], labels[j])
+                              for i, j in zip(src.tolist(), dst.tolist())])
+
+    def test_weighted(self):
+        self.write("a b 0.5\nb c 2\n")
+        edges = [(("a", "b"), 0.5), (("b", "c"), 2.0)]
+        self.assertSameCSR(build_graph(UndiGraph, edges).to_csr(),
+                           load_edge_list(self.file, weighted=True))
+        graph = file_to_graph(self.file, digraph=True, weighted=True)
+        self.assertTrue(graph.is_weighted())
+        self.assertListEqual([2.0], list(graph.get_in_weights()["c"]))
+
+    @parameterized.expand([
+        ("a b 0\n",),
+        ("a b x\n",),
+        ("a\n",),
+    ])
+    def test_exceptions(self, text):
+        self.write(text)
+        with self.assertRaises(ValueError):
+            load_edge_list(self.file, weighted=True)
+
+    @parameterized.expand([
+        (DiGraph, True),
+        (UndiGraph, False),
+    ])
+    def test_file_to_graph(self, graph_class, digraph):
+        self.write("".join("{} {}\n".format(*edge) for edge in EDGES))
+        expected = build_graph(graph_class, [(edge,) for edge in EDGES])
+        actual = file_to_graph(self.file, digraph)
+        self.assertIsInstance(actual, graph_class)
+        self.assertSetEqual(expected.get_nodes(), actual.get_nodes())
+        self.assertDictEqual(dict(expected.get_out_adj_list()),
+                             dict(actual.get_out_adj_list()))
+        self.assertDictEqual(dict(expected.get_in_adj_list()),
+                             dict(actual.get_in_adj_list()))
+        actual.add_edge(("1", "new"))
+        self.assertIn("new", actual.get_out_adj_list()["1"])
+        self.assertSameCSR(expected.to_csr(),
+                           file_to_graph(self.file, digraph, compact=True))
+
+
+class ParallelLoaderTest(unittest.TestCase):
+    def setUp(self):
+        fd, self.file = tempfile.mkstemp(suffix=".txt")
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.file)
+
+    @parameterized.expand([
+        (False, 2),
+        (False, 3),
+        (True, 4),
+        (False, 50),
+    ])
+    def test_same_as_serial(self, weighted, workers):
+        rng = random.Random(workers)
+        with open(self.file, 'w') as f:
+            f.write("# header comment\n")
+            for i in range(300):
+                # labels of some ranges are only integers
+                src = rng.randrange(40) if i < 150 else \
+                    "n{}".format(rng.randrange(40))
+                f.write("{} {}".format(src, rng.randrange(60)))
+                f.write(" {}\n".format(rng.choice((0.5, 2))) if weighted
+                        else "\n")
+        expected = read_edge_list(self.file, weighted=weighted)
+        actual = read_edge_list(self.file, weighted=weighted,
+                                workers=workers)
+        self.assertListEqual(expected[0], actual[0])
+        for expected_array, actual_array in zip(expected[1:], actual[1:]):
+            if expected_array is None:
+                self.assertIsNone(actual_array)
+            else:
+                self.assertListEqual(expected_array.tolist(),
+                                     actual_array.tolist())
+        self.assertListEqual(get_dataset_from_file(self.file, "1"),
+                             get_dataset_from_file(self.file, "1", 3))
+        graph = file_to_graph(self.file, True, weighted=weighted,
+                              workers=workers)
+        self.assertDictEqual(
+            dict(file_to_graph(self.file, True, weighted=weighted)
+                 .get_out_adj_list()),
+            dict(graph.get_out_adj_list()))
+
+    @parameterized.expand([
+        (0, ValueError),
+        (1.5, TypeError),
+    ])
+    def test_workers_exceptions(self, workers, expected):
+        with open(self.file, 'w') as f:
+            f.write("1 2\n")
+        with self.assertRaises(expected):
+            read_edge_list(self.file, workers=workers)
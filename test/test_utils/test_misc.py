@@ -0,0 +1,31 @@
+import unittest
+import random
+import numpy as np
+from parameterized import parameterized
+from netwalk.utils.misc import top_n_indices, top_n_rank
+
+
+class MiscTest(unittest.TestCase):
+    @parameterized.expand([
+        (None, 1),
+        (0, 2),
+        (1, 3),
+        (5, 4),
+        (50, 5),
+        (-3, 6),
+    ])
+    def test_top_n_rank_same_as_sort(self, n, seed):
+        rng = random.Random(seed)
+        # few distinct scores, so the ties cross the n-th position
+        scores = [(str(i), str(i + 1), "1", float(rng.randrange(4)))
+                  for i in range(20)]
+        expected = sorted(scores, key=lambda x: x[3], reverse=True)
+        expected = expected[:n] if n is not None else expected
+        self.assertListEqual(expected, top_n_rank(scores, n))
+
+    def test_top_n_indices(self):
+        scores = np.array([0.5, 2.0, -1.0, 2.0, 0.5])
+        self.assertListEqual([1, 3, 0], top_n_indices(scores, 3).tolist())
+        self.assertListEqual([1, 3, 0, 4, 2],
+                             top_n_indices(scores).tolist())
+        self.assertEqual(0, len(top_n_indices(np.array([]), 3)))